@@ -0,0 +1,80 @@
+"""Scaling benchmark for the patch visit counting in `depletion.metrics`.
+
+Compares `count_patches_visited` against the previous row-by-row implementation
+on synthetic sessions of increasing size.
+
+Usage:
+    uv run benchmarks/depletion_patch_visits.py
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from aind_behavior_vr_foraging_curricula.depletion.metrics import count_patches_visited
+from aind_behavior_vr_foraging_curricula.extraction import extract_field
+
+
+def make_session(n_patches: int, n_choices: int, seed: int = 0) -> tuple[pd.DataFrame, pd.DataFrame]:
+    rng = np.random.default_rng(seed)
+    duration = float(n_patches) * 10
+    patches = pd.DataFrame(
+        {"data": [{"state_index": int(i)} for i in rng.integers(0, 3, size=n_patches)]},
+        index=pd.Index(np.sort(rng.uniform(0, duration, size=n_patches)), name="timestamp"),
+    )
+    choices = pd.DataFrame(
+        {"data": np.ones(n_choices)},
+        index=pd.Index(np.sort(rng.uniform(0, duration, size=n_choices)), name="timestamp"),
+    )
+    return patches, choices
+
+
+def legacy(patches: pd.DataFrame, choices: pd.DataFrame) -> dict[int, int]:
+    unique_patches = patches["data"].apply(lambda x: x["state_index"]).unique()
+    n_patches_visited_per_patch = {int(patch): 0 for patch in unique_patches}
+    for i in range(len(patches) - 1):
+        choices_between_patches = choices[(choices.index > patches.index[i]) & (choices.index < patches.index[i + 1])]
+        if len(choices_between_patches) > 0:
+            n_patches_visited_per_patch[int(patches["data"].iloc[i]["state_index"])] += 1
+    return n_patches_visited_per_patch
+
+
+def vectorized(patches: pd.DataFrame, choices: pd.DataFrame) -> dict[int, int]:
+    return count_patches_visited(
+        patch_timestamps=patches.index.to_numpy(),
+        patch_state_indices=extract_field(patches["data"], "state_index", np.int64),
+        choice_timestamps=choices.index.to_numpy(),
+    )
+
+
+def _timeit(fn, *args) -> tuple[float, dict[int, int]]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main(sizes: list[int], choices_per_patch: int, legacy_max_patches: int) -> None:
+    print(f"{'patches':>10} {'choices':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for n_patches in sizes:
+        patches, choices = make_session(n_patches, n_patches * choices_per_patch)
+        t_new, new = _timeit(vectorized, patches, choices)
+        if n_patches <= legacy_max_patches:
+            t_old, old = _timeit(legacy, patches, choices)
+            assert old == new, "Implementations disagree"
+            legacy_column = f"{t_old:>12.4f} {t_new:>15.4f} {t_old / t_new:>8.1f}x"
+        else:
+            legacy_column = f"{'-':>12} {t_new:>15.4f} {'-':>9}"
+        print(f"{n_patches:>10} {len(choices):>10} {legacy_column}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark patch visit counting")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 2_500, 5_000, 10_000, 100_000])
+    parser.add_argument("--choices-per-patch", type=int, default=10)
+    parser.add_argument(
+        "--legacy-max-patches", type=int, default=10_000, help="Skip the legacy implementation above this size."
+    )
+    args = parser.parse_args()
+    main(args.sizes, args.choices_per_patch, args.legacy_max_patches)
@@ -0,0 +1,79 @@
+"""Scaling benchmark for the nested field extraction in `extraction`.
+
+Compares `extract_field` and `extract_fields` against the row-wise
+`series.apply(lambda x: x[key])` pattern on event dataframes of increasing size.
+
+Usage:
+    uv run benchmarks/field_extraction.py
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from aind_behavior_vr_foraging_curricula.extraction import extract_field, extract_fields
+
+FIELDS = {"state_index": np.int64, "label": str, "length": float}
+
+
+def make_events(n_events: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    labels = rng.choice(["InterSite", "InterPatch", "RewardSite"], size=n_events)
+    return pd.DataFrame(
+        {
+            "data": [
+                {"state_index": int(i), "label": str(label), "length": float(length)}
+                for i, label, length in zip(rng.integers(0, 3, size=n_events), labels, rng.uniform(10, 60, n_events))
+            ]
+        },
+        index=pd.Index(np.sort(rng.uniform(0, n_events, size=n_events)), name="timestamp"),
+    )
+
+
+def apply_one(events: pd.DataFrame) -> np.ndarray:
+    return events["data"].apply(lambda x: x["state_index"]).to_numpy(dtype=np.int64)
+
+
+def extract_one(events: pd.DataFrame) -> np.ndarray:
+    return extract_field(events["data"], "state_index", np.int64)
+
+
+def apply_all(events: pd.DataFrame) -> dict[str, np.ndarray]:
+    return {key: events["data"].apply(lambda x, key=key: x[key]).to_numpy(dtype=dtype) for key, dtype in FIELDS.items()}
+
+
+def extract_all(events: pd.DataFrame) -> dict[str, np.ndarray]:
+    return extract_fields(events["data"], FIELDS)
+
+
+def _timeit(fn, *args, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(sizes: list[int], repeat: int) -> None:
+    print(f"{'events':>10} {'fields':>7} {'apply (s)':>11} {'extract (s)':>12} {'speedup':>9}")
+    for n_events in sizes:
+        events = make_events(n_events)
+        for n_fields, old, new in ((1, apply_one, extract_one), (len(FIELDS), apply_all, extract_all)):
+            t_old, expected = _timeit(old, events, repeat=repeat)
+            t_new, result = _timeit(new, events, repeat=repeat)
+            if isinstance(expected, dict):
+                assert all(np.array_equal(expected[key], result[key]) for key in FIELDS), "Implementations disagree"
+            else:
+                assert np.array_equal(expected, result), "Implementations disagree"
+            print(f"{n_events:>10} {n_fields:>7} {t_old:>11.4f} {t_new:>12.4f} {t_old / t_new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark nested field extraction from event dataframes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs; the fastest is reported.")
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
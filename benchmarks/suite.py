@@ -0,0 +1,278 @@
+"""Benchmark suite for the curricula.
+
+Times, without requiring a rig or real data:
+    - import: cold import (in a fresh interpreter) of the CLI and of each curriculum, including building its trainer
+    - metrics: `metrics_from_dataset` of every metrics provider on synthetic sessions of increasing size
+    - policies: every policy of the depletion, single_site_matching and replenishment_depletion_offset curricula
+    - evaluate: `TRAINER.evaluate` of every curriculum on its enrollment state
+    - schema: `_schema.main`, regenerating every curriculum and with every curriculum up to date
+    - simulate: `simulation.simulate` of the depletion curriculum for increasing numbers of virtual subjects
+
+Results are saved as JSON so that runs can be compared across commits.
+
+Usage:
+    uv run benchmarks/suite.py --output before.json
+    uv run benchmarks/suite.py --output after.json --compare before.json
+"""
+
+import argparse
+import datetime
+import importlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+from pathlib import Path
+
+from aind_behavior_vr_foraging_curricula import __version__
+from aind_behavior_vr_foraging_curricula.cli import _KNOWN_CURRICULA
+from aind_behavior_vr_foraging_curricula.synthetic import SyntheticSessionSettings, generate_session
+
+PACKAGE = "aind_behavior_vr_foraging_curricula"
+
+_IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import importlib
+module = importlib.import_module({module!r})
+{attribute}
+print(time.perf_counter() - start)
+"""
+
+
+class BenchmarkResult(t.TypedDict):
+    group: str
+    name: str
+    params: dict[str, t.Any]
+    timings_s: list[float]
+    min_s: float
+    median_s: float
+
+
+class Benchmark(t.NamedTuple):
+    group: str
+    name: str
+    params: dict[str, t.Any]
+    run: t.Callable[[], t.Any]
+    setup: t.Optional[t.Callable[[], tuple]] = None
+
+
+def _result(benchmark: Benchmark, timings: list[float]) -> BenchmarkResult:
+    return BenchmarkResult(
+        group=benchmark.group,
+        name=benchmark.name,
+        params=benchmark.params,
+        timings_s=timings,
+        min_s=min(timings),
+        median_s=statistics.median(timings),
+    )
+
+
+def measure(benchmark: Benchmark, repeats: int) -> BenchmarkResult:
+    if benchmark.group == "import":
+        # The callable itself reports the time measured in a fresh interpreter
+        return _result(benchmark, [benchmark.run() for _ in range(repeats)])
+    # One untimed call, so that lazy initialization is not attributed to the first repeat
+    benchmark.run(*(benchmark.setup() if benchmark.setup is not None else ()))
+    timings = []
+    for _ in range(repeats):
+        args = benchmark.setup() if benchmark.setup is not None else ()
+        start = time.perf_counter()
+        benchmark.run(*args)
+        timings.append(time.perf_counter() - start)
+    return _result(benchmark, timings)
+
+
+# ============================================================
+# Benchmarks
+# ============================================================
+
+
+def _import_benchmarks() -> list[Benchmark]:
+    def cold_import(module: str, attribute: str = "") -> t.Callable[[], float]:
+        code = _IMPORT_SNIPPET.format(module=module, attribute=attribute)
+        return lambda: float(subprocess.run([sys.executable, "-c", code], check=True, capture_output=True).stdout)
+
+    benchmarks = [Benchmark("import", "cli", {}, cold_import(f"{PACKAGE}.cli"))]
+    for curriculum in _KNOWN_CURRICULA:
+        benchmarks.append(Benchmark("import", curriculum, {}, cold_import(f"{PACKAGE}.{curriculum}", "module.TRAINER")))
+    return benchmarks
+
+
+def _metrics_benchmarks(sessions: dict[int, Path]) -> list[Benchmark]:
+    benchmarks = []
+    for provider_module in ("depletion", "single_site_matching", "template"):
+        provider = importlib.import_module(f"{PACKAGE}.{provider_module}.metrics").metrics_from_dataset
+        for n_patches, session in sessions.items():
+            benchmarks.append(
+                Benchmark("metrics", provider_module, {"n_patches": n_patches}, lambda p=provider, s=session: p(s))
+            )
+    return benchmarks
+
+
+def _policy_benchmarks(session: Path) -> list[Benchmark]:
+    from aind_behavior_vr_foraging_curricula.depletion import policies as depletion_policies
+    from aind_behavior_vr_foraging_curricula.depletion.metrics import metrics_from_dataset as depletion_metrics
+    from aind_behavior_vr_foraging_curricula.depletion.stages import make_s_stage_one_odor_no_depletion
+    from aind_behavior_vr_foraging_curricula.replenishment_depletion_offset import policies as replenishment_policies
+    from aind_behavior_vr_foraging_curricula.replenishment_depletion_offset.stages import make_s_mcm_final_stage
+    from aind_behavior_vr_foraging_curricula.single_site_matching import policies as single_site_policies
+    from aind_behavior_vr_foraging_curricula.single_site_matching.metrics import metrics_from_dataset as ssm_metrics
+    from aind_behavior_vr_foraging_curricula.single_site_matching.stages import make_s_learn_to_stop
+
+    # Policies mutate the task, so each repeat gets a fresh copy
+    depletion_task = make_s_stage_one_odor_no_depletion().task
+    depletion_metrics_ = depletion_metrics(session).model_copy(
+        update={"total_water_consumed": 1.0, "n_reward_sites_traveled": 400, "n_choices": 200}
+    )
+    single_site_task = make_s_learn_to_stop().task
+    single_site_metrics = ssm_metrics(session)
+    replenishment_task = make_s_mcm_final_stage().task
+
+    cases = [
+        (depletion_policies, "p_stochastic_reward", depletion_metrics_, depletion_task),
+        (depletion_policies, "p_learn_to_run", depletion_metrics_, depletion_task),
+        (depletion_policies, "p_learn_to_stop", depletion_metrics_, depletion_task),
+        (single_site_policies, "p_learn_to_stop", single_site_metrics, single_site_task),
+        (replenishment_policies, "p_update_replenishment_rate", depletion_metrics_, replenishment_task),
+    ]
+    return [
+        Benchmark(
+            "policies",
+            f"{module.__name__.split('.')[-2]}.{name}",
+            {},
+            getattr(module, name),
+            lambda m=metrics, task=task: (m, task.model_copy(deep=True)),
+        )
+        for module, name, metrics, task in cases
+    ]
+
+
+def _evaluate_benchmarks(session: Path) -> list[Benchmark]:
+    benchmarks = []
+    for curriculum in _KNOWN_CURRICULA:
+        trainer = importlib.import_module(f"{PACKAGE}.{curriculum}").TRAINER
+        trainer_state = trainer.create_enrollment()
+        metrics = trainer_state.stage.metrics_provider.callable(session)
+        benchmarks.append(
+            Benchmark("evaluate", curriculum, {}, lambda tr=trainer, ts=trainer_state, m=metrics: tr.evaluate(ts, m))
+        )
+    return benchmarks
+
+
+def _schema_benchmarks(root: Path) -> list[Benchmark]:
+    from aind_behavior_vr_foraging_curricula import _schema
+
+    return [
+        Benchmark("schema", "main", {}, lambda: _schema.main(str(root / "schema"), force=True)),
+        # Every curriculum is up to date after the first run
+        Benchmark("schema", "incremental", {}, lambda: _schema.main(str(root / "schema"))),
+    ]
+
+
+def _simulate_benchmarks() -> list[Benchmark]:
+    from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+    from aind_behavior_vr_foraging_curricula.depletion.simulation import DepletionMetricsModel
+    from aind_behavior_vr_foraging_curricula.simulation import SimulationSettings, simulate
+
+    return [
+        Benchmark(
+            "simulate",
+            "depletion",
+            {"n_subjects": n, "n_sessions": 60},
+            lambda n=n: simulate(TRAINER, DepletionMetricsModel(), SimulationSettings(n_subjects=n, seed=0)),
+        )
+        for n in (1_000, 10_000)
+    ]
+
+
+# ============================================================
+# Entry point
+# ============================================================
+
+
+def _metadata() -> dict[str, t.Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], check=True, capture_output=True, text=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "version": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def _key(result: BenchmarkResult) -> tuple[str, str, str]:
+    return (result["group"], result["name"], json.dumps(result["params"], sort_keys=True))
+
+
+def print_results(results: list[BenchmarkResult], baseline: t.Optional[list[BenchmarkResult]] = None) -> None:
+    baseline_by_key = {_key(r): r for r in baseline or []}
+    print(f"{'group':>10} {'name':>45} {'params':>20} {'min (ms)':>10} {'median (ms)':>12} {'vs baseline':>12}")
+    for result in results:
+        params = ",".join(f"{k}={v}" for k, v in result["params"].items())
+        ratio = ""
+        if (reference := baseline_by_key.get(_key(result))) is not None:
+            ratio = f"{result['median_s'] / reference['median_s']:.2f}x"
+        print(
+            f"{result['group']:>10} {result['name']:>45} {params:>20} "
+            f"{result['min_s'] * 1e3:>10.2f} {result['median_s'] * 1e3:>12.2f} {ratio:>12}"
+        )
+
+
+def main(
+    sizes: list[int],
+    repeats: int,
+    groups: t.Optional[list[str]] = None,
+    output: t.Optional[Path] = None,
+    compare: t.Optional[Path] = None,
+) -> list[BenchmarkResult]:
+    results: list[BenchmarkResult] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        sessions = {
+            n: generate_session(root / f"session_{n}", SyntheticSessionSettings(n_patches=n, duration=n * 10.0))
+            for n in sizes
+        }
+        smallest_session = sessions[min(sizes)]
+        factories: dict[str, t.Callable[[], list[Benchmark]]] = {
+            "import": _import_benchmarks,
+            "metrics": lambda: _metrics_benchmarks(sessions),
+            "policies": lambda: _policy_benchmarks(smallest_session),
+            "evaluate": lambda: _evaluate_benchmarks(smallest_session),
+            "schema": lambda: _schema_benchmarks(root),
+            "simulate": _simulate_benchmarks,
+        }
+        for group, factory in factories.items():
+            if groups and group not in groups:
+                continue
+            for benchmark in factory():
+                results.append(measure(benchmark, repeats))
+
+    baseline = json.loads(compare.read_text(encoding="utf-8"))["results"] if compare is not None else None
+    print_results(results, baseline)
+    if output is not None:
+        output.write_text(json.dumps({"metadata": _metadata(), "results": results}, indent=2), encoding="utf-8")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the curricula benchmark suite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000], help="Session sizes (patches)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--groups", nargs="+", choices=["import", "metrics", "policies", "evaluate", "schema", "simulate"], default=None
+    )
+    parser.add_argument("--output", type=Path, default=None, help="Path to save the results as JSON.")
+    parser.add_argument("--compare", type=Path, default=None, help="Results of a previous run to compare against.")
+    args = parser.parse_args()
+    main(args.sizes, args.repeats, args.groups, args.output, args.compare)
@@ -0,0 +1,77 @@
+"""Startup benchmark for reading the input trainer state in `curriculum run`.
+
+Compares the previous two-pass path (validating the trainer state as an anonymous
+`TrainerState[Curriculum[Any]]` to find the curriculum, then reading and validating the
+file again with the typed trainer model) against the single-pass path (reading the file
+once, peeking at `pkg_location` with `json.loads`, and validating once with the typed model).
+
+Usage:
+    uv run benchmarks/trainer_state_parsing.py
+"""
+
+import argparse
+import importlib
+import tempfile
+import time
+import typing as t
+from pathlib import Path
+
+import aind_behavior_curriculum
+
+from aind_behavior_vr_foraging_curricula.cli import _KNOWN_CURRICULA
+from aind_behavior_vr_foraging_curricula.utils import (
+    model_from_json_file,
+    pkg_location_from_json,
+    trainer_state_from_file,
+    trainer_state_from_json,
+)
+
+
+def two_pass(path: Path, trainer: aind_behavior_curriculum.Trainer) -> aind_behavior_curriculum.TrainerState:
+    anonymous = model_from_json_file(
+        path, aind_behavior_curriculum.TrainerState[aind_behavior_curriculum.Curriculum[t.Any]]
+    )
+    assert anonymous.curriculum is not None and anonymous.curriculum.pkg_location
+    return trainer_state_from_file(path, trainer)
+
+
+def single_pass(path: Path, trainer: aind_behavior_curriculum.Trainer) -> aind_behavior_curriculum.TrainerState:
+    document = path.read_bytes()
+    assert pkg_location_from_json(document)
+    return trainer_state_from_json(document, trainer)
+
+
+def _best_of(fn, repeats: int, *args) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(repeats: int) -> None:
+    print(f"{'curriculum':>32} {'size (kB)':>10} {'two-pass (ms)':>14} {'single-pass (ms)':>17} {'saved (ms)':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, name in enumerate(_KNOWN_CURRICULA):
+            trainer = importlib.import_module(f"aind_behavior_vr_foraging_curricula.{name}").TRAINER
+            path = Path(tmp) / f"{name}.json"
+            path.write_text(trainer.create_enrollment().model_dump_json(), encoding="utf-8")
+            if i == 0:
+                # A single `curriculum run` pays the one-off cost of building the anonymous model, so report it too
+                t_new = _best_of(single_pass, 1, path, trainer) * 1e3
+                t_old = _best_of(two_pass, 1, path, trainer) * 1e3
+                print(f"{name + ' (cold)':>32} {'':>10} {t_old:>14.2f} {t_new:>17.2f} {t_old - t_new:>11.2f}")
+            assert two_pass(path, trainer) == single_pass(path, trainer), "Implementations disagree"
+
+            t_old = _best_of(two_pass, repeats, path, trainer) * 1e3
+            t_new = _best_of(single_pass, repeats, path, trainer) * 1e3
+            size = path.stat().st_size / 1e3
+            print(f"{name:>32} {size:>10.1f} {t_old:>14.2f} {t_new:>17.2f} {t_old - t_new:>11.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark trainer state parsing at startup")
+    parser.add_argument("--repeats", type=int, default=20, help="Number of repeats; the best time is reported.")
+    args = parser.parse_args()
+    main(args.repeats)
@@ -1,22 +1,267 @@
+import ast
+import functools
+import hashlib
 import importlib
+import importlib.metadata
+import json
+import logging
+import os
 import pathlib
+import sys
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
 
 from aind_behavior_curriculum import Curriculum
 
 from aind_behavior_vr_foraging_curricula.cli import _KNOWN_CURRICULA
+from aind_behavior_vr_foraging_curricula.schema_bundle import (
+    DEFINITIONS_NAME,
+    SchemaBundle,
+    bundle_curriculum,
+    dump_definitions,
+)
+from aind_behavior_vr_foraging_curricula.stage_store import referenced_hashes
 
+logger = logging.getLogger(__name__)
 
-def main(root: str = "./schema", dry_run: bool = False) -> None:
-    pathlib.Path(root).mkdir(parents=True, exist_ok=True)
-    for curriculum in _KNOWN_CURRICULA:
-        module = importlib.import_module(f"aind_behavior_vr_foraging_curricula.{curriculum}")
-        curriculum_instance: Curriculum | None = getattr(module, "CURRICULUM", None)
-        if curriculum_instance is None:
-            raise ValueError(f"Curriculum not found in module {module}")
-        serialized_schema = curriculum_instance.model_dump_json(indent=4)
-        if not dry_run:
-            with open(pathlib.Path(root) / f"{curriculum}.json", "w", encoding="utf-8") as f:
-                f.write(serialized_schema)
+PACKAGE = "aind_behavior_vr_foraging_curricula"
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+_PACKAGE_ROOT = pathlib.Path(__file__).resolve().parent
+# Imported by every curriculum, and slow to import. Imported before starting the workers, which inherit them if forked
+_PRELOAD = ("aind_behavior_vr_foraging.task_logic", "aind_behavior_vr_foraging.data_contract")
+# Imported by every curriculum for its argument and suggestion models, but does not affect the serialized curricula.
+# Neither it nor the modules only it imports are tracked, so that editing a subcommand does not regenerate everything
+_UNTRACKED_MODULES = frozenset({f"{PACKAGE}.cli"})
+# Only the distributions that define or serialize the models of the curricula are tracked, not every one imported
+_TRACKED_DISTRIBUTIONS = ("pydantic", "pydantic-core")
+_TRACKED_DISTRIBUTION_PREFIX = "aind-behavior-"
+
+
+class _Generated(t.NamedTuple):
+    schema: str
+    modules: set[str]
+
+
+def _file_hash(path: pathlib.Path) -> t.Optional[str]:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+@functools.cache
+def _distribution_version(name: str) -> t.Optional[str]:
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+@functools.cache
+def _packages_distributions() -> t.Mapping[str, list[str]]:
+    return importlib.metadata.packages_distributions()
+
+
+def _is_tracked_distribution(name: str) -> bool:
+    name = name.lower().replace("_", "-").replace(".", "-")
+    return name in _TRACKED_DISTRIBUTIONS or name.startswith(_TRACKED_DISTRIBUTION_PREFIX)
+
+
+def _distribution_versions(modules: t.Iterable[str]) -> dict[str, str]:
+    distributions: dict[str, str] = {}
+    packages = _packages_distributions()
+    for module in modules:
+        for distribution in packages.get(module, []):
+            if not _is_tracked_distribution(distribution):
+                continue
+            if (version := _distribution_version(distribution)) is not None:
+                distributions[distribution] = version
+    return dict(sorted(distributions.items()))
+
+
+def _module_path(name: str) -> t.Optional[pathlib.Path]:
+    if name != PACKAGE and not name.startswith(PACKAGE + "."):
+        return None
+    base = _PACKAGE_ROOT.joinpath(*name.split(".")[1:])
+    if (base / "__init__.py").is_file():
+        return base / "__init__.py"
+    if base.with_suffix(".py").is_file():
+        return base.with_suffix(".py")
+    return None
+
+
+def _import_time_nodes(tree: ast.Module) -> t.Iterator[ast.AST]:
+    # Skips the bodies of functions, whose imports are deferred until they are called
+    pending: list[ast.AST] = [tree]
+    while pending:
+        node = pending.pop()
+        yield node
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+            pending.extend(ast.iter_child_nodes(node))
+
+
+@functools.cache
+def _imported_modules(name: str) -> frozenset[str]:
+    """Names of the package modules imported when a package module is imported, including under `TYPE_CHECKING`."""
+    path = _module_path(name)
+    assert path is not None
+    parts = name.split(".") if path.name == "__init__.py" else name.split(".")[:-1]
+    imported: set[str] = set()
+    for node in _import_time_nodes(ast.parse(path.read_bytes())):
+        if isinstance(node, ast.Import):
+            imported.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            module = ".".join(parts[: len(parts) - node.level + 1]) if node.level else ""
+            module = ".".join(filter(None, (module, node.module)))
+            # Imported names may be submodules
+            imported.update([module, *(f"{module}.{alias.name}" for alias in node.names)])
+    # Importing a module imports its parent packages
+    for module in list(imported):
+        while "." in module:
+            module = module.rpartition(".")[0]
+            imported.add(module)
+    return frozenset(module for module in imported if _module_path(module) is not None)
+
+
+def _source_dependencies(name: str) -> dict[str, t.Optional[str]]:
+    """Hashes of the sources of a package module and of the package modules it transitively imports."""
+    modules, pending = {name}, [name]
+    while pending:
+        for module in _imported_modules(pending.pop()):
+            if module not in modules and module not in _UNTRACKED_MODULES:
+                modules.add(module)
+                pending.append(module)
+    sources = {}
+    for module in modules:
+        path = _module_path(module)
+        assert path is not None
+        sources[path.relative_to(_PACKAGE_ROOT).as_posix()] = _file_hash(path)
+    return dict(sorted(sources.items()))
+
+
+def _generate(curriculum: str) -> _Generated:
+    module = importlib.import_module(f"{PACKAGE}.{curriculum}")
+    curriculum_instance: Curriculum | None = getattr(module, "CURRICULUM", None)
+    if curriculum_instance is None:
+        raise ValueError(f"Curriculum not found in module {module}")
+    modules = {name.partition(".")[0] for name in list(sys.modules)}
+    return _Generated(curriculum_instance.model_dump_json(indent=4), modules)
+
+
+def _read_manifest(root: pathlib.Path, bundle: bool) -> dict[str, t.Any]:
+    try:
+        manifest = json.loads((root / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    # Files of the other format, or bundles whose definitions changed, are regenerated
+    if manifest.get("bundle", False) != bundle:
+        return {}
+    if bundle and _file_hash(root / DEFINITIONS_NAME) != manifest.get("definitions"):
+        return {}
+    return manifest.get("curricula", {})
+
+
+def _write_if_changed(path: pathlib.Path, content: bytes, dry_run: bool) -> bool:
+    if _file_hash(path) == hashlib.sha256(content).hexdigest():
+        return False
+    if not dry_run:
+        path.write_bytes(content)
+    return True
+
+
+def _is_fresh(entry: t.Optional[dict[str, t.Any]], output: pathlib.Path) -> bool:
+    """Whether the schema of a curriculum is up to date with the sources and distributions it was generated from."""
+    if not entry or _file_hash(output) != entry.get("output"):
+        return False
+    if any(_file_hash(_PACKAGE_ROOT / source) != digest for source, digest in entry.get("sources", {}).items()):
+        return False
+    return all(_distribution_version(name) == version for name, version in entry.get("distributions", {}).items())
+
+
+def main(
+    root: str | os.PathLike = "./schema",
+    dry_run: bool = False,
+    force: bool = False,
+    max_workers: t.Optional[int] = None,
+    bundle: bool = False,
+) -> list[str]:
+    """Serializes every known curriculum to `<root>/<curriculum>.json`.
+
+    A manifest (`<root>/.manifest.json`) records, for each curriculum, the hashes of the package
+    modules it imports (found by parsing their module-level imports), the versions of the distributions
+    imported while generating it, and the hash of the schema file. Curricula whose inputs and
+    schema file are unchanged are skipped, the others are generated in a process pool. Files
+    are only rewritten if their content changes.
+
+    As a bundle, the task logic of every stage is saved once, by hash, to `<root>/_defs.json`,
+    and referenced as `{"$ref": "sha256:<hash>"}` by the curricula (see `schema_bundle.SchemaBundle`
+    to load them).
+
+    Args:
+        root: Directory to save the schema files to.
+        dry_run: Generates the schemas without writing the schema files nor the manifest.
+        force: Regenerates every curriculum, ignoring the manifest.
+        max_workers: Number of worker processes. Defaults to the number of CPUs.
+            If 1, curricula are generated sequentially in the current process.
+        bundle: Saves the curricula as a bundle with shared definitions.
+
+    Returns:
+        The curricula whose schema file was written (or would have been, if `dry_run`).
+    """
+    root = pathlib.Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = {} if force else _read_manifest(root, bundle)
+    stale = [c for c in _KNOWN_CURRICULA if force or not _is_fresh(manifest.get(c), root / f"{c}.json")]
+    logger.info("Generating %d of %d curricula: %s", len(stale), len(_KNOWN_CURRICULA), stale)
+
+    generated: dict[str, _Generated] = {}
+    max_workers = min(max_workers or os.cpu_count() or 1, len(stale))
+    if max_workers <= 1:
+        generated = {curriculum: _generate(curriculum) for curriculum in stale}
+    else:
+        for module in _PRELOAD:
+            importlib.import_module(module)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            generated = dict(zip(stale, executor.map(_generate, stale)))
+
+    written = []
+    definitions = SchemaBundle(root).definitions if bundle else {}
+    contents: dict[str, bytes] = {}
+    for curriculum, result in generated.items():
+        if bundle:
+            document = bundle_curriculum(json.loads(result.schema), definitions)
+            contents[curriculum] = json.dumps(document, indent=4, ensure_ascii=False).encode("utf-8")
+        else:
+            contents[curriculum] = result.schema.encode("utf-8")
+        if _write_if_changed(root / f"{curriculum}.json", contents[curriculum], dry_run):
+            written.append(curriculum)
+        manifest[curriculum] = {
+            "output": hashlib.sha256(contents[curriculum]).hexdigest(),
+            "sources": _source_dependencies(f"{PACKAGE}.{curriculum}"),
+            "distributions": _distribution_versions(result.modules),
+        }
+
+    header: dict[str, t.Any] = {"version": MANIFEST_VERSION, "bundle": bundle}
+    if bundle:
+        # Only the definitions referenced by the curricula, generated or not, are kept
+        referenced: set[str] = set()
+        for curriculum in _KNOWN_CURRICULA:
+            path = root / f"{curriculum}.json"
+            content = contents.get(curriculum) or (path.read_bytes() if path.exists() else b"")
+            referenced.update(referenced_hashes(content))
+        definitions_content = dump_definitions({h: definitions[h] for h in referenced}).encode("utf-8")
+        _write_if_changed(root / DEFINITIONS_NAME, definitions_content, dry_run)
+        header["definitions"] = hashlib.sha256(definitions_content).hexdigest()
+
+    if not dry_run and generated:
+        manifest = {c: manifest[c] for c in _KNOWN_CURRICULA if c in manifest}
+        (root / MANIFEST_NAME).write_text(
+            json.dumps({**header, "curricula": manifest}, indent=4) + "\n", encoding="utf-8"
+        )
+    return written
 
 
 if __name__ == "__main__":
@@ -27,6 +272,14 @@ if __name__ == "__main__":
         "--root", type=pathlib.Path, default=pathlib.Path("./schema"), help="Root directory to save the schema files"
     )
     parser.add_argument("--dry-run", action="store_true", help="If set, do not write schema files to disk.")
+    parser.add_argument("--force", action="store_true", help="If set, regenerate every curriculum.")
+    parser.add_argument(
+        "--bundle", action="store_true", help="If set, save the task logic of the stages once, in a shared _defs.json."
+    )
+    parser.add_argument(
+        "--max-workers", type=int, default=None, help="Number of worker processes. Defaults to the number of CPUs."
+    )
 
     args = parser.parse_args()
-    main(args.root, args.dry_run)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main(args.root, args.dry_run, args.force, args.max_workers, args.bundle)
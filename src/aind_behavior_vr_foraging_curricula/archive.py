@@ -0,0 +1,250 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+import typing as t
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trainer_states (
+    path TEXT PRIMARY KEY,
+    subject TEXT,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    curriculum TEXT,
+    curriculum_version TEXT,
+    pkg_location TEXT,
+    stage TEXT,
+    is_on_curriculum INTEGER,
+    active_policies TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS trainer_states_by_curriculum_stage ON trainer_states (curriculum, stage);
+CREATE INDEX IF NOT EXISTS trainer_states_by_stage ON trainer_states (stage);
+CREATE INDEX IF NOT EXISTS trainer_states_by_subject ON trainer_states (subject);
+"""
+_COLUMNS = (
+    "path, subject, mtime_ns, size, curriculum, curriculum_version, pkg_location, stage, is_on_curriculum, "
+    "active_policies, error"
+)
+_CHUNK_SIZE = 64
+
+
+class IndexedTrainerState(BaseModel):
+    """The fields of an archived trainer state that are indexed."""
+
+    path: str = Field(description="Path of the trainer state, relative to the archive.")
+    subject: t.Optional[str] = Field(
+        default=None, description="The subject, i.e. the top-level directory of the trainer state in the archive."
+    )
+    curriculum: t.Optional[str] = Field(default=None, description="The name of the curriculum.")
+    curriculum_version: t.Optional[str] = Field(default=None, description="The version of the curriculum.")
+    pkg_location: t.Optional[str] = Field(default=None, description="The package location of the curriculum.")
+    stage: t.Optional[str] = Field(default=None, description="The name of the current stage.")
+    is_on_curriculum: t.Optional[bool] = Field(default=None, description="Whether the subject is on the curriculum.")
+    active_policies: list[str] = Field(default_factory=list, description="The names of the active policies.")
+    error: t.Optional[str] = Field(default=None, description="Why the file could not be read, if it could not.")
+
+
+class IndexUpdate(BaseModel):
+    n_files: int = Field(description="Number of trainer states in the archive.")
+    n_indexed: int = Field(description="Number of new or modified trainer states that were read.")
+    n_removed: int = Field(description="Number of trainer states removed from the archive since the last update.")
+    n_errors: int = Field(description="Number of the read trainer states that could not be indexed.")
+    seconds: float = Field(description="Wall time of the update, in seconds.")
+
+
+def scan_trainer_state(document: str | bytes) -> dict[str, t.Any]:
+    """Reads the indexed fields of a serialized trainer state, without validating it.
+
+    The document is only parsed as JSON, without building the trainer state model.
+
+    Raises:
+        ValueError: If the document is not JSON, or not shaped like a trainer state.
+    """
+    trainer_state = json.loads(document)
+    if not isinstance(trainer_state, dict):
+        raise ValueError("Trainer state must be a JSON object.")
+    curriculum = trainer_state.get("curriculum") or {}
+    stage = trainer_state.get("stage") or {}
+    policies = trainer_state.get("active_policies") or []
+    if not isinstance(curriculum, dict) or not isinstance(stage, dict) or not isinstance(policies, list):
+        raise ValueError("Trainer state is not shaped like a trainer state.")
+    is_on_curriculum = trainer_state.get("is_on_curriculum")
+    return {
+        "curriculum": _str_or_none(curriculum.get("name")),
+        "curriculum_version": _str_or_none(curriculum.get("version")),
+        "pkg_location": _str_or_none(curriculum.get("pkg_location")),
+        "stage": _str_or_none(stage.get("name")),
+        "is_on_curriculum": is_on_curriculum if isinstance(is_on_curriculum, bool) else None,
+        "active_policies": [policy for policy in policies if isinstance(policy, str)],
+    }
+
+
+def _str_or_none(value: t.Any) -> t.Optional[str]:
+    return value if isinstance(value, str) else None
+
+
+def _scan_file(root: Path, path: str, mtime_ns: int, size: int) -> tuple[t.Any, ...]:
+    subject = path.split("/", 1)[0] if "/" in path else None
+    try:
+        fields = scan_trainer_state((root / path).read_bytes())
+    except (OSError, ValueError) as e:
+        fields = {"error": f"{type(e).__name__}: {e}"}
+    policies = fields.get("active_policies")
+    return (
+        path,
+        subject,
+        mtime_ns,
+        size,
+        fields.get("curriculum"),
+        fields.get("curriculum_version"),
+        fields.get("pkg_location"),
+        fields.get("stage"),
+        fields.get("is_on_curriculum"),
+        json.dumps(policies) if policies is not None else None,
+        fields.get("error"),
+    )
+
+
+def _scan_files(root: Path, files: list[tuple[str, int, int]]) -> list[tuple[t.Any, ...]]:
+    return [_scan_file(root, *file) for file in files]
+
+
+def _list_files(root: Path) -> dict[str, tuple[int, int]]:
+    """Modification time and size of every JSON file under a directory, by path relative to it."""
+    files: dict[str, tuple[int, int]] = {}
+    pending = [root]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(Path(entry.path))
+                elif entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    files[Path(entry.path).relative_to(root).as_posix()] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class ArchiveIndex:
+    """SQLite index of an archive of serialized trainer states.
+
+    One row is kept per file, with its curriculum, stage, whether it is on the curriculum
+    and its active policies, so that questions like "which subjects are in a stage" are
+    queries rather than validating every trainer state of the archive. Updates only read
+    the files that are new, or whose modification time or size changed, since the last
+    update.
+    """
+
+    def __init__(self, path: os.PathLike | str) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self._path)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, _SCHEMA_VERSION):
+                raise ValueError(f"Unsupported archive index schema version {version} in {self._path}.")
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "ArchiveIndex":
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def update(self, root: os.PathLike | str, max_workers: t.Optional[int] = None) -> IndexUpdate:
+        """Indexes the new and modified trainer states of an archive, and forgets the removed ones.
+
+        Args:
+            root: The archive directory. Every `.json` file under it is considered a trainer state.
+            max_workers: Number of worker processes reading the files. Defaults to the number of CPUs.
+                If 1, files are read sequentially in the current process.
+        """
+        start = time.perf_counter()
+        root = Path(root).resolve()
+        files = _list_files(root)
+        indexed = {
+            row["path"]: (row["mtime_ns"], row["size"])
+            for row in self._connection.execute("SELECT path, mtime_ns, size FROM trainer_states")
+        }
+        removed = [path for path in indexed if path not in files]
+        changed = [(path, *stat) for path, stat in files.items() if indexed.get(path) != stat]
+        chunks = [changed[i : i + _CHUNK_SIZE] for i in range(0, len(changed), _CHUNK_SIZE)]
+
+        max_workers = min(max_workers or os.cpu_count() or 1, len(chunks))
+        if max_workers <= 1:
+            n_errors = self._write(removed, (_scan_files(root, chunk) for chunk in chunks))
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                n_errors = self._write(removed, executor.map(_scan_files, [root] * len(chunks), chunks))
+        update = IndexUpdate(
+            n_files=len(files),
+            n_indexed=len(changed),
+            n_removed=len(removed),
+            n_errors=n_errors,
+            seconds=time.perf_counter() - start,
+        )
+        logger.info("Indexed %s", update)
+        return update
+
+    def _write(self, removed: list[str], scanned: t.Iterable[list[tuple[t.Any, ...]]]) -> int:
+        # A single transaction, so that an interrupted update leaves the index as it was
+        n_errors = 0
+        with self._connection:
+            self._connection.executemany("DELETE FROM trainer_states WHERE path = ?", [(path,) for path in removed])
+            for rows in scanned:
+                n_errors += sum(row[-1] is not None for row in rows)
+                self._connection.executemany(
+                    f"INSERT OR REPLACE INTO trainer_states ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        return n_errors
+
+    def query(
+        self,
+        curriculum: t.Optional[str] = None,
+        stage: t.Optional[str] = None,
+        subject: t.Optional[str] = None,
+        is_on_curriculum: t.Optional[bool] = None,
+    ) -> list[IndexedTrainerState]:
+        """Returns the indexed trainer states matching every given field, ordered by path."""
+        conditions = {
+            "curriculum": curriculum,
+            "stage": stage,
+            "subject": subject,
+            "is_on_curriculum": is_on_curriculum,
+        }
+        conditions = {column: value for column, value in conditions.items() if value is not None}
+        where = " AND ".join(f"{column} = ?" for column in conditions) or "1"
+        rows = self._connection.execute(
+            f"SELECT {_COLUMNS} FROM trainer_states WHERE {where} ORDER BY path", tuple(conditions.values())
+        )
+        return [_indexed_from_row(row) for row in rows]
+
+    def subjects(self, curriculum: t.Optional[str] = None, stage: t.Optional[str] = None) -> list[str]:
+        """Returns the subjects with a trainer state in a curriculum and stage."""
+        return sorted({state.subject for state in self.query(curriculum, stage) if state.subject is not None})
+
+
+def _indexed_from_row(row: sqlite3.Row) -> IndexedTrainerState:
+    values = dict(row)
+    values["active_policies"] = json.loads(values["active_policies"]) if values["active_policies"] else []
+    is_on_curriculum = values["is_on_curriculum"]
+    values["is_on_curriculum"] = bool(is_on_curriculum) if is_on_curriculum is not None else None
+    return IndexedTrainerState.model_validate(values)
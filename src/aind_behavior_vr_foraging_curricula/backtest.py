@@ -0,0 +1,199 @@
+import json
+import logging
+import os
+import tempfile
+import typing as t
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from .batch import BatchOptions, _initialize_worker, read_manifest_rows
+from .settings import CurriculumInitArguments, CurriculumRunArguments
+
+logger = logging.getLogger(__name__)
+
+
+class BacktestSession(BaseModel):
+    subject: str = Field(description="The subject of the session.")
+    data_directory: Path = Field(description="Path to the session data directory.")
+    stage: t.Optional[str] = Field(default=None, description="The stage the session was actually run in.")
+    input_trainer_state: t.Optional[Path] = Field(
+        default=None,
+        description="Trainer state to start the replay of the subject from. Only read for its first session.",
+    )
+    curriculum: t.Optional[str] = Field(
+        default=None, description="Forces the use of a specific curriculum, bypassing any automatic detection."
+    )
+
+
+class ReplayedSession(BaseModel):
+    data_directory: Path = Field(description="Path to the session data directory.")
+    actual_stage: t.Optional[str] = Field(description="The stage the session was actually run in, if known.")
+    replayed_stage: str = Field(description="The stage the session would have been run in with the current code.")
+    suggested_stage: t.Optional[str] = Field(description="The stage suggested after the session by the replay.")
+
+    @property
+    def diverged(self) -> bool:
+        return self.actual_stage is not None and self.actual_stage != self.replayed_stage
+
+
+class BacktestResult(BaseModel):
+    subject: str = Field(description="The subject that was replayed.")
+    success: bool = Field(description="Whether every session of the subject was replayed.")
+    sessions: list[ReplayedSession] = Field(description="The replayed sessions, in order.")
+    divergences: list[int] = Field(
+        description="Indices of the sessions whose replayed stage differs from the actual stage."
+    )
+    first_divergence: t.Optional[int] = Field(description="Index of the first diverging session, if any.")
+    error: t.Optional[str] = Field(default=None, description="The error message, if unsuccessful.")
+    error_type: t.Optional[str] = Field(default=None, description="The error type, if unsuccessful.")
+
+
+def read_backtest_manifest(path: os.PathLike | str) -> dict[str, list[BacktestSession]]:
+    """Reads a backtest manifest, in the formats of `batch.read_manifest`.
+
+    Relative paths are relative to the directory of the manifest.
+
+    Returns:
+        The sessions of each subject, in manifest order.
+    """
+    subjects: dict[str, list[BacktestSession]] = {}
+    for row in read_manifest_rows(path, ("data_directory", "input_trainer_state")):
+        session = BacktestSession.model_validate(row)
+        subjects.setdefault(session.subject, []).append(session)
+    return subjects
+
+
+def _initial_trainer_state(session: BacktestSession) -> bytes:
+    if session.input_trainer_state is not None:
+        return Path(session.input_trainer_state).read_bytes()
+    if session.curriculum is None:
+        raise ValueError(
+            f"The first session of subject {session.subject} needs an input_trainer_state or a curriculum."
+        )
+    # Enrolled in the stage the subject actually started in, so that the trajectories start aligned
+    init = CurriculumInitArguments(curriculum=session.curriculum, stage=session.stage)
+    return init.create_trainer_state().model_dump_json().encode()
+
+
+def _actual_stages(
+    subject: str, sessions: t.Sequence[BacktestSession], history: t.Optional[Path]
+) -> list[t.Optional[str]]:
+    stages = [session.stage for session in sessions]
+    if history is None or all(stage is not None for stage in stages):
+        return stages
+
+    from .history import HistoryStore, session_info_from_dataset
+
+    with HistoryStore(history) as store:
+        for i, session in enumerate(sessions):
+            if stages[i] is None and (info := session_info_from_dataset(session.data_directory)) is not None:
+                record = store.get(subject, info.session)
+                stages[i] = record.stage if record is not None else None
+    return stages
+
+
+def backtest_subject(
+    subject: str,
+    sessions: t.Sequence[BacktestSession],
+    options: BatchOptions = BatchOptions(),
+    history: t.Optional[Path] = None,
+) -> BacktestResult:
+    """Replays the curriculum over the sessions of a subject, feeding each suggestion to the next session.
+
+    The metrics of every session are computed by the current code, with the stage suggested
+    by the replay rather than the one the session was run in. Errors are reported in the
+    result instead of being raised, together with the sessions replayed before the error.
+
+    Args:
+        subject: The subject to replay.
+        sessions: The sessions of the subject, in the order they were run.
+        options: Options shared by every session.
+        history: A history database (see `history.HistoryStore`) to read the stages the sessions
+            were actually run in from, for sessions without a `stage`.
+    """
+    replayed: list[ReplayedSession] = []
+    error: t.Optional[Exception] = None
+    try:
+        actual_stages = _actual_stages(subject, sessions, history)
+        trainer_state_json = _initial_trainer_state(sessions[0])
+        stage = (json.loads(trainer_state_json).get("stage") or {}).get("name")
+        with tempfile.TemporaryDirectory() as tmp:
+            trainer_state_path = Path(tmp) / "trainer_state.json"
+            for session, actual_stage in zip(sessions, actual_stages):
+                if stage is None:
+                    raise ValueError("Trainer state does not have a stage.")
+                trainer_state_path.write_bytes(trainer_state_json)
+                args = CurriculumRunArguments(
+                    data_directory=session.data_directory,
+                    input_trainer_state=trainer_state_path,
+                    curriculum=session.curriculum,
+                    loader_workers=options.loader_workers,
+                    no_cache=options.no_cache,
+                    cache_directory=options.cache_directory,
+                )
+                trainer_state = args.compute_suggestion().trainer_state
+                trainer_state_json = trainer_state.model_dump_json().encode()
+                suggested_stage = trainer_state.stage.name if trainer_state.stage is not None else None
+                replayed.append(
+                    ReplayedSession(
+                        data_directory=session.data_directory,
+                        actual_stage=actual_stage,
+                        replayed_stage=stage,
+                        suggested_stage=suggested_stage,
+                    )
+                )
+                stage = suggested_stage
+    except Exception as e:
+        error = e
+    divergences = [i for i, session in enumerate(replayed) if session.diverged]
+    return BacktestResult(
+        subject=subject,
+        success=error is None,
+        sessions=replayed,
+        divergences=divergences,
+        first_divergence=divergences[0] if divergences else None,
+        error=str(error) if error is not None else None,
+        error_type=type(error).__name__ if error is not None else None,
+    )
+
+
+def _backtest_subject_json(
+    subject: str, sessions: list[BacktestSession], options: BatchOptions, history: t.Optional[Path]
+) -> str:
+    # Serialized in the worker, like `batch.evaluate_entry`
+    return backtest_subject(subject, sessions, options, history).model_dump_json()
+
+
+def run_backtest(
+    subjects: t.Mapping[str, t.Sequence[BacktestSession]],
+    options: BatchOptions = BatchOptions(),
+    max_workers: t.Optional[int] = None,
+    history: t.Optional[Path] = None,
+) -> t.Iterator[str]:
+    """Replays the sessions of many subjects across a process pool, one subject per task.
+
+    Args:
+        subjects: The ordered sessions of each subject.
+        options: Options shared by every session.
+        max_workers: Number of worker processes. Defaults to the number of CPUs.
+            If 1, subjects are replayed sequentially in the current process.
+        history: A history database to read the stages the sessions were actually run in from.
+
+    Yields:
+        One `BacktestResult` per subject serialized as JSON, in completion order.
+    """
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(subjects), 1))
+    if max_workers <= 1:
+        for subject, sessions in subjects.items():
+            yield _backtest_subject_json(subject, list(sessions), options, history)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_initialize_worker) as executor:
+        futures = [
+            executor.submit(_backtest_subject_json, subject, list(sessions), options, history)
+            for subject, sessions in subjects.items()
+        ]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,143 @@
+import csv
+import importlib
+import json
+import logging
+import os
+import typing as t
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from pydantic import BaseModel, Field, SerializeAsAny
+
+from .cli import _KNOWN_CURRICULA, CurriculumSuggestion
+from .settings import CurriculumRunArguments
+
+logger = logging.getLogger(__name__)
+
+
+class BatchEntry(BaseModel):
+    data_directory: Path = Field(description="Path to the session data directory.")
+    input_trainer_state: Path = Field(description="Path to a deserialized trainer state.")
+    output_suggestion: t.Optional[Path] = Field(
+        default=None, description="Directory to save the suggestion to. If not provided, it is not saved to a file."
+    )
+    curriculum: t.Optional[str] = Field(
+        default=None, description="Forces the use of a specific curriculum, bypassing any automatic detection."
+    )
+
+
+class BatchResult(BaseModel):
+    entry: BatchEntry = Field(description="The manifest entry that was evaluated.")
+    success: bool = Field(description="Whether the suggestion was computed successfully.")
+    suggestion: t.Optional[SerializeAsAny[CurriculumSuggestion]] = Field(
+        default=None, description="The suggestion, if successful."
+    )
+    error: t.Optional[str] = Field(default=None, description="The error message, if unsuccessful.")
+    error_type: t.Optional[str] = Field(default=None, description="The error type, if unsuccessful.")
+
+
+class SerializedBatchResult(t.NamedTuple):
+    """A `BatchResult` serialized in the worker, to avoid pickling the suggestion models."""
+
+    success: bool
+    json: str
+
+
+class BatchOptions(BaseModel):
+    """Options shared by every entry of a batch."""
+
+    loader_workers: t.Optional[int] = None
+    no_cache: bool = False
+    cache_directory: t.Optional[Path] = None
+
+
+def read_manifest(path: os.PathLike | str) -> list[BatchEntry]:
+    """Reads a batch manifest.
+
+    Files with a ".csv" extension are read as CSV with a header row. Anything else is read
+    as JSON lines. Both formats use the field names of `BatchEntry`; empty values are ignored.
+    Relative paths are relative to the directory of the manifest.
+    """
+    rows = read_manifest_rows(path, ("data_directory", "input_trainer_state", "output_suggestion"))
+    return [BatchEntry.model_validate(row) for row in rows]
+
+
+def read_manifest_rows(path: os.PathLike | str, path_fields: t.Iterable[str] = ()) -> list[dict[str, t.Any]]:
+    """Reads the rows of a CSV (".csv") or JSON lines manifest, without their empty values.
+
+    Args:
+        path: The path of the manifest.
+        path_fields: Fields holding paths, which are resolved against the directory of the manifest
+            when relative.
+    """
+    path = Path(path)
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        if path.suffix.lower() == ".csv":
+            rows: t.Iterable[dict[str, t.Any]] = csv.DictReader(file)
+        else:
+            rows = (json.loads(line) for line in file if line.strip())
+        rows = [{k: v for k, v in row.items() if v not in (None, "")} for row in rows]
+    for row in rows:
+        for field in path_fields:
+            if isinstance(value := row.get(field), str):
+                # Joining keeps absolute paths as they are
+                row[field] = str(path.parent / value)
+    return rows
+
+
+def evaluate_entry(entry: BatchEntry, options: BatchOptions = BatchOptions()) -> SerializedBatchResult:
+    """Evaluates a single manifest entry and returns its result serialized as JSON.
+
+    Errors are reported in the result instead of being raised, so that one bad session
+    does not abort the whole batch.
+    """
+    try:
+        args = CurriculumRunArguments(
+            data_directory=entry.data_directory,
+            input_trainer_state=entry.input_trainer_state,
+            output_suggestion=entry.output_suggestion,
+            curriculum=entry.curriculum,
+            loader_workers=options.loader_workers,
+            no_cache=options.no_cache,
+            cache_directory=options.cache_directory,
+        )
+        suggestion = args.compute_suggestion()
+        if entry.output_suggestion is not None:
+            with open(entry.output_suggestion / "suggestion.json", "w", encoding="utf-8") as file:
+                file.write(suggestion.model_dump_json(indent=2))
+        result = BatchResult(entry=entry, success=True, suggestion=suggestion)
+    except Exception as e:
+        result = BatchResult(entry=entry, success=False, error=str(e), error_type=type(e).__name__)
+    return SerializedBatchResult(result.success, result.model_dump_json())
+
+
+def _initialize_worker() -> None:
+    # Pays the curricula import and build cost once per worker instead of once per entry
+    for curriculum in _KNOWN_CURRICULA:
+        getattr(importlib.import_module(f"{__package__}.{curriculum}"), "TRAINER")
+
+
+def run_batch(
+    entries: t.Sequence[BatchEntry], options: BatchOptions = BatchOptions(), max_workers: t.Optional[int] = None
+) -> t.Iterator[SerializedBatchResult]:
+    """Evaluates manifest entries across a process pool.
+
+    Args:
+        entries: The entries to evaluate.
+        options: Options shared by every entry.
+        max_workers: Number of worker processes. Defaults to the number of CPUs.
+            If 1, entries are evaluated sequentially in the current process.
+
+    Yields:
+        One serialized result per entry (see `BatchResult`), in completion order.
+    """
+    max_workers = min(max_workers or os.cpu_count() or 1, max(len(entries), 1))
+    if max_workers <= 1:
+        for entry in entries:
+            yield evaluate_entry(entry, options)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_initialize_worker) as executor:
+        futures = [executor.submit(evaluate_entry, entry, options) for entry in entries]
+        for future in as_completed(futures):
+            yield future.result()
@@ -1,14 +1,25 @@
+import contextlib
+import cProfile
+import datetime
 import importlib
+import json
 import os
 import typing as t
 from pathlib import Path
 
 import aind_behavior_curriculum
-from pydantic import BaseModel, Field, RootModel, SerializeAsAny
+from pydantic import BaseModel, Field, PrivateAttr, RootModel, SerializeAsAny
 from pydantic_settings import BaseSettings, CliApp, CliImplicitFlag, CliSubCommand
 
 from . import __version__, curricula_logger
-from .utils import model_from_json_file
+from .metrics_cache import MetricsCache, default_cache_directory, use_metrics_cache
+from .phases import PhaseRecorder, phase, record_phases
+from .stage_store import StageStore, has_references
+from .streams import loader_workers
+from .utils import pkg_location_from_json
+
+if t.TYPE_CHECKING:
+    from .history import HistoryStore
 
 TModel = t.TypeVar("TModel", bound=BaseModel)
 TTrainerState = t.TypeVar("TTrainerState", bound=aind_behavior_curriculum.TrainerState)
@@ -50,43 +61,225 @@ class CurriculumCliArgs(BaseSettings):
     curriculum: t.Optional[str] = Field(
         default=None, description="Forces the use of a specific curriculum, bypassing any automatic detection."
     )
+    loader_workers: t.Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of threads used to load the session data streams. Use 1 to load sequentially.",
+    )
+    no_cache: CliImplicitFlag[bool] = Field(
+        default=False,
+        description="Disables the on-disk caches of the metrics and of the columnar events read from a session.",
+    )
+    cache_directory: t.Optional[os.PathLike] = Field(
+        default=None,
+        description="Root directory of the caches. Defaults to ~/.cache/aind_behavior_vr_foraging_curricula.",
+    )
+    server: t.Optional[str] = Field(
+        default=None,
+        description="URL of a running `curriculum serve` instance (e.g. http://127.0.0.1:8765) to run the "
+        "curriculum in. Falls back to running in-process if the server is unavailable.",
+    )
+    timings: t.Optional[os.PathLike] = Field(
+        default=None,
+        description="Path to save the wall time and CPU time of each phase of the run (e.g. import, metrics) as JSON.",
+    )
+    trace_memory: CliImplicitFlag[bool] = Field(
+        default=False,
+        description="Adds the peak memory of each phase to the timings. Slows down the run, imports in particular.",
+    )
+    profile: t.Optional[os.PathLike] = Field(
+        default=None, description="Path to save a cProfile dump of the run (e.g. to inspect with snakeviz)."
+    )
+    output_format: t.Literal["full", "slim"] = Field(
+        default="full",
+        description="Format of the suggestion. 'slim' only includes the stage name, a hash of its task logic, the "
+        "metrics and a JSON patch (RFC 6902) from the input trainer state to the suggested one.",
+    )
+    history: t.Optional[os.PathLike] = Field(
+        default=None,
+        description="Path to a SQLite history database to append the metrics of the session to. "
+        "The subject and session name are read from the session schema.",
+    )
+    subject: t.Optional[str] = Field(
+        default=None, description="Subject recorded in the history, overriding the one of the session schema."
+    )
+    stage_store: t.Optional[os.PathLike] = Field(
+        default=None,
+        description="Path to a stage store directory. Task logic references in the input trainer state are resolved "
+        "from it, and the task logic of the suggestion is stored in it and referenced by hash.",
+    )
+
+    _input_trainer_state_json: t.Optional[bytes] = PrivateAttr(default=None)
 
     def cli_cmd(self) -> None:
+        recorder = PhaseRecorder(self.trace_memory) if self.timings is not None else None
+        profiler = cProfile.Profile() if self.profile is not None else None
         try:
-            if self.curriculum:
-                curriculum_name = self.curriculum
-            else:
-                annonymous_trainer_state = model_from_json_file(
-                    self.input_trainer_state,
-                    aind_behavior_curriculum.TrainerState[aind_behavior_curriculum.Curriculum[t.Any]],
-                )
-                if (curriculum := annonymous_trainer_state.curriculum) is None:
-                    curricula_logger.error("Trainer state does not have a curriculum.")
-                    raise ValueError("Trainer state does not have a curriculum.")
-                curriculum_name = curriculum.pkg_location
-
-            curriculum_name = curriculum_name.replace(str(__package__) + ".", "")
-            if curriculum_name not in _KNOWN_CURRICULA:
-                curricula_logger.error(f"Unknown curriculum: {curriculum_name}. Available: {list(_KNOWN_CURRICULA)}")
-                raise ValueError(f"Unknown curriculum: {curriculum_name}. Available: {list(_KNOWN_CURRICULA)}")
-
-            else:
-                module = importlib.import_module(f"{__package__}.{curriculum_name}")
-                runner: t.Callable[[CurriculumCliArgs], CurriculumSuggestion] = getattr(module, "run_curriculum")
-
-            suggestion = runner(self)
-            suggestion.dsl_version = aind_behavior_curriculum.__version__
-
+            with record_phases(recorder), profiler if profiler is not None else contextlib.nullcontext():
+                self._emit_suggestion()
+        except Exception as e:
+            curricula_logger.error(f"Error occurred while running curriculum: {e}")
+            raise e
+        finally:
+            if recorder is not None and self.timings is not None:
+                with open(Path(self.timings), "w", encoding="utf-8") as file:
+                    file.write(recorder.timings.model_dump_json(indent=2))
+            if profiler is not None and self.profile is not None:
+                profiler.dump_stats(Path(self.profile))
+
+    def _emit_suggestion(self) -> None:
+        with contextlib.ExitStack() as stack:
+            store = None
+            if self.history is not None:
+                from .history import HistoryStore, use_history_store
+
+                store = stack.enter_context(HistoryStore(self.history))
+                stack.enter_context(use_history_store(store))
+            suggestion: t.Optional[CurriculumSuggestion] = None
+            suggestion_json = self._request_suggestion() if self.server is not None else None
+            if suggestion_json is None:
+                suggestion = self.compute_suggestion()
+
+            # Only the slim output, the stage store and the history need the suggestion as a JSON document
+            suggestion_document: t.Optional[dict[str, t.Any]] = None
+            if self.output_format == "slim" or self.stage_store is not None or store is not None:
+                with phase("serialize"):
+                    suggestion_document = (
+                        suggestion.model_dump(mode="json") if suggestion is not None else json.loads(suggestion_json)
+                    )
+            if store is not None:
+                with phase("history"):
+                    self._record_history(store, suggestion_document)
+
+        if self.output_format == "slim":
+            assert suggestion_document is not None
+            with phase("serialize"):
+                # Serialized once, and written as is to both sinks
+                suggestion_json = SlimCurriculumSuggestion.from_suggestion(
+                    suggestion_document, json.loads(self.read_input_trainer_state())
+                ).model_dump_json()
+            if self.stage_store is not None and (stage := suggestion_document["trainer_state"].get("stage")):
+                with phase("stage_store"):
+                    # The task logic of the suggested stage is stored under its `task_logic_hash`
+                    StageStore(self.stage_store).put(stage["task"])
+        elif self.stage_store is not None:
+            with phase("stage_store"):
+                suggestion_document = StageStore(self.stage_store).dehydrate(suggestion_document)
+                suggestion_json = json.dumps(suggestion_document, separators=(",", ":"), ensure_ascii=False)
+        elif suggestion_json is None:
+            assert suggestion is not None
+            with phase("serialize"):
+                suggestion_json = suggestion.model_dump_json()
+
+        with phase("output"):
             if not self.mute_suggestion:
-                print(suggestion.model_dump_json())
+                print(suggestion_json)
 
             if self.output_suggestion is not None:
                 with open(Path(self.output_suggestion) / "suggestion.json", "w", encoding="utf-8") as file:
-                    file.write(suggestion.model_dump_json(indent=2))
+                    if self.output_format == "slim":
+                        file.write(suggestion_json)
+                    elif suggestion is not None and self.stage_store is None:
+                        file.write(suggestion.model_dump_json(indent=2))
+                    else:
+                        document = (
+                            suggestion_document if suggestion_document is not None else json.loads(suggestion_json)
+                        )
+                        file.write(json.dumps(document, indent=2, ensure_ascii=False))
+
+    def _record_history(self, store: "HistoryStore", suggestion: dict[str, t.Any]) -> None:
+        from .history import HistoryRecord, SessionInfo, session_info_from_dataset
+
+        session_info = session_info_from_dataset(self.data_directory)
+        if session_info is None:
+            if self.subject is None:
+                curricula_logger.warning("Not recording the session in the history: it does not have a subject.")
+                return
+            session_info = SessionInfo(
+                subject=self.subject,
+                session=Path(self.data_directory).resolve().name,
+                date=datetime.datetime.fromtimestamp(Path(self.data_directory).stat().st_mtime, datetime.timezone.utc),
+            )
+        input_stage = (json.loads(self.read_input_trainer_state()).get("stage") or {}).get("name")
+        store.append(
+            HistoryRecord(
+                subject=self.subject or session_info.subject,
+                session=session_info.session,
+                date=session_info.date,
+                curriculum=self.resolve_curriculum_name(),
+                stage=input_stage,
+                suggested_stage=(suggestion["trainer_state"].get("stage") or {}).get("name"),
+                metrics=suggestion["metrics"],
+                version=suggestion.get("version"),
+            )
+        )
+
+    def _request_suggestion(self) -> t.Optional[str]:
+        from .server import ServerUnavailableError, request_suggestion
+
+        assert self.server is not None
+        try:
+            return request_suggestion(self.server, self)
+        except ServerUnavailableError as e:
+            curricula_logger.warning(f"Curriculum server unavailable ({e}). Running in-process.")
+            return None
+
+    def compute_suggestion(self) -> "CurriculumSuggestion":
+        """Runs the curriculum for the session and trainer state, without emitting the suggestion."""
+        from .columnar import ColumnarCache, use_columnar_cache
+
+        with phase("resolve_curriculum"):
+            curriculum_name = self.resolve_curriculum_name()
+        with phase("import"):
+            module = importlib.import_module(f"{__package__}.{curriculum_name}")
+            runner: t.Callable[[CurriculumCliArgs], CurriculumSuggestion] = getattr(module, "run_curriculum")
+        with phase("build_trainer"):
+            getattr(module, "TRAINER")
+
+        cache_directory = self.cache_directory or default_cache_directory()
+        metrics_cache = None if self.no_cache else MetricsCache(cache_directory)
+        columnar_cache = None if self.no_cache else ColumnarCache(cache_directory)
+        with (
+            loader_workers(self.loader_workers),
+            use_metrics_cache(metrics_cache),
+            use_columnar_cache(columnar_cache),
+            phase("run_curriculum"),
+        ):
+            suggestion = runner(self)
+        suggestion.dsl_version = aind_behavior_curriculum.__version__
+        return suggestion
+
+    def read_input_trainer_state(self) -> bytes:
+        """Returns the contents of the input trainer state file, which is only read once.
+
+        Task logic references (see `stage_store`) are resolved from the stage store.
+        """
+        if self._input_trainer_state_json is None:
+            contents = Path(self.input_trainer_state).read_bytes()
+            if self.stage_store is not None:
+                contents = StageStore(self.stage_store).rehydrate_json(contents)
+            elif has_references(contents):
+                curricula_logger.error("Trainer state references task logic, but no stage store was provided.")
+                raise ValueError("Trainer state references task logic, but no stage store was provided.")
+            self._input_trainer_state_json = contents
+        return self._input_trainer_state_json
+
+    def resolve_curriculum_name(self) -> str:
+        """Returns the name of the curriculum to run, inferring it from the trainer state if not forced."""
+        if self.curriculum:
+            curriculum_name = self.curriculum
+        else:
+            # The trainer state is fully validated by the runner, here we only need to peek at the curriculum
+            if (pkg_location := pkg_location_from_json(self.read_input_trainer_state())) is None:
+                curricula_logger.error("Trainer state does not have a curriculum.")
+                raise ValueError("Trainer state does not have a curriculum.")
+            curriculum_name = pkg_location
 
-        except Exception as e:
-            curricula_logger.error(f"Error occurred while running curriculum: {e}")
-            raise e
+        curriculum_name = curriculum_name.replace(str(__package__) + ".", "")
+        if curriculum_name not in _KNOWN_CURRICULA:
+            curricula_logger.error(f"Unknown curriculum: {curriculum_name}. Available: {list(_KNOWN_CURRICULA)}")
+            raise ValueError(f"Unknown curriculum: {curriculum_name}. Available: {list(_KNOWN_CURRICULA)}")
+        return curriculum_name
 
 
 class CurriculumInitCliArgs(BaseSettings):
@@ -99,8 +292,32 @@ class CurriculumInitCliArgs(BaseSettings):
         default=None,
         description="If provided, the enrollment will be for a specific stage in the curriculum.",
     )
+    stage_store: t.Optional[os.PathLike] = Field(
+        default=None,
+        description="Path to a stage store directory. If provided, the task logic of the stages is stored in it and "
+        "referenced by hash in the trainer state.",
+    )
 
     def cli_cmd(self) -> None:
+        init_state = self.create_trainer_state()
+        document = None
+        if self.stage_store is not None:
+            document = StageStore(self.stage_store).dehydrate(init_state.model_dump(mode="json"))
+
+        if self.output is not None:
+            with open(Path(self.output), "w", encoding="utf-8") as file:
+                if document is None:
+                    file.write(init_state.model_dump_json(indent=2))
+                else:
+                    file.write(json.dumps(document, indent=2, ensure_ascii=False))
+
+        if document is None:
+            print(init_state.model_dump_json())
+        else:
+            print(json.dumps(document, separators=(",", ":"), ensure_ascii=False))
+
+    def create_trainer_state(self) -> aind_behavior_curriculum.TrainerState:
+        """Creates the enrollment trainer state, without emitting it."""
         if self.curriculum not in _KNOWN_CURRICULA:
             curricula_logger.error(f"Unknown curriculum: {self.curriculum}. Available: {list(_KNOWN_CURRICULA)}")
             raise ValueError(f"Unknown curriculum: {self.curriculum}. Available: {list(_KNOWN_CURRICULA)}")
@@ -108,35 +325,322 @@ class CurriculumInitCliArgs(BaseSettings):
         module = importlib.import_module(f"{__package__}.{self.curriculum}")
         trainer: aind_behavior_curriculum.Trainer = getattr(module, "TRAINER")
         if self.stage is None:
-            init_state = trainer.create_enrollment()
-        else:
-            try:
-                stages = trainer.curriculum.see_stages()
-                stage = [s for s in stages if s.name == self.stage][0]
-            except IndexError:
-                curricula_logger.error(f"Unknown stage: {self.stage}")
-                curricula_logger.error(self._print_available_stages(trainer.curriculum))
-                raise ValueError(f"Unknown stage: {self.stage}. Available: {[s.name for s in stages]}")
-            else:
-                init_state = trainer.create_trainer_state(
-                    stage=stage, is_on_curriculum=True, active_policies=stage.start_policies
+            return trainer.create_enrollment()
+        try:
+            stages = trainer.curriculum.see_stages()
+            stage = [s for s in stages if s.name == self.stage][0]
+        except IndexError:
+            curricula_logger.error(f"Unknown stage: {self.stage}")
+            curricula_logger.error(self._print_available_stages(trainer.curriculum))
+            raise ValueError(f"Unknown stage: {self.stage}. Available: {[s.name for s in stages]}")
+        return trainer.create_trainer_state(stage=stage, is_on_curriculum=True, active_policies=stage.start_policies)
+
+    def _print_available_stages(self, curriculum: aind_behavior_curriculum.Curriculum) -> None:
+        print("Available stages:")
+        for stage in curriculum.see_stages():
+            print(f" - {stage.name}")
+
+
+class CurriculumBatchCliArgs(BaseSettings):
+    manifest: os.PathLike = Field(
+        description="Path to a manifest of entries to evaluate, as CSV (.csv) or JSON lines. "
+        "Columns: data_directory, input_trainer_state, and optionally output_suggestion and curriculum."
+    )
+    output: t.Optional[os.PathLike] = Field(
+        default=None, description="Path to save the results as JSON lines. If not provided, results are printed."
+    )
+    max_workers: t.Optional[int] = Field(
+        default=None, ge=1, description="Number of worker processes. Defaults to the number of CPUs."
+    )
+    loader_workers: t.Optional[int] = Field(
+        default=None, ge=1, description="Maximum number of threads used by each worker to load the session data."
+    )
+    no_cache: CliImplicitFlag[bool] = Field(
+        default=False, description="Disables the on-disk cache of the metrics computed from a session."
+    )
+    cache_directory: t.Optional[os.PathLike] = Field(default=None, description="Root directory of the metrics cache.")
+
+    def cli_cmd(self) -> None:
+        from .batch import BatchOptions, read_manifest, run_batch
+
+        entries = read_manifest(self.manifest)
+        options = BatchOptions(
+            loader_workers=self.loader_workers, no_cache=self.no_cache, cache_directory=self.cache_directory
+        )
+        n_failed = 0
+        with contextlib.ExitStack() as stack:
+            file = stack.enter_context(open(self.output, "w", encoding="utf-8")) if self.output is not None else None
+            for result in run_batch(entries, options, max_workers=self.max_workers):
+                n_failed += not result.success
+                if file is None:
+                    print(result.json, flush=True)
+                else:
+                    file.write(result.json + "\n")
+                    file.flush()
+        if n_failed > 0:
+            curricula_logger.error(f"{n_failed} of {len(entries)} entries failed.")
+            raise SystemExit(1)
+
+
+class CurriculumBacktestCliArgs(BaseSettings):
+    manifest: os.PathLike = Field(
+        description="Path to a manifest of the sessions of each subject, in the order they were run, as CSV (.csv) "
+        "or JSON lines. Columns: subject, data_directory, and optionally stage (the stage the session was run in), "
+        "input_trainer_state (to start the subject from) and curriculum."
+    )
+    output: t.Optional[os.PathLike] = Field(
+        default=None, description="Path to save the results as JSON lines. If not provided, results are printed."
+    )
+    history: t.Optional[os.PathLike] = Field(
+        default=None, description="History database to read the stages the sessions were run in from, if not given."
+    )
+    max_workers: t.Optional[int] = Field(
+        default=None, ge=1, description="Number of worker processes, each replaying a subject. Defaults to the CPUs."
+    )
+    loader_workers: t.Optional[int] = Field(
+        default=None, ge=1, description="Maximum number of threads used by each worker to load the session data."
+    )
+    no_cache: CliImplicitFlag[bool] = Field(
+        default=False, description="Disables the on-disk caches of the metrics and columnar events of the sessions."
+    )
+    cache_directory: t.Optional[os.PathLike] = Field(default=None, description="Root directory of the caches.")
+
+    def cli_cmd(self) -> None:
+        from .backtest import BacktestResult, read_backtest_manifest, run_backtest
+        from .batch import BatchOptions
+
+        subjects = read_backtest_manifest(self.manifest)
+        options = BatchOptions(
+            loader_workers=self.loader_workers, no_cache=self.no_cache, cache_directory=self.cache_directory
+        )
+        history = Path(self.history) if self.history is not None else None
+        n_diverged = n_failed = 0
+        with contextlib.ExitStack() as stack:
+            file = stack.enter_context(open(self.output, "w", encoding="utf-8")) if self.output is not None else None
+            for result_json in run_backtest(subjects, options, max_workers=self.max_workers, history=history):
+                result = BacktestResult.model_validate_json(result_json)
+                n_failed += not result.success
+                n_diverged += result.first_divergence is not None
+                if file is None:
+                    print(result_json, flush=True)
+                else:
+                    file.write(result_json + "\n")
+                    file.flush()
+        curricula_logger.info(f"{n_diverged} of {len(subjects)} subjects diverged from their actual stages.")
+        if n_failed > 0:
+            curricula_logger.error(f"{n_failed} of {len(subjects)} subjects failed.")
+            raise SystemExit(1)
+
+
+class CurriculumWatchCliArgs(BaseSettings):
+    data_directory: os.PathLike = Field(description="Path to the data directory of a running session.")
+    input_trainer_state: os.PathLike = Field(description="Path to the trainer state the session was started with.")
+    curriculum: t.Optional[str] = Field(
+        default=None, description="Forces the use of a specific curriculum, bypassing any automatic detection."
+    )
+    interval: float = Field(default=5.0, gt=0, description="Seconds between updates.")
+    max_updates: t.Optional[int] = Field(
+        default=None, ge=1, description="Stops after this many updates. If not provided, runs until interrupted."
+    )
+
+    def cli_cmd(self) -> None:
+        from .live import LiveMetricsEngine, follow
+        from .utils import trainer_state_from_json
+
+        args = CurriculumCliArgs(
+            data_directory=self.data_directory, input_trainer_state=self.input_trainer_state, curriculum=self.curriculum
+        )
+        module = importlib.import_module(f"{__package__}.{args.resolve_curriculum_name()}")
+        trainer: aind_behavior_curriculum.Trainer = getattr(module, "TRAINER")
+        trainer_state = trainer_state_from_json(args.read_input_trainer_state(), trainer)
+        engine = LiveMetricsEngine(self.data_directory, trainer, trainer_state)
+        try:
+            for status in follow(engine, self.interval, self.max_updates):
+                print(status.model_dump_json(), flush=True)
+        except KeyboardInterrupt:
+            pass
+
+
+class CurriculumConvertCliArgs(BaseSettings):
+    data_directory: os.PathLike = Field(description="Path to the session data directory.")
+    curriculum: t.Optional[str] = Field(
+        default=None,
+        description="Only converts the streams read by this curriculum. Defaults to those read by any curriculum.",
+    )
+    cache_directory: t.Optional[os.PathLike] = Field(
+        default=None,
+        description="Root directory of the caches. Defaults to ~/.cache/aind_behavior_vr_foraging_curricula.",
+    )
+
+    def cli_cmd(self) -> None:
+        from aind_behavior_vr_foraging.data_contract import dataset as vr_foraging_dataset
+        from contraqctor.contract.json import SoftwareEvents
+
+        from .columnar import ColumnarCache, load_event_columns, use_columnar_cache
+        from .streams import get_required_streams, get_stream
+
+        curricula = [self.curriculum] if self.curriculum is not None else list(_KNOWN_CURRICULA)
+        for curriculum in curricula:
+            if curriculum not in _KNOWN_CURRICULA:
+                raise ValueError(f"Unknown curriculum: {curriculum}. Available: {list(_KNOWN_CURRICULA)}")
+        paths: dict[str, None] = {}
+        for curriculum in curricula:
+            trainer: aind_behavior_curriculum.Trainer = getattr(
+                importlib.import_module(f"{__package__}.{curriculum}"), "TRAINER"
+            )
+            for stage in trainer.curriculum.see_stages():
+                if stage.metrics_provider is not None:
+                    paths.update(dict.fromkeys(get_required_streams(stage.metrics_provider.callable) or ()))
+
+        dataset = vr_foraging_dataset(self.data_directory)
+        streams = {path: get_stream(dataset, path) for path in paths}
+        software_events = [path for path, stream in streams.items() if isinstance(stream, SoftwareEvents)]
+        with use_columnar_cache(ColumnarCache(self.cache_directory or default_cache_directory())):
+            columns = load_event_columns(dataset, software_events)
+        for path in software_events:
+            if (stream_columns := columns[streams[path].name]) is None:
+                curricula_logger.warning(f"Skipping missing stream {path}")
+                continue
+            print(f"{path}: {len(stream_columns)} events")
+
+
+class CurriculumHistoryCliArgs(BaseSettings):
+    database: os.PathLike = Field(description="Path to the SQLite history database written by `run --history`.")
+    subject: str = Field(description="The subject to list the sessions of.")
+    last: int = Field(default=10, ge=1, description="Number of sessions to list, most recent first.")
+    stage: t.Optional[str] = Field(default=None, description="Only lists the sessions run in this stage.")
+
+    def cli_cmd(self) -> None:
+        from .history import HistoryStore
+
+        if not Path(self.database).exists():
+            raise FileNotFoundError(f"History database {self.database} does not exist.")
+        with HistoryStore(self.database) as store:
+            for record in store.last_sessions(self.subject, self.last, self.stage):
+                print(record.model_dump_json())
+
+
+class CurriculumIndexCliArgs(BaseSettings):
+    archive: os.PathLike = Field(
+        description="Directory of serialized trainer states. Every .json file under it is read."
+    )
+    database: os.PathLike = Field(description="Path to the SQLite index, created if it does not exist.")
+    max_workers: t.Optional[int] = Field(
+        default=None, ge=1, description="Number of worker processes reading the trainer states. Defaults to the CPUs."
+    )
+    no_update: CliImplicitFlag[bool] = Field(default=False, description="Queries the index without updating it.")
+    curriculum: t.Optional[str] = Field(default=None, description="Only lists the trainer states of this curriculum.")
+    stage: t.Optional[str] = Field(default=None, description="Only lists the trainer states in this stage.")
+    subject: t.Optional[str] = Field(default=None, description="Only lists the trainer states of this subject.")
+
+    def cli_cmd(self) -> None:
+        from .archive import ArchiveIndex
+
+        with ArchiveIndex(self.database) as index:
+            if not self.no_update:
+                update = index.update(self.archive, max_workers=self.max_workers)
+                curricula_logger.info(
+                    f"Indexed {update.n_indexed} of {update.n_files} trainer states ({update.n_errors} errors, "
+                    f"{update.n_removed} removed) in {update.seconds:.2f} s."
                 )
+            if self.curriculum is None and self.stage is None and self.subject is None:
+                return
+            for state in index.query(curriculum=self.curriculum, stage=self.stage, subject=self.subject):
+                print(state.model_dump_json())
+
+
+class CurriculumMigrateCliArgs(BaseSettings):
+    directory: os.PathLike = Field(
+        description="Directory of serialized trainer states to upgrade. Every .json file under it is migrated."
+    )
+    output: t.Optional[os.PathLike] = Field(
+        default=None,
+        description="Directory to write the migrated trainer states to, at the same relative paths. "
+        "If not provided, trainer states are migrated in place.",
+    )
+    curriculum: t.Optional[str] = Field(
+        default=None, description="Forces the use of a specific curriculum, bypassing any automatic detection."
+    )
+    reset_task: CliImplicitFlag[bool] = Field(
+        default=False,
+        description="Resets the task logic of on-curriculum trainer states to the current stage definition, "
+        "discarding the changes made by the policies. By default, the task logic is kept.",
+    )
+    stage_store: t.Optional[os.PathLike] = Field(
+        default=None, description="Path to a stage store directory, to resolve and store task logic references."
+    )
+    max_workers: t.Optional[int] = Field(
+        default=None, ge=1, description="Number of worker processes. Defaults to the number of CPUs."
+    )
+    dry_run: CliImplicitFlag[bool] = Field(default=False, description="Migrates without writing any file.")
 
+    def cli_cmd(self) -> None:
+        from .migrate import MigrationOptions, migrate_directory
+
+        options = MigrationOptions(
+            curriculum=self.curriculum, reset_task=self.reset_task, stage_store=self.stage_store, dry_run=self.dry_run
+        )
+        summary = migrate_directory(self.directory, self.output, options, max_workers=self.max_workers)
+        for failure in summary.failures:
+            print(failure.model_dump_json(), flush=True)
+        curricula_logger.info(
+            f"Migrated {summary.n_migrated} of {summary.n_files} trainer states ({summary.n_unchanged} unchanged) "
+            f"in {summary.seconds:.2f} s ({summary.files_per_second:.0f} files/s)."
+        )
+        if summary.n_failed > 0:
+            curricula_logger.error(f"{summary.n_failed} of {summary.n_files} trainer states failed.")
+
+
+class CurriculumSimulateCliArgs(BaseSettings):
+    curriculum: str = Field(description="The curriculum to simulate.")
+    n_subjects: int = Field(default=1000, ge=1, description="Number of virtual subjects.")
+    n_sessions: int = Field(default=60, ge=1, description="Number of sessions run by each subject.")
+    stage: t.Optional[str] = Field(
+        default=None, description="Stage the subjects are enrolled in. Defaults to the first stage of the curriculum."
+    )
+    seed: t.Optional[int] = Field(default=None, description="Seed of the random number generator.")
+    output: t.Optional[os.PathLike] = Field(default=None, description="Path to save the summary of the simulation.")
+
+    def cli_cmd(self) -> None:
+        from .simulation import SimulationSettings, default_metrics_model, simulate
+
+        if self.curriculum not in _KNOWN_CURRICULA:
+            raise ValueError(f"Unknown curriculum: {self.curriculum}. Available: {list(_KNOWN_CURRICULA)}")
+        trainer: aind_behavior_curriculum.Trainer = getattr(
+            importlib.import_module(f"{__package__}.{self.curriculum}"), "TRAINER"
+        )
+        settings = SimulationSettings(
+            n_subjects=self.n_subjects, n_sessions=self.n_sessions, initial_stage=self.stage, seed=self.seed
+        )
+        summary = simulate(trainer, default_metrics_model(trainer), settings).summary()
         if self.output is not None:
             with open(Path(self.output), "w", encoding="utf-8") as file:
-                file.write(init_state.model_dump_json(indent=2))
+                file.write(summary.model_dump_json(indent=2))
+        print(summary.model_dump_json())
 
-        print(init_state.model_dump_json())
 
-    def _print_available_stages(self, curriculum: aind_behavior_curriculum.Curriculum) -> None:
-        print("Available stages:")
-        for stage in curriculum.see_stages():
-            print(f" - {stage.name}")
+class CurriculumServeCliArgs(BaseSettings):
+    host: str = Field(default="127.0.0.1", description="Host to bind the server to. Only bind to trusted interfaces.")
+    port: int = Field(default=8765, ge=0, le=65535, description="Port to bind the server to.")
+
+    def cli_cmd(self) -> None:
+        from .server import serve
+
+        serve(self.host, self.port)
 
 
 class CurriculumAppCliArgs(BaseSettings, cli_prog_name="curriculum", cli_kebab_case=True):
     run: CliSubCommand[CurriculumCliArgs]
+    run_batch: CliSubCommand[CurriculumBatchCliArgs]
+    backtest: CliSubCommand[CurriculumBacktestCliArgs]
     init: CliSubCommand[CurriculumInitCliArgs]
+    serve: CliSubCommand[CurriculumServeCliArgs]
+    watch: CliSubCommand[CurriculumWatchCliArgs]
+    convert: CliSubCommand[CurriculumConvertCliArgs]
+    history: CliSubCommand[CurriculumHistoryCliArgs]
+    index: CliSubCommand[CurriculumIndexCliArgs]
+    migrate: CliSubCommand[CurriculumMigrateCliArgs]
+    simulate: CliSubCommand[CurriculumSimulateCliArgs]
     version: CliSubCommand[Version]
     dsl_version: CliSubCommand[DslVersion]
     list: CliSubCommand[ListKnownCurricula]
@@ -154,7 +658,52 @@ class CurriculumSuggestion(BaseModel, t.Generic[TTrainerState, TMetrics]):
     )
 
 
-_KNOWN_CURRICULA = [p.stem for p in Path(__file__).parent.iterdir() if p.is_dir() and not p.name.startswith("_")]
+class SlimCurriculumSuggestion(BaseModel):
+    """A `CurriculumSuggestion` without the task logic and curriculum, which the trainer state can be restored from."""
+
+    stage: t.Optional[str] = Field(description="The name of the suggested stage.")
+    task_logic_hash: t.Optional[str] = Field(
+        description="SHA-256 of the canonical JSON of the task logic of the suggested stage (see `json_patch`)."
+    )
+    metrics: dict[str, t.Any] = Field(description="The calculated metrics.")
+    input_trainer_state_hash: str = Field(description="SHA-256 of the canonical JSON of the input trainer state.")
+    trainer_state_patch: list[dict[str, t.Any]] = Field(
+        description="JSON patch (RFC 6902) that turns the input trainer state into the suggested one."
+    )
+    version: str = Field(description="The version of the curriculum.")
+    dsl_version: str = Field(description="The version of the curriculum library.")
+
+    @classmethod
+    def from_suggestion(
+        cls, suggestion: dict[str, t.Any], input_trainer_state: dict[str, t.Any]
+    ) -> "SlimCurriculumSuggestion":
+        """Builds the slim suggestion from a JSON-serialized `CurriculumSuggestion` and the input trainer state."""
+        from .json_patch import content_hash, make_patch
+
+        trainer_state = suggestion["trainer_state"]
+        stage = trainer_state.get("stage")
+        return cls(
+            stage=stage["name"] if stage is not None else None,
+            task_logic_hash=content_hash(stage["task"]) if stage is not None else None,
+            metrics=suggestion["metrics"],
+            input_trainer_state_hash=content_hash(input_trainer_state),
+            trainer_state_patch=make_patch(input_trainer_state, trainer_state),
+            version=suggestion["version"],
+            dsl_version=suggestion["dsl_version"],
+        )
+
+
+# Static registry of the curricula subpackages, each exposing the attributes of its `curriculum` module
+# (e.g. `run_curriculum`, `TRAINER`). Kept static so listing curricula does not touch the filesystem.
+_KNOWN_CURRICULA: tuple[str, ...] = (
+    "depletion",
+    "depletion_stops_offset",
+    "depletion_stops_rate",
+    "operant_conditioning",
+    "replenishment_depletion_offset",
+    "single_site_matching",
+    "template",
+)
 
 
 def main():
@@ -0,0 +1,243 @@
+import contextlib
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .extraction import infer_native_array
+from .metrics_cache import evict_least_recently_used
+from .phases import phase
+from .streams import default_max_workers, get_stream
+
+if t.TYPE_CHECKING:
+    from contraqctor.contract import DataStream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE_BYTES = 1024 * 1024 * 1024
+_FORMAT_VERSION = 1
+_COLUMN_PREFIX = "column:"
+
+_active_cache: contextvars.ContextVar[t.Optional["ColumnarCache"]] = contextvars.ContextVar(
+    "active_columnar_cache", default=None
+)
+
+
+class EventColumns:
+    """The software events of a stream, as typed columns.
+
+    The `data` of each event is flattened: fields of dictionaries become columns named
+    after the field (e.g. "state_index", "label"), and any other value becomes the "data"
+    column. Numeric and string fields are stored as native arrays; other values (nested
+    or of mixed types) are kept as JSON and decoded on access.
+    """
+
+    def __init__(
+        self, timestamp: np.ndarray, columns: dict[str, np.ndarray], json_columns: t.Iterable[str] = ()
+    ) -> None:
+        self.timestamp = timestamp
+        self._columns = columns
+        self._json_columns = set(json_columns)
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._columns
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        column = self._columns[name]
+        if name in self._json_columns:
+            decoded = np.empty(len(column), dtype=object)
+            for i, value in enumerate(column.tolist()):
+                decoded[i] = json.loads(value)
+            return decoded
+        return column
+
+    @property
+    def column_names(self) -> list[str]:
+        return list(self._columns)
+
+    @classmethod
+    def from_records(cls, timestamp: t.Sequence[float] | np.ndarray, data: t.Sequence[t.Any]) -> "EventColumns":
+        """Flattens the `data` of software events, given with their timestamps."""
+        fields: dict[str, list[t.Any]] = {}
+        if data and all(isinstance(value, dict) for value in data):
+            for name in dict.fromkeys(key for value in data for key in value):
+                fields[name] = [value.get(name) for value in data]
+        elif any(value is not None for value in data):
+            fields["data"] = list(data)
+
+        columns: dict[str, np.ndarray] = {}
+        json_columns = []
+        for name, values in fields.items():
+            if (column := infer_native_array(values)) is None:
+                column = np.array([json.dumps(value) for value in values], dtype=str)
+                json_columns.append(name)
+            columns[name] = column
+        return cls(np.asarray(timestamp, dtype=float), columns, json_columns)
+
+    def save(self, path: os.PathLike, **metadata: np.ndarray) -> None:
+        np.savez(
+            path,
+            timestamp=self.timestamp,
+            __json_columns__=np.array(sorted(self._json_columns), dtype=str),
+            **{f"{_COLUMN_PREFIX}{name}": column for name, column in self._columns.items()},
+            **metadata,
+        )
+
+    @classmethod
+    def load(cls, path: os.PathLike) -> tuple["EventColumns", dict[str, np.ndarray]]:
+        """Loads saved columns, and the metadata saved with them."""
+        with np.load(path, allow_pickle=False) as file:
+            arrays = {name: file[name] for name in file.files}
+        timestamp = arrays.pop("timestamp")
+        json_columns = arrays.pop("__json_columns__").tolist()
+        columns = {
+            name[len(_COLUMN_PREFIX) :]: arrays.pop(name) for name in list(arrays) if name.startswith(_COLUMN_PREFIX)
+        }
+        return cls(timestamp, columns, json_columns), arrays
+
+
+def columns_from_stream(stream: "DataStream") -> EventColumns:
+    """Converts a loaded software events stream (see `contraqctor.contract.json.SoftwareEvents`) into columns.
+
+    Raises:
+        Exception: The error stored in the stream, if it failed to load.
+    """
+    frame = stream.data
+    return EventColumns.from_records(frame.index.to_numpy(dtype=float), frame["data"].tolist())
+
+
+class ColumnarCache:
+    """On-disk cache of software event streams converted to columns (NumPy .npz files).
+
+    Entries are keyed by the path of the source file, and are only used while the size and
+    modification time of the source file match the ones it was converted from. The cache is
+    bounded in size, and the least recently used entries are evicted first.
+    """
+
+    def __init__(self, root: os.PathLike | str, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES) -> None:
+        self._root = Path(root) / "columnar"
+        self._max_size_bytes = max_size_bytes
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    def entry_path(self, source: os.PathLike) -> Path:
+        return self._root / f"{hashlib.sha256(str(Path(source).resolve()).encode()).hexdigest()}.npz"
+
+    def get(self, source: os.PathLike) -> t.Optional[EventColumns]:
+        """Returns the columns of a source file, or None if they are missing or out of date."""
+        path = self.entry_path(source)
+        try:
+            stat = os.stat(source)
+            columns, metadata = EventColumns.load(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Discarding unreadable columnar cache entry %s: %s", path, e)
+            path.unlink(missing_ok=True)
+            return None
+        if metadata.get("__source__", np.empty(0)).tolist() != [_FORMAT_VERSION, stat.st_size, stat.st_mtime_ns]:
+            return None
+        os.utime(path)  # Mark as recently used
+        return columns
+
+    def put(self, source: os.PathLike, columns: EventColumns, stat: os.stat_result) -> None:
+        """Stores the columns converted from a source file, given its stat at the time it was read."""
+        self._root.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=self._root, suffix=".tmp", delete=False) as f:
+            columns.save(f, __source__=np.array([_FORMAT_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64))
+        os.replace(f.name, self.entry_path(source))
+        self.evict()
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits its size limit."""
+        evict_least_recently_used(self._root, "*.npz", self._max_size_bytes)
+
+    def clear(self) -> None:
+        for path in self._root.glob("*.npz"):
+            path.unlink(missing_ok=True)
+
+
+@contextlib.contextmanager
+def use_columnar_cache(cache: t.Optional[ColumnarCache]) -> t.Iterator[t.Optional[ColumnarCache]]:
+    """Sets the columnar cache used by `load_event_columns` within the context."""
+    token = _active_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _active_cache.reset(token)
+
+
+def get_columnar_cache() -> t.Optional[ColumnarCache]:
+    """Returns the columnar cache of the current context, if any."""
+    return _active_cache.get()
+
+
+def _load_event_columns(stream: "DataStream", cache: t.Optional[ColumnarCache]) -> t.Optional[EventColumns]:
+    path = Path(stream.reader_params.path)
+    if cache is not None and (columns := cache.get(path)) is not None:
+        return columns
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if stat.st_size == 0:
+        return EventColumns.from_records([], [])
+    # DataStream.load never raises: the error stored in the stream is raised when converting it
+    columns = columns_from_stream(stream.load())
+    if cache is not None:
+        try:
+            cache.put(path, columns, stat)
+        except OSError as e:
+            logger.warning("Failed to write columnar cache entry: %s", e)
+    return columns
+
+
+def load_event_columns(
+    dataset: "DataStream", paths: t.Iterable[str], max_workers: t.Optional[int] = None
+) -> dict[str, t.Optional[EventColumns]]:
+    """Loads software event streams of a dataset as columns.
+
+    Streams are read from the active columnar cache (see `use_columnar_cache`) when it has
+    an up to date entry, and are otherwise loaded through their contraqctor data stream
+    (and stored in the cache). Like `streams.load_streams`, streams are read concurrently.
+    Missing streams are None, and empty ones have no events; any other loading error (e.g.
+    a corrupt stream) is raised.
+
+    Args:
+        dataset: The dataset to load the streams from.
+        paths: "/" separated paths of the streams, relative to the dataset root.
+        max_workers: Maximum number of loader threads. Defaults to the value set by
+            `streams.loader_workers`, or `streams.DEFAULT_MAX_WORKERS`.
+
+    Returns:
+        A dictionary of the columns keyed by stream name. Streams that are missing are None.
+
+    Raises:
+        Exception: The loading error of a stream, other than its file being missing.
+    """
+    streams: dict[str, "DataStream"] = {}
+    for path in paths:
+        stream = get_stream(dataset, path)
+        if stream.name in streams:
+            raise ValueError(f"Duplicated stream name {stream.name} in {path}.")
+        streams[stream.name] = stream
+
+    cache = get_columnar_cache()
+    max_workers = min(max_workers or default_max_workers(), len(streams))
+    with phase("load_streams"):
+        if max_workers <= 1:
+            return {name: _load_event_columns(stream, cache) for name, stream in streams.items()}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="load_event_columns") as executor:
+            return dict(zip(streams, executor.map(lambda stream: _load_event_columns(stream, cache), streams.values())))
@@ -1,3 +1,4 @@
+import functools
 from typing import Any, Type, TypeVar
 
 import aind_behavior_curriculum
@@ -12,7 +13,9 @@ from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic
 
 from .. import __semver__
 from ..cli import CurriculumCliArgs, CurriculumSuggestion
-from ..utils import metrics_from_dataset_path, trainer_state_from_file
+from ..phases import phase
+from ..stage_cache import stage_cache
+from ..utils import metrics_from_dataset_path, trainer_state_from_json
 from .metrics import DepletionCurriculumMetrics
 from .stages import (
     make_s_stage_all_odors_rewarded,
@@ -78,55 +81,68 @@ def st_s_stage_all_odors_rewarded_s_stage_graduation(metrics: DepletionCurriculu
 curriculum_class: Type[aind_behavior_curriculum.Curriculum[AindVrForagingTaskLogic]] = create_curriculum(
     CURRICULUM_NAME, __semver__, (AindVrForagingTaskLogic,), pkg_location=PKG_LOCATION
 )
-CURRICULUM = curriculum_class()
 
 
-CURRICULUM.add_stage_transition(
-    make_s_stage_one_odor_no_depletion(),
-    make_s_stage_one_odor_w_depletion_day_0(),
-    StageTransition(st_s_stage_one_odor_no_depletion_s_stage_one_odor_w_depletion_day_0),
-)
-
-CURRICULUM.add_stage_transition(
-    make_s_stage_one_odor_w_depletion_day_0(),
-    make_s_stage_one_odor_w_depletion_day_1(),
-    StageTransition(st_s_stage_one_odor_w_depletion_day_0_s_stage_one_odor_w_depletion_day_1),
-)
+def make_curriculum() -> aind_behavior_curriculum.Curriculum[AindVrForagingTaskLogic]:
+    curriculum = curriculum_class()
+    with stage_cache():
+        curriculum.add_stage_transition(
+            make_s_stage_one_odor_no_depletion(),
+            make_s_stage_one_odor_w_depletion_day_0(),
+            StageTransition(st_s_stage_one_odor_no_depletion_s_stage_one_odor_w_depletion_day_0),
+        )
+        curriculum.add_stage_transition(
+            make_s_stage_one_odor_w_depletion_day_0(),
+            make_s_stage_one_odor_w_depletion_day_1(),
+            StageTransition(st_s_stage_one_odor_w_depletion_day_0_s_stage_one_odor_w_depletion_day_1),
+        )
+        curriculum.add_stage_transition(
+            make_s_stage_one_odor_w_depletion_day_1(),
+            make_s_stage_one_odor_w_depletion_day_0(),
+            StageTransition(st_s_stage_one_odor_w_depletion_day_1_s_stage_one_odor_w_depletion_day_0),
+        )
+        curriculum.add_stage_transition(
+            make_s_stage_one_odor_w_depletion_day_0(),
+            make_s_stage_all_odors_rewarded(),
+            StageTransition(st_s_stage_one_odor_w_depletion_day_0_s_stage_all_odors_rewarded),
+        )
+        curriculum.add_stage_transition(
+            make_s_stage_one_odor_w_depletion_day_1(),
+            make_s_stage_all_odors_rewarded(),
+            StageTransition(st_s_stage_one_odor_w_depletion_day_1_s_stage_all_odors_rewarded),
+        )
+        curriculum.add_stage_transition(
+            make_s_stage_all_odors_rewarded(),
+            make_s_stage_graduation(),
+            StageTransition(st_s_stage_all_odors_rewarded_s_stage_graduation),
+        )
+    return curriculum
 
-CURRICULUM.add_stage_transition(
-    make_s_stage_one_odor_w_depletion_day_1(),
-    make_s_stage_one_odor_w_depletion_day_0(),
-    StageTransition(st_s_stage_one_odor_w_depletion_day_1_s_stage_one_odor_w_depletion_day_0),
-)
-
-CURRICULUM.add_stage_transition(
-    make_s_stage_one_odor_w_depletion_day_0(),
-    make_s_stage_all_odors_rewarded(),
-    StageTransition(st_s_stage_one_odor_w_depletion_day_0_s_stage_all_odors_rewarded),
-)
-
-CURRICULUM.add_stage_transition(
-    make_s_stage_one_odor_w_depletion_day_1(),
-    make_s_stage_all_odors_rewarded(),
-    StageTransition(st_s_stage_one_odor_w_depletion_day_1_s_stage_all_odors_rewarded),
-)
-
-CURRICULUM.add_stage_transition(
-    make_s_stage_all_odors_rewarded(),
-    make_s_stage_graduation(),
-    StageTransition(st_s_stage_all_odors_rewarded_s_stage_graduation),
-)
 
 # ==============================================================================
 # Create a Trainer that uses the curriculum to bootstrap suggestions
 # ==============================================================================
 
-TRAINER = Trainer(CURRICULUM)
+
+@functools.cache
+def get_trainer() -> Trainer:
+    """Builds the curriculum and its trainer on first use."""
+    return Trainer(make_curriculum())
+
+
+def __getattr__(name: str) -> Any:
+    # CURRICULUM and TRAINER are only built when first accessed (PEP 562)
+    if name == "TRAINER":
+        return get_trainer()
+    if name == "CURRICULUM":
+        return get_trainer().curriculum
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def run_curriculum(args: CurriculumCliArgs) -> CurriculumSuggestion[TrainerState[Any], Any]:
     metrics: aind_behavior_curriculum.Metrics
-    trainer_state = trainer_state_from_file(args.input_trainer_state, TRAINER)
+    trainer_state = trainer_state_from_json(args.read_input_trainer_state(), get_trainer())
     metrics = metrics_from_dataset_path(args.data_directory, trainer_state)
-    trainer_state = TRAINER.evaluate(trainer_state, metrics)
+    with phase("evaluate"):
+        trainer_state = get_trainer().evaluate(trainer_state, metrics)
     return CurriculumSuggestion(trainer_state=trainer_state, metrics=metrics, version=__semver__)
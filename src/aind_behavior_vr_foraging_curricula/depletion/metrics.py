@@ -1,11 +1,20 @@
+import bisect
 import logging
 import os
+import typing as t
 
+import numpy as np
+import numpy.typing as npt
+import pandas as pd
 from aind_behavior_curriculum import Metrics
 from aind_behavior_vr_foraging.data_contract import dataset as vr_foraging_dataset
-from contraqctor.contract.json import SoftwareEvents
 from pydantic import Field, NonNegativeFloat, NonNegativeInt
 
+from ..columnar import EventColumns, load_event_columns
+from ..extraction import extract_field, extract_fields
+from ..live import IncrementalMetrics, SoftwareEvent, supports_incremental
+from ..streams import requires_streams
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,58 +46,192 @@ class DepletionCurriculumMetrics(Metrics):
     )
 
 
+REQUIRED_STREAMS = tuple(
+    f"Behavior/SoftwareEvents/{name}"
+    for name in (
+        "GiveReward",
+        "ChoiceFeedback",
+        "ActivePatch",
+        "ActiveSite",
+        "UpdaterRewardDelayOffset",
+        "UpdaterStopDurationOffset",
+    )
+)
+
+
+class IncrementalPatchVisitCounter:
+    """Incremental counterpart of `count_patches_visited`, for events that arrive over time.
+
+    Events are expected to arrive in time order, and are then appended in amortized O(log(patches
+    + choices)) time. Out of order events are still counted correctly, but are inserted into the
+    sorted timestamps in O(patches + choices) time.
+    """
+
+    def __init__(self, include_last_patch: bool = False) -> None:
+        self.include_last_patch = include_last_patch
+        self._patch_timestamps: list[float] = []
+        self._patch_state_indices: list[int] = []
+        self._visited: list[bool] = []
+        self._choice_timestamps: list[float] = []
+        self._counts: dict[int, int] = {}
+
+    @property
+    def counts(self) -> dict[int, int]:
+        """Same as the output of `count_patches_visited` for the events added so far."""
+        return dict(self._counts)
+
+    def add_patch(self, timestamp: float, state_index: int) -> None:
+        self._counts.setdefault(state_index, 0)
+        if not self._patch_timestamps or timestamp >= self._patch_timestamps[-1]:
+            i = len(self._patch_timestamps)
+        else:
+            i = bisect.bisect_right(self._patch_timestamps, timestamp)
+        # The new patch splits the interval of the previous one
+        self._uncount(i - 1)
+        self._patch_timestamps.insert(i, timestamp)
+        self._patch_state_indices.insert(i, state_index)
+        self._visited.insert(i, False)
+        for j in (i - 1, i):
+            if j >= 0:
+                self._visited[j] = self._has_choice(j)
+                self._count(j)
+
+    def add_choice(self, timestamp: float) -> None:
+        if not self._choice_timestamps or timestamp >= self._choice_timestamps[-1]:
+            self._choice_timestamps.append(timestamp)
+        else:
+            bisect.insort(self._choice_timestamps, timestamp)
+        i = bisect.bisect_right(self._patch_timestamps, timestamp) - 1
+        if i >= 0 and timestamp > self._patch_timestamps[i] and not self._visited[i]:
+            self._visited[i] = True
+            self._count(i)
+
+    def _is_counted(self, i: int) -> bool:
+        return self._visited[i] and (self.include_last_patch or i < len(self._patch_timestamps) - 1)
+
+    def _count(self, i: int) -> None:
+        if i >= 0 and self._is_counted(i):
+            self._counts[self._patch_state_indices[i]] += 1
+
+    def _uncount(self, i: int) -> None:
+        if i >= 0 and self._is_counted(i):
+            self._counts[self._patch_state_indices[i]] -= 1
+
+    def _has_choice(self, i: int) -> bool:
+        start = bisect.bisect_right(self._choice_timestamps, self._patch_timestamps[i])
+        if i + 1 < len(self._patch_timestamps):
+            end = bisect.bisect_left(self._choice_timestamps, self._patch_timestamps[i + 1])
+        else:
+            end = len(self._choice_timestamps)
+        return end > start
+
+
+class IncrementalDepletionMetrics(IncrementalMetrics):
+    """Running aggregates of `metrics_from_dataset`, for a session that is still being acquired."""
+
+    def __init__(self, data_directory: os.PathLike) -> None:
+        super().__init__(data_directory)
+        self._total_water_consumed = 0.0
+        self._n_choices = 0
+        self._n_patches = 0
+        self._patch_visits = IncrementalPatchVisitCounter()
+        self._n_reward_sites_traveled = 0
+        self._last_reward_site_length: float | None = None
+        self._last_reward_delay_offset: float | None = None
+        self._last_stop_duration_offset: float | None = None
+
+    def update(self, stream: str, events: t.Sequence[SoftwareEvent]) -> None:
+        if stream == "GiveReward":
+            self._total_water_consumed += sum(event.data for event in events)
+        elif stream == "ChoiceFeedback":
+            self._n_choices += len(events)
+            for event in events:
+                self._patch_visits.add_choice(event.timestamp)
+        elif stream == "ActivePatch":
+            self._n_patches += len(events)
+            state_indices = extract_field([event.data for event in events], "state_index", np.int64)
+            for event, state_index in zip(events, state_indices.tolist()):
+                self._patch_visits.add_patch(event.timestamp, state_index)
+        elif stream == "ActiveSite":
+            sites = extract_fields([event.data for event in events], {"label": str, "length": float})
+            is_reward_site = sites["label"] == "RewardSite"
+            if (n_reward_sites := int(np.count_nonzero(is_reward_site))) > 0:
+                self._n_reward_sites_traveled += n_reward_sites
+                self._last_reward_site_length = sites["length"][is_reward_site][-1].item()
+        elif stream == "UpdaterRewardDelayOffset":
+            self._last_reward_delay_offset = events[-1].data
+        elif stream == "UpdaterStopDurationOffset":
+            self._last_stop_duration_offset = events[-1].data
+
+    def metrics(self) -> DepletionCurriculumMetrics:
+        if self._last_stop_duration_offset is None:
+            raise ValueError("No stop duration offset update yet.")
+        if self._n_choices == 0 or self._n_patches == 0:
+            n_patches_visited_per_patch, n_choices = {0: 0}, 0
+        else:
+            n_patches_visited_per_patch, n_choices = self._patch_visits.counts, self._n_choices
+        return DepletionCurriculumMetrics(
+            total_water_consumed=self._total_water_consumed / 1000,
+            last_delay_duration=self._last_reward_delay_offset,
+            last_stop_duration_offset_updater=self._last_stop_duration_offset,
+            last_reward_site_length=self._last_reward_site_length,
+            n_patches_visited=sum(n_patches_visited_per_patch.values()),
+            n_patches_visited_per_patch=n_patches_visited_per_patch,
+            n_choices=n_choices,
+            n_reward_sites_traveled=self._n_reward_sites_traveled,
+        )
+
+
+@supports_incremental(IncrementalDepletionMetrics)
+@requires_streams(*REQUIRED_STREAMS)
 def metrics_from_dataset(data_directory: os.PathLike) -> DepletionCurriculumMetrics:
     dataset = vr_foraging_dataset(data_directory)
 
-    software_events = dataset["Behavior"]["SoftwareEvents"]
-    software_events.load_all()
+    software_events = load_event_columns(dataset, REQUIRED_STREAMS)
 
     # Get last reward delay offset duration
-    if _has_error_or_empty(software_events["UpdaterRewardDelayOffset"]):
+    if _is_missing_or_empty(reward_delay_offset := software_events["UpdaterRewardDelayOffset"]):
         last_reward_delay_offset = None
     else:
-        last_reward_delay_offset = software_events["UpdaterRewardDelayOffset"].data["data"].iloc[-1]
+        last_reward_delay_offset = reward_delay_offset["data"][-1].item()
 
     # Calculate water consumed
-    if _has_error_or_empty(software_events["GiveReward"]):
+    if _is_missing_or_empty(give_reward := software_events["GiveReward"]):
         total_water_consumed = 0
     else:
-        total_water_consumed = software_events["GiveReward"].data["data"].sum()
+        total_water_consumed = give_reward["data"].sum().item()
 
     # Compute patch related metrics
     choice_events = software_events["ChoiceFeedback"]
     patches = software_events["ActivePatch"]
 
-    if _has_error_or_empty(choice_events) or _has_error_or_empty(patches):
+    if _is_missing_or_empty(choice_events) or _is_missing_or_empty(patches):
         n_patches_visited_per_patch = {0: 0}
         n_choices = 0
     else:
-        n_choices = len(choice_events.data)
-        unique_patches = patches.data["data"].apply(lambda x: x["state_index"]).unique()
-        n_patches_visited_per_patch = {int(patch): 0 for patch in unique_patches}
-        for i in range(len(patches.data) - 1):
-            choices_between_patches = choice_events.data[
-                (choice_events.data.index > patches.data.index[i])
-                & (choice_events.data.index < patches.data.index[i + 1])
-            ]
-            if len(choices_between_patches) > 0:
-                n_patches_visited_per_patch[int(patches.data["data"].iloc[i]["state_index"])] += 1
+        n_choices = len(choice_events)
+        n_patches_visited_per_patch = count_patches_visited(
+            patch_timestamps=patches.timestamp,
+            patch_state_indices=patches["state_index"],
+            choice_timestamps=choice_events.timestamp,
+        )
 
     # Get reward site related metrics
-    if _has_error_or_empty(software_events["ActiveSite"]):
+    if _is_missing_or_empty(sites_visited := software_events["ActiveSite"]):
         last_reward_site_length = None
         n_reward_sites_traveled = 0
     else:
-        sites_visited = software_events["ActiveSite"].data
-        reward_sites = sites_visited[sites_visited["data"].apply(lambda x: x["label"] == "RewardSite")]
-        if len(reward_sites) == 0:
+        is_reward_site = sites_visited["label"] == "RewardSite"
+        n_reward_sites_traveled = int(np.count_nonzero(is_reward_site))
+        if n_reward_sites_traveled == 0:
             last_reward_site_length = None
-            n_reward_sites_traveled = 0
         else:
-            last_reward_site_length = reward_sites["data"].iloc[-1]["length"]
-            n_reward_sites_traveled = len(reward_sites)
+            last_reward_site_length = sites_visited["length"][is_reward_site][-1].item()
 
-    last_stop_duration_offset_updater = software_events["UpdaterStopDurationOffset"].data["data"].iloc[-1]
+    stop_duration_offset = software_events["UpdaterStopDurationOffset"]
+    if _is_missing_or_empty(stop_duration_offset):
+        raise ValueError("Session does not have any stop duration offset update.")
+    last_stop_duration_offset_updater = stop_duration_offset["data"][-1].item()
 
     return DepletionCurriculumMetrics(
         total_water_consumed=total_water_consumed / 1000,
@@ -102,5 +245,55 @@ def metrics_from_dataset(data_directory: os.PathLike) -> DepletionCurriculumMetr
     )
 
 
-def _has_error_or_empty(datastream: SoftwareEvents) -> bool:
-    return datastream.has_error or datastream.data.empty
+def count_patches_visited(
+    patch_timestamps: npt.ArrayLike,
+    patch_state_indices: npt.ArrayLike,
+    choice_timestamps: npt.ArrayLike,
+    include_last_patch: bool = False,
+) -> dict[int, int]:
+    """Counts the patches in which at least one choice was made, aggregated by patch state index.
+
+    Each choice is assigned to the patch interval that encloses it, i.e. the interval
+    between the onset of a patch and the onset of the next one (both exclusive).
+    Both event series are sorted once and choices are binned with ``np.searchsorted``,
+    so the cost is O((patches + choices) * log(choices)) instead of O(patches * choices).
+
+    Args:
+        patch_timestamps: Onset timestamps of each patch.
+        patch_state_indices: State index of each patch, aligned with ``patch_timestamps``.
+        choice_timestamps: Timestamps of each choice.
+        include_last_patch: If True, the last patch is treated as an interval that is open until
+            the end of the session. Otherwise, since it has no closing onset, it is never counted.
+
+    Returns:
+        A dictionary mapping each patch state index (in order of first appearance) to the number
+        of visited patches with that index.
+    """
+    patch_timestamps = np.asarray(patch_timestamps, dtype=float)
+    patch_state_indices = np.asarray(patch_state_indices, dtype=np.int64)
+    choice_timestamps = np.sort(np.asarray(choice_timestamps, dtype=float))
+    if patch_timestamps.shape != patch_state_indices.shape:
+        raise ValueError("patch_timestamps and patch_state_indices must have the same shape.")
+
+    order = np.argsort(patch_timestamps, kind="stable")
+    patch_timestamps = patch_timestamps[order]
+    patch_state_indices = patch_state_indices[order]
+
+    counts = {int(patch): 0 for patch in pd.unique(patch_state_indices)}
+    if len(patch_timestamps) == 0:
+        return counts
+
+    # Interval i spans (patch_timestamps[i], patch_timestamps[i + 1])
+    first_choice = np.searchsorted(choice_timestamps, patch_timestamps, side="right")
+    end_choice = np.empty_like(first_choice)
+    end_choice[:-1] = np.searchsorted(choice_timestamps, patch_timestamps[1:], side="left")
+    end_choice[-1] = len(choice_timestamps) if include_last_patch else first_choice[-1]
+
+    visited_patches, n_visits = np.unique(patch_state_indices[end_choice > first_choice], return_counts=True)
+    for patch, n in zip(visited_patches, n_visits):
+        counts[int(patch)] = int(n)
+    return counts
+
+
+def _is_missing_or_empty(events: EventColumns | None) -> bool:
+    return events is None or len(events) == 0
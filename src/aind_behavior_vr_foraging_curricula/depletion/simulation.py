@@ -0,0 +1,224 @@
+import typing as t
+
+import numpy as np
+from aind_behavior_curriculum import Policy, Stage
+from aind_behavior_services.task_logic import distributions
+from aind_behavior_vr_foraging import task_logic
+from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic
+from pydantic import BaseModel, Field, NonNegativeFloat, PositiveFloat
+
+from ..simulation import MetricsColumns, MetricsModel, SubjectBatch, TaskColumns
+from .policies import p_learn_to_run, p_learn_to_stop, p_stochastic_reward
+
+
+class DepletionMetricsModel(MetricsModel, BaseModel):
+    """Generative model of `DepletionCurriculumMetrics`.
+
+    Each subject learns the task over its sessions: its skill, which scales how far it
+    runs, how often it stops and how many patches it leaves after harvesting, rises from
+    0 towards a ceiling with a learning time constant (in sessions). Both vary across
+    subjects: slower learners also plateau lower. The skill drops on the first sessions in
+    a new stage, and how far a subject runs varies from day to day. Counts are then drawn
+    from Poisson and binomial distributions around the skill, and patch visits are spread
+    over the patches of the stage.
+
+    The fields that the policies act on are read from the task logic each subject runs,
+    which `simulation.simulate` updates with the policies of the stage (e.g. the reward
+    site length grown by `policies.p_learn_to_run`): the reward site length is the one of
+    the task, and the stop duration and reward delay offsets start from the initial value
+    of their updater and grow by its `on_success` step with each reward, up to its maximum.
+    The policies of the curriculum are applied in batch to these parameters only.
+    """
+
+    learning_sessions: PositiveFloat = Field(
+        default=4.0, description="Median learning time constant of the subjects, in sessions."
+    )
+    learning_sessions_spread: NonNegativeFloat = Field(
+        default=0.5, description="Standard deviation of the log learning time constant across subjects."
+    )
+    ceiling_spread: NonNegativeFloat = Field(
+        default=0.2,
+        description="Decrease of the highest skill of a subject per standard deviation of its log learning time.",
+    )
+    stage_novelty: float = Field(
+        default=0.5, ge=0, le=1, description="Fraction of the skill lost on the first session in a new stage."
+    )
+    session_spread: NonNegativeFloat = Field(
+        default=0.5, description="Standard deviation of the log of the day to day variation of the distance run."
+    )
+    max_reward_sites: PositiveFloat = Field(default=400.0, description="Mean reward sites traveled by an expert.")
+    choice_probability: float = Field(default=0.6, ge=0, le=1, description="Probability an expert stops at a site.")
+    reward_probability: float = Field(default=0.8, ge=0, le=1, description="Probability of a choice being rewarded.")
+    reward_amount: NonNegativeFloat = Field(default=0.005, description="Reward amount, in milliliters.")
+    reward_sites_per_patch: float = Field(default=4.0, ge=1, description="Mean number of reward sites per patch.")
+    leave_probability: float = Field(
+        default=0.9, ge=0, le=1, description="Probability an expert leaves a patch after harvesting it."
+    )
+
+    def skill(self, subjects: SubjectBatch) -> np.ndarray:
+        tau = self.learning_sessions * np.exp(self.learning_sessions_spread * subjects.ability)
+        ceiling = np.clip(1.0 - self.ceiling_spread * subjects.ability, 0.0, 1.0)
+        novelty = 1.0 - self.stage_novelty * 0.5**subjects.sessions_in_stage
+        return ceiling * novelty * (1.0 - np.exp(-(subjects.sessions + 1) / tau))
+
+    def sample(self, stage: Stage, subjects: SubjectBatch, rng: np.random.Generator) -> MetricsColumns:
+        skill = self.skill(subjects)
+        engagement = rng.lognormal(-(self.session_spread**2) / 2, self.session_spread, len(skill))
+        n_reward_sites = rng.poisson(self.max_reward_sites * skill * engagement)
+        n_choices = rng.binomial(n_reward_sites, self.choice_probability * skill)
+        n_rewards = rng.binomial(n_choices, self.reward_probability)
+        n_patches = rng.binomial(n_reward_sites, 1.0 / self.reward_sites_per_patch)
+        n_patches_visited = rng.binomial(n_patches, self.leave_probability * skill)
+
+        state_indices = _patch_state_indices(stage)
+        per_patch = rng.multinomial(n_patches_visited, np.full(len(state_indices), 1.0 / len(state_indices)))
+        if subjects.parameters is not None:
+            task_fields = np.column_stack([subjects.parameters[name] for name in _TASK_PARAMETERS])
+        else:
+            task_fields = _task_fields(stage, subjects.tasks, len(skill))
+        return {
+            "total_water_consumed": n_rewards * self.reward_amount,
+            "n_reward_sites_traveled": n_reward_sites,
+            "n_choices": n_choices,
+            "n_patches_visited": n_patches_visited,
+            "n_patches_visited_per_patch": {index: per_patch[:, i] for i, index in enumerate(state_indices)},
+            "last_stop_duration_offset_updater": np.nan_to_num(_updater_value(task_fields[:, 1:5], n_rewards), nan=0.0),
+            "last_reward_site_length": task_fields[:, 0],
+            "last_delay_duration": _updater_value(task_fields[:, 5:9], n_rewards),
+        }
+
+    def task_parameters(self, stage: Stage) -> t.Optional[dict[str, t.Any]]:
+        if not all(policy.callable in _BATCHED_POLICIES for policy in stage.see_policies()):
+            return None
+        if not _supports_batched_policies(stage.task):
+            return None
+        return dict(zip(_TASK_PARAMETERS, _task_fields(stage, None, 1)[0].tolist()))
+
+    def apply_policies(
+        self, stage: Stage, policies: t.Sequence[Policy], metrics: MetricsColumns, parameters: TaskColumns
+    ) -> TaskColumns:
+        for policy in policies:
+            parameters = _BATCHED_POLICIES[policy.callable](metrics, parameters)
+        return parameters
+
+
+_TASK_PARAMETERS = (
+    "reward_site_length",
+    *(f"stop_duration_offset_{field}" for field in ("initial_value", "on_success", "minimum", "maximum")),
+    *(f"reward_delay_offset_{field}" for field in ("initial_value", "on_success", "minimum", "maximum")),
+)
+"""The task logic parameters the model draws from, in the order of `_task_fields`."""
+
+
+def _learn_to_run(metrics: MetricsColumns, parameters: TaskColumns) -> TaskColumns:
+    """`policies.p_learn_to_run`, on the reward site length."""
+    n_reward_sites = metrics["n_reward_sites_traveled"]
+    gain = np.minimum(n_reward_sites / 200.0, 3.0)
+    length = parameters["reward_site_length"]
+    return {
+        **parameters,
+        "reward_site_length": np.where(n_reward_sites > 200, np.clip(length + 10 * gain, 20, 50), length),
+    }
+
+
+def _learn_to_stop(metrics: MetricsColumns, parameters: TaskColumns) -> TaskColumns:
+    """`policies.p_learn_to_stop`, on the initial values of the stop duration and reward delay offset updaters."""
+    stopping = metrics["n_choices"] > 100
+    stop_duration = parameters["stop_duration_offset_initial_value"]
+    delay = parameters["reward_delay_offset_initial_value"]
+    last_delay = metrics["last_delay_duration"]
+    return {
+        **parameters,
+        "stop_duration_offset_initial_value": np.where(stopping, stop_duration + 0.1, stop_duration),
+        "reward_delay_offset_initial_value": np.where(stopping & ~np.isnan(last_delay), last_delay, delay),
+    }
+
+
+def _stochastic_reward(metrics: MetricsColumns, parameters: TaskColumns) -> TaskColumns:
+    """`policies.p_stochastic_reward`, which only changes the reward probability, that the model does not draw from."""
+    return parameters
+
+
+_BATCHED_POLICIES: dict[t.Callable[..., t.Any], t.Callable[[MetricsColumns, TaskColumns], TaskColumns]] = {
+    p_learn_to_run: _learn_to_run,
+    p_learn_to_stop: _learn_to_stop,
+    p_stochastic_reward: _stochastic_reward,
+}
+
+
+def _supports_batched_policies(task: t.Any) -> bool:
+    """Whether a task logic has the parameters the batched policies act on, which the policies assert."""
+    if not isinstance(task, AindVrForagingTaskLogic) or np.isnan(_reward_site_length(task)):
+        return False
+    patch_gen = (
+        task.task_parameters.environment.blocks[0].environment_statistics.patches[0].patch_virtual_sites_generator
+    )
+    for generator in (patch_gen.inter_site, patch_gen.inter_patch):
+        length = generator.length_distribution
+        if not isinstance(length, distributions.ExponentialDistribution) or length.truncation_parameters is None:
+            return False
+    updaters = task.task_parameters.updaters
+    return all(
+        target in updaters
+        for target in (
+            task_logic.UpdaterTarget.STOP_VELOCITY_THRESHOLD,
+            task_logic.UpdaterTarget.STOP_DURATION_OFFSET,
+            task_logic.UpdaterTarget.REWARD_DELAY_OFFSET,
+        )
+    )
+
+
+_NO_UPDATER = (np.nan,) * 4
+
+
+def _updater_fields(task: AindVrForagingTaskLogic, target: task_logic.UpdaterTarget) -> tuple[float, ...]:
+    if (updater := task.task_parameters.updaters.get(target)) is None:
+        return _NO_UPDATER
+    parameters = updater.parameters
+    return (parameters.initial_value, parameters.on_success, parameters.minimum, parameters.maximum)
+
+
+def _reward_site_length(task: AindVrForagingTaskLogic) -> float:
+    if not task.task_parameters.environment.blocks:
+        return np.nan
+    patches = task.task_parameters.environment.blocks[0].environment_statistics.patches
+    if not patches:
+        return np.nan
+    length = patches[0].patch_virtual_sites_generator.reward_site.length_distribution
+    return length.distribution_parameters.value if isinstance(length, distributions.Scalar) else np.nan
+
+
+def _task_fields(stage: Stage, tasks: t.Optional[t.Sequence[t.Any]], n: int) -> np.ndarray:
+    """The reward site length and the stop duration and reward delay offset updaters of the task of each subject."""
+    tasks = tasks if tasks is not None else [stage.task] * n
+    by_task: dict[int, tuple[float, ...]] = {}
+    fields = []
+    for task in tasks:
+        # Subjects that were not updated by a policy share the task logic of their stage
+        if (values := by_task.get(id(task))) is None:
+            if isinstance(task, AindVrForagingTaskLogic):
+                values = (
+                    _reward_site_length(task),
+                    *_updater_fields(task, task_logic.UpdaterTarget.STOP_DURATION_OFFSET),
+                    *_updater_fields(task, task_logic.UpdaterTarget.REWARD_DELAY_OFFSET),
+                )
+            else:
+                values = (np.nan, *_NO_UPDATER, *_NO_UPDATER)
+            by_task[id(task)] = values
+        fields.append(values)
+    return np.array(fields, dtype=float).reshape(len(fields), 9)
+
+
+def _updater_value(updater: np.ndarray, n_successes: np.ndarray) -> np.ndarray:
+    """The value of a numerical updater after a number of successes, NaN for tasks without the updater."""
+    initial, on_success, minimum, maximum = updater.T
+    with np.errstate(invalid="ignore"):
+        return np.clip(initial + on_success * n_successes, minimum, maximum)
+
+
+def _patch_state_indices(stage: Stage) -> list[int]:
+    task = stage.task
+    if not isinstance(task, AindVrForagingTaskLogic) or not task.task_parameters.environment.blocks:
+        return [0]
+    patches = task.task_parameters.environment.blocks[0].environment_statistics.patches
+    return sorted({patch.state_index for patch in patches}) or [0]
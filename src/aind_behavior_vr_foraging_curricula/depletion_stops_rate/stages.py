@@ -4,12 +4,14 @@ from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic, AindVr
 
 from ..depletion import helpers
 from ..depletion.metrics import metrics_from_dataset
+from ..stage_cache import cached_stage
 
 # ============================================================
 # Stage definition
 # ============================================================
 
 
+@cached_stage
 def s_stage_all_odors_rewarded() -> Stage:
     return Stage(
         name="all_odors_rewarded",
@@ -52,6 +54,7 @@ def s_stage_all_odors_rewarded() -> Stage:
     )
 
 
+@cached_stage
 def s_stage_graduation() -> Stage:
     return Stage(
         name="graduation",
@@ -0,0 +1,104 @@
+import operator
+import typing as t
+
+import numpy as np
+import numpy.typing as npt
+
+if t.TYPE_CHECKING:
+    import pandas as pd
+
+
+class _Missing:
+    def __repr__(self) -> str:
+        return "MISSING"
+
+
+MISSING: t.Any = _Missing()
+"""Sentinel for fields without a default, for which a missing key is an error."""
+
+
+def _as_list(records: "t.Iterable[t.Optional[t.Mapping[str, t.Any]]] | pd.Series") -> list[t.Any]:
+    tolist = getattr(records, "tolist", None)
+    return tolist() if tolist is not None else list(records)
+
+
+def extract_field(
+    records: "t.Iterable[t.Optional[t.Mapping[str, t.Any]]] | pd.Series",
+    key: str,
+    dtype: npt.DTypeLike,
+    default: t.Any = MISSING,
+) -> np.ndarray:
+    """Extracts a field of dict-valued records (e.g. the `data` column of software events) into a typed array.
+
+    This replaces the row-wise `series.apply(lambda x: x[key])` pattern with a single pass
+    that fills the output array directly.
+
+    Args:
+        records: The records, e.g. a `pd.Series` of dictionaries.
+        key: The key of the field to extract.
+        dtype: The dtype of the output array.
+        default: The value used for records without the key, or that are None.
+            If not provided, such records raise a `KeyError`.
+
+    Returns:
+        A one-dimensional array of `dtype`, aligned with `records`.
+    """
+    records = _as_list(records)
+    getter: t.Callable[[t.Any], t.Any]
+    if default is MISSING:
+        if any(record is None for record in records):
+            raise KeyError(f"Missing field {key!r}: some records are None.")
+        getter = operator.itemgetter(key)
+    else:
+
+        def getter(record: t.Optional[t.Mapping[str, t.Any]]) -> t.Any:
+            return default if record is None else record.get(key, default)
+
+    dtype = np.dtype(dtype)
+    if dtype.kind in "biufcmM":
+        return np.fromiter(map(getter, records), dtype=dtype, count=len(records))
+    if dtype.kind == "O":
+        # Filled element-wise, so that sequence values are not unpacked into extra dimensions
+        values = np.empty(len(records), dtype=object)
+        for i, value in enumerate(map(getter, records)):
+            values[i] = value
+        return values
+    return np.array(list(map(getter, records)), dtype=dtype)
+
+
+def extract_fields(
+    records: "t.Iterable[t.Optional[t.Mapping[str, t.Any]]] | pd.Series",
+    fields: t.Mapping[str, npt.DTypeLike],
+    defaults: t.Optional[t.Mapping[str, t.Any]] = None,
+) -> dict[str, np.ndarray]:
+    """Extracts several fields of dict-valued records into typed arrays (see `extract_field`).
+
+    Args:
+        records: The records, e.g. a `pd.Series` of dictionaries.
+        fields: The dtype of each field to extract, keyed by field name.
+        defaults: Defaults of the fields that may be missing, keyed by field name.
+
+    Returns:
+        One array per field, keyed by field name.
+    """
+    records = _as_list(records)
+    defaults = defaults or {}
+    return {key: extract_field(records, key, dtype, defaults.get(key, MISSING)) for key, dtype in fields.items()}
+
+
+def infer_native_array(values: t.Sequence[t.Any]) -> t.Optional[np.ndarray]:
+    """Converts values to an array of a native dtype, if they share one.
+
+    Strings become a unicode array, booleans a boolean array, and numbers an int64 array,
+    or a float array if any is a float or None (None becomes NaN). Returns None for
+    anything else (e.g. nested or mixed values).
+    """
+    if all(isinstance(value, str) for value in values):
+        return np.array(values, dtype=str)
+    if all(value is None or (isinstance(value, (int, float)) and not isinstance(value, bool)) for value in values):
+        if any(value is None or isinstance(value, float) for value in values):
+            return np.fromiter((np.nan if value is None else value for value in values), dtype=float, count=len(values))
+        return np.fromiter(values, dtype=np.int64, count=len(values))
+    if all(isinstance(value, bool) for value in values):
+        return np.fromiter(values, dtype=bool, count=len(values))
+    return None
@@ -0,0 +1,282 @@
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import typing as t
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+
+from .streams import get_stream
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA_VERSION = 1
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    subject TEXT NOT NULL,
+    session TEXT NOT NULL,
+    date TEXT NOT NULL,
+    curriculum TEXT,
+    stage TEXT,
+    suggested_stage TEXT,
+    metrics TEXT NOT NULL,
+    version TEXT,
+    sessions_in_stage INTEGER NOT NULL,
+    days_in_stage INTEGER NOT NULL,
+    PRIMARY KEY (subject, session)
+);
+CREATE INDEX IF NOT EXISTS sessions_by_subject_date ON sessions (subject, date, session);
+CREATE INDEX IF NOT EXISTS sessions_by_subject_stage_date ON sessions (subject, stage, date, session);
+"""
+_COLUMNS = (
+    "subject, session, date, curriculum, stage, suggested_stage, metrics, version, sessions_in_stage, days_in_stage"
+)
+
+_active_store: contextvars.ContextVar[t.Optional["HistoryStore"]] = contextvars.ContextVar(
+    "active_history_store", default=None
+)
+
+
+class HistoryRecord(BaseModel):
+    """The metrics of a session, and the stage the subject was in."""
+
+    subject: str = Field(description="The subject of the session.")
+    session: str = Field(description="The name of the session, unique for a subject.")
+    date: datetime.datetime = Field(description="The date the session started.")
+    curriculum: t.Optional[str] = Field(default=None, description="The curriculum that was run.")
+    stage: t.Optional[str] = Field(default=None, description="The stage the session was run in.")
+    suggested_stage: t.Optional[str] = Field(default=None, description="The stage suggested for the next session.")
+    metrics: dict[str, t.Any] = Field(description="The metrics computed from the session.")
+    version: t.Optional[str] = Field(default=None, description="The version of the curricula package.")
+    sessions_in_stage: int = Field(
+        default=1, description="Number of consecutive sessions of the subject in `stage`, up to and including this one."
+    )
+    days_in_stage: int = Field(
+        default=1, description="Number of distinct days of the consecutive sessions of the subject in `stage`."
+    )
+
+
+class HistoryStore:
+    """SQLite store of the metrics of every session, for criteria spanning several sessions.
+
+    One row is kept per subject and session (appending a session again replaces it). Rows
+    are indexed by subject and date, so rolling windows (e.g. the last N sessions) only
+    read the rows they return. The number of consecutive sessions, and days, that the
+    subject spent in the stage of a session are computed when it is appended, so they are
+    lookups of a single row.
+    """
+
+    def __init__(self, path: os.PathLike | str) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self._path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._connection:
+            version = self._connection.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, _SCHEMA_VERSION):
+                raise ValueError(f"Unsupported history schema version {version} in {self._path}.")
+            self._connection.executescript(_SCHEMA)
+            self._connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def __enter__(self) -> "HistoryStore":
+        return self
+
+    def __exit__(self, *args: t.Any) -> None:
+        self.close()
+
+    def append(self, record: HistoryRecord) -> HistoryRecord:
+        """Stores the record of a session, and returns it with its stage streak counts.
+
+        Sessions are expected to be appended in chronological order. Appending an older
+        session (e.g. a backfill) is supported, but recomputes the counts of every later
+        session of the subject.
+        """
+        with self._connection:
+            self._connection.execute(
+                "DELETE FROM sessions WHERE subject = ? AND session = ?", (record.subject, record.session)
+            )
+            previous = self._last_row_before(record.subject, _format_date(record.date), record.session)
+            record = _with_streak(record, previous)
+            self._insert(record)
+            if self._has_rows_after(record.subject, _format_date(record.date), record.session):
+                self._recompute_streaks(record.subject)
+                record = self.get(record.subject, record.session) or record
+        return record
+
+    def get(self, subject: str, session: str) -> t.Optional[HistoryRecord]:
+        row = self._connection.execute(
+            f"SELECT {_COLUMNS} FROM sessions WHERE subject = ? AND session = ?", (subject, session)
+        ).fetchone()
+        return _record_from_row(row) if row is not None else None
+
+    def last_sessions(self, subject: str, n: int, stage: t.Optional[str] = None) -> list[HistoryRecord]:
+        """Returns the last `n` sessions of a subject, optionally only those in a stage, most recent first."""
+        if stage is None:
+            rows = self._connection.execute(
+                f"SELECT {_COLUMNS} FROM sessions WHERE subject = ? ORDER BY date DESC, session DESC LIMIT ?",
+                (subject, n),
+            )
+        else:
+            rows = self._connection.execute(
+                f"SELECT {_COLUMNS} FROM sessions WHERE subject = ? AND stage = ? "
+                "ORDER BY date DESC, session DESC LIMIT ?",
+                (subject, stage, n),
+            )
+        return [_record_from_row(row) for row in rows]
+
+    def latest(self, subject: str) -> t.Optional[HistoryRecord]:
+        """Returns the most recent session of a subject, if any."""
+        records = self.last_sessions(subject, 1)
+        return records[0] if records else None
+
+    def sessions_in_stage(self, subject: str, stage: str) -> int:
+        """Returns the number of consecutive sessions the subject has spent in a stage, up to its latest session.
+
+        Returns 0 if the latest session of the subject was not in the stage.
+        """
+        latest = self.latest(subject)
+        return latest.sessions_in_stage if latest is not None and latest.stage == stage else 0
+
+    def days_in_stage(self, subject: str, stage: str) -> int:
+        """Returns the number of distinct days of the consecutive sessions the subject has spent in a stage.
+
+        Returns 0 if the latest session of the subject was not in the stage.
+        """
+        latest = self.latest(subject)
+        return latest.days_in_stage if latest is not None and latest.stage == stage else 0
+
+    def metric_values(self, subject: str, metric: str, n: int, stage: t.Optional[str] = None) -> list[t.Any]:
+        """Returns the values of a metric over the last `n` sessions of a subject, most recent first."""
+        return [record.metrics.get(metric) for record in self.last_sessions(subject, n, stage)]
+
+    def subjects(self) -> list[str]:
+        return [row[0] for row in self._connection.execute("SELECT DISTINCT subject FROM sessions ORDER BY subject")]
+
+    def _insert(self, record: HistoryRecord) -> None:
+        self._connection.execute(
+            f"INSERT INTO sessions ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                record.subject,
+                record.session,
+                _format_date(record.date),
+                record.curriculum,
+                record.stage,
+                record.suggested_stage,
+                json.dumps(record.metrics),
+                record.version,
+                record.sessions_in_stage,
+                record.days_in_stage,
+            ),
+        )
+
+    def _last_row_before(self, subject: str, date: str, session: str) -> t.Optional[HistoryRecord]:
+        row = self._connection.execute(
+            f"SELECT {_COLUMNS} FROM sessions WHERE subject = ? AND (date < ? OR (date = ? AND session < ?)) "
+            "ORDER BY date DESC, session DESC LIMIT 1",
+            (subject, date, date, session),
+        ).fetchone()
+        return _record_from_row(row) if row is not None else None
+
+    def _has_rows_after(self, subject: str, date: str, session: str) -> bool:
+        return (
+            self._connection.execute(
+                "SELECT 1 FROM sessions WHERE subject = ? AND (date > ? OR (date = ? AND session > ?)) LIMIT 1",
+                (subject, date, date, session),
+            ).fetchone()
+            is not None
+        )
+
+    def _recompute_streaks(self, subject: str) -> None:
+        rows = self._connection.execute(
+            f"SELECT {_COLUMNS} FROM sessions WHERE subject = ? ORDER BY date, session", (subject,)
+        ).fetchall()
+        previous: t.Optional[HistoryRecord] = None
+        for row in rows:
+            record = _with_streak(_record_from_row(row), previous)
+            self._connection.execute(
+                "UPDATE sessions SET sessions_in_stage = ?, days_in_stage = ? WHERE subject = ? AND session = ?",
+                (record.sessions_in_stage, record.days_in_stage, record.subject, record.session),
+            )
+            previous = record
+
+
+def _format_date(date: datetime.datetime) -> str:
+    # Stored as UTC ISO 8601 strings, so that they sort chronologically
+    if date.tzinfo is not None:
+        date = date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return date.isoformat(timespec="microseconds")
+
+
+def _with_streak(record: HistoryRecord, previous: t.Optional[HistoryRecord]) -> HistoryRecord:
+    if previous is None or previous.stage != record.stage:
+        return record.model_copy(update={"sessions_in_stage": 1, "days_in_stage": 1})
+    same_day = _format_date(previous.date)[:10] == _format_date(record.date)[:10]
+    return record.model_copy(
+        update={
+            "sessions_in_stage": previous.sessions_in_stage + 1,
+            "days_in_stage": previous.days_in_stage + (0 if same_day else 1),
+        }
+    )
+
+
+def _record_from_row(row: sqlite3.Row) -> HistoryRecord:
+    values = dict(row)
+    values["date"] = datetime.datetime.fromisoformat(values["date"]).replace(tzinfo=datetime.timezone.utc)
+    values["metrics"] = json.loads(values["metrics"])
+    return HistoryRecord.model_validate(values)
+
+
+class SessionInfo(t.NamedTuple):
+    subject: str
+    session: str
+    date: datetime.datetime
+
+
+def session_info_from_dataset(data_directory: os.PathLike | str) -> t.Optional[SessionInfo]:
+    """Returns the subject, name and date of a session, read from its session schema.
+
+    The session schema is only peeked at, not validated. Returns None if it is missing or
+    does not have a subject.
+    """
+    from aind_behavior_vr_foraging.data_contract import dataset as vr_foraging_dataset
+
+    path = Path(get_stream(vr_foraging_dataset(data_directory), "Behavior/InputSchemas/Session").reader_params.path)
+    try:
+        session = json.loads(path.read_bytes())
+    except (OSError, ValueError) as e:
+        logger.warning("Failed to read the session schema %s: %s", path, e)
+        return None
+    if not isinstance(session, dict) or not isinstance(subject := session.get("subject"), str):
+        return None
+    try:
+        date = datetime.datetime.fromisoformat(session["date"])
+    except (KeyError, TypeError, ValueError):
+        date = datetime.datetime.fromtimestamp(path.stat().st_mtime, tz=datetime.timezone.utc)
+    name = session.get("session_name") or Path(data_directory).resolve().name
+    return SessionInfo(subject=subject, session=str(name), date=date)
+
+
+@contextlib.contextmanager
+def use_history_store(store: t.Optional[HistoryStore]) -> t.Iterator[t.Optional[HistoryStore]]:
+    """Sets the history store available to metrics providers (see `get_history_store`) within the context."""
+    token = _active_store.set(store)
+    try:
+        yield store
+    finally:
+        _active_store.reset(token)
+
+
+def get_history_store() -> t.Optional[HistoryStore]:
+    """Returns the history store of the current context, if any."""
+    return _active_store.get()
@@ -0,0 +1,100 @@
+import copy
+import hashlib
+import json
+import typing as t
+
+JsonPatch = list[dict[str, t.Any]]
+
+
+def canonical_json(document: t.Any) -> bytes:
+    """Serializes a JSON document with sorted keys and no whitespace, so that equal documents serialize equally."""
+    return json.dumps(document, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def content_hash(document: t.Any) -> str:
+    """Returns the SHA-256 hex digest of the canonical serialization of a JSON document."""
+    return hashlib.sha256(canonical_json(document)).hexdigest()
+
+
+def _escape(token: str | int) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(source: t.Any, target: t.Any) -> JsonPatch:
+    """Computes an RFC 6902 JSON patch that turns `source` into `target`.
+
+    Only "add", "remove" and "replace" operations are emitted. Objects are compared key by
+    key, and arrays element by element, with trailing elements added or removed.
+    """
+    patch: JsonPatch = []
+    _diff(source, target, "", patch)
+    return patch
+
+
+def _diff(source: t.Any, target: t.Any, path: str, patch: JsonPatch) -> None:
+    # `type` is compared so that e.g. 1 and True, or 1 and 1.0, are not considered equal
+    if type(source) is type(target) and source == target:
+        return
+    if isinstance(source, dict) and isinstance(target, dict):
+        for key in source:
+            if key not in target:
+                patch.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+        for key, value in target.items():
+            if key in source:
+                _diff(source[key], value, f"{path}/{_escape(key)}", patch)
+            else:
+                patch.append({"op": "add", "path": f"{path}/{_escape(key)}", "value": value})
+    elif isinstance(source, list) and isinstance(target, list):
+        for i in range(min(len(source), len(target))):
+            _diff(source[i], target[i], f"{path}/{i}", patch)
+        for i in range(len(source) - 1, len(target) - 1, -1):
+            patch.append({"op": "remove", "path": f"{path}/{i}"})
+        for i in range(len(source), len(target)):
+            patch.append({"op": "add", "path": f"{path}/{i}", "value": target[i]})
+    else:
+        patch.append({"op": "replace", "path": path, "value": target})
+
+
+def apply_patch(document: t.Any, patch: JsonPatch) -> t.Any:
+    """Applies the "add", "remove" and "replace" operations of an RFC 6902 JSON patch to a copy of a document.
+
+    Raises:
+        ValueError: If an operation is not supported or its path does not exist.
+    """
+    document = copy.deepcopy(document)
+    for operation in patch:
+        op, path = operation["op"], operation["path"]
+        if op not in ("add", "remove", "replace"):
+            raise ValueError(f"Unsupported JSON patch operation: {op}")
+        if path == "":
+            if op == "remove":
+                raise ValueError("Cannot remove the whole document.")
+            document = copy.deepcopy(operation["value"])
+            continue
+        *parents, last = [_unescape(token) for token in path.split("/")[1:]]
+        try:
+            container = document
+            for token in parents:
+                container = container[int(token) if isinstance(container, list) else token]
+            if isinstance(container, list):
+                index = len(container) if last == "-" else int(last)
+                if op == "add":
+                    container.insert(index, copy.deepcopy(operation["value"]))
+                elif op == "remove":
+                    del container[index]
+                else:
+                    container[index] = copy.deepcopy(operation["value"])
+            else:
+                if op != "add" and last not in container:
+                    raise KeyError(last)
+                if op == "remove":
+                    del container[last]
+                else:
+                    container[last] = copy.deepcopy(operation["value"])
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid JSON patch path {path}: {e}") from e
+    return document
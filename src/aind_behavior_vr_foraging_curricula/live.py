@@ -0,0 +1,201 @@
+import abc
+import json
+import logging
+import os
+import time
+import typing as t
+from pathlib import Path
+
+from aind_behavior_curriculum import Metrics, Trainer, TrainerState
+from pydantic import BaseModel, Field, SerializeAsAny
+
+from .streams import get_required_streams, get_stream
+
+logger = logging.getLogger(__name__)
+
+_TCallable = t.TypeVar("_TCallable", bound=t.Callable[..., t.Any])
+
+
+class SoftwareEvent(t.NamedTuple):
+    timestamp: float
+    data: t.Any
+
+
+class JsonLinesTail:
+    """Reads the lines appended to a JSON lines file since the previous read.
+
+    Only the new bytes are read on each call. A trailing line without a newline is assumed
+    to still be being written, and is kept until it is completed. If the file shrinks, it
+    is assumed to have been replaced and is read again from the start.
+    """
+
+    def __init__(self, path: os.PathLike) -> None:
+        self.path = Path(path)
+        self._offset = 0
+        self._partial = b""
+
+    def reset(self) -> None:
+        """Reads the file from the start on the next call."""
+        self._offset, self._partial = 0, b""
+
+    def read_new(self) -> tuple[list[t.Any], bool]:
+        """Returns the documents appended since the previous call, and whether the file was restarted."""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return [], False
+        restarted = size < self._offset
+        if restarted:
+            logger.warning("%s was truncated, reading it again from the start.", self.path)
+            self.reset()
+        if size == self._offset:
+            return [], restarted
+        with open(self.path, "rb") as file:
+            file.seek(self._offset)
+            chunk = file.read(size - self._offset)
+        self._offset += len(chunk)
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        return [json.loads(line) for line in lines if line.strip()], restarted
+
+
+class IncrementalMetrics(abc.ABC):
+    """Running aggregates of a metrics provider, updated with the events appended to its streams.
+
+    Implementations must do O(new events) work per update, and produce the same metrics
+    as their provider would on the events seen so far.
+    """
+
+    def __init__(self, data_directory: os.PathLike) -> None:
+        self.data_directory = Path(data_directory)
+
+    @abc.abstractmethod
+    def update(self, stream: str, events: t.Sequence[SoftwareEvent]) -> None:
+        """Adds the events appended to a stream, in file order."""
+
+    @abc.abstractmethod
+    def metrics(self) -> Metrics:
+        """Returns the metrics of the events seen so far.
+
+        Raises:
+            ValueError: If the metrics cannot be computed yet.
+        """
+
+
+def supports_incremental(
+    incremental: t.Callable[[os.PathLike], IncrementalMetrics],
+) -> t.Callable[[_TCallable], _TCallable]:
+    """Declares the incremental counterpart of a metrics provider."""
+
+    def decorator(func: _TCallable) -> _TCallable:
+        setattr(func, "__incremental_metrics__", incremental)
+        return func
+
+    return decorator
+
+
+def get_incremental_metrics(
+    provider: t.Callable[..., t.Any],
+) -> t.Optional[t.Callable[[os.PathLike], IncrementalMetrics]]:
+    """Returns the incremental counterpart of a metrics provider, if declared with `supports_incremental`."""
+    return getattr(provider, "__incremental_metrics__", None)
+
+
+class TransitionStatus(BaseModel):
+    stage: str = Field(description="Name of the destination stage.")
+    fires: bool = Field(description="Whether the transition condition is met by the current metrics.")
+
+
+class LiveStatus(BaseModel):
+    n_new_events: int = Field(description="Number of events read since the previous update.")
+    metrics: t.Optional[SerializeAsAny[Metrics]] = Field(
+        default=None, description="The metrics so far, if they can be computed yet."
+    )
+    error: t.Optional[str] = Field(default=None, description="Why the metrics cannot be computed yet, if so.")
+    transitions: list[TransitionStatus] = Field(
+        default_factory=list,
+        description="Stage transitions of the current stage, in priority order. Only the first that fires is taken.",
+    )
+
+
+class LiveMetricsEngine:
+    """Follows a running session and keeps the metrics of its current stage up to date.
+
+    Each `update` only reads the bytes appended to the session streams since the previous one.
+    """
+
+    def __init__(self, data_directory: os.PathLike, trainer: Trainer, trainer_state: TrainerState) -> None:
+        from aind_behavior_vr_foraging.data_contract import dataset as vr_foraging_dataset
+        from contraqctor.contract.json import SoftwareEvents
+
+        stage = trainer_state.stage
+        if stage is None or stage.metrics_provider is None:
+            raise ValueError("Trainer state does not have a stage with a metrics provider")
+        provider = stage.metrics_provider.callable
+        if (incremental := get_incremental_metrics(provider)) is None:
+            raise ValueError(f"Metrics provider {provider.__module__}.{provider.__qualname__} is not incremental")
+        if (required_streams := get_required_streams(provider)) is None:
+            raise ValueError(f"Metrics provider {provider.__module__}.{provider.__qualname__} has no required streams")
+
+        self.trainer = trainer
+        self.trainer_state = trainer_state
+        self.aggregates = incremental(data_directory)
+        self._incremental = incremental
+        self._data_directory = data_directory
+        dataset = vr_foraging_dataset(data_directory)
+        self._tails: dict[str, JsonLinesTail] = {}
+        for path in required_streams:
+            stream = get_stream(dataset, path)
+            # Other streams (e.g. the task logic) are not appended to, and are read by the aggregates themselves
+            if isinstance(stream, SoftwareEvents):
+                self._tails[stream.name] = JsonLinesTail(stream.reader_params.path)
+
+    def update(self) -> LiveStatus:
+        """Reads the new events and returns the current metrics and the transitions they would fire."""
+        new_events: dict[str, list[SoftwareEvent]] = {}
+        for name, tail in self._tails.items():
+            documents, restarted = tail.read_new()
+            if restarted:
+                return self._restart()
+            new_events[name] = [SoftwareEvent(d["timestamp"], d.get("data")) for d in documents]
+        for name, events in new_events.items():
+            if events:
+                self.aggregates.update(name, events)
+
+        status = LiveStatus(n_new_events=sum(len(events) for events in new_events.values()))
+        try:
+            status.metrics = self.aggregates.metrics()
+        except ValueError as e:
+            status.error = str(e)
+            return status
+        assert self.trainer_state.stage is not None
+        status.transitions = [
+            TransitionStatus(stage=destination.name, fires=bool(transition.invoke(status.metrics)))
+            for transition, destination in self.trainer.curriculum.see_stage_transitions(self.trainer_state.stage)
+        ]
+        return status
+
+    def _restart(self) -> LiveStatus:
+        self.aggregates = self._incremental(self._data_directory)
+        for tail in self._tails.values():
+            tail.reset()
+        return self.update()
+
+
+def follow(
+    engine: LiveMetricsEngine, interval: float = 5.0, max_updates: t.Optional[int] = None
+) -> t.Iterator[LiveStatus]:
+    """Updates the engine every `interval` seconds, yielding each status.
+
+    Args:
+        engine: The engine to update.
+        interval: Seconds between the start of consecutive updates.
+        max_updates: Stops after this many updates. If None, follows until interrupted.
+    """
+    n_updates = 0
+    while max_updates is None or n_updates < max_updates:
+        start = time.monotonic()
+        yield engine.update()
+        n_updates += 1
+        if max_updates is None or n_updates < max_updates:
+            time.sleep(max(0.0, interval - (time.monotonic() - start)))
@@ -0,0 +1,163 @@
+import contextlib
+import contextvars
+import hashlib
+import logging
+import os
+import tempfile
+import typing as t
+from pathlib import Path
+
+from aind_behavior_curriculum import Metrics
+
+from . import __version__
+from .streams import get_required_streams, get_stream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE_BYTES = 256 * 1024 * 1024
+CACHE_DIR_ENV_VARIABLE = "AIND_VR_FORAGING_CURRICULA_CACHE_DIR"
+
+_active_cache: contextvars.ContextVar[t.Optional["MetricsCache"]] = contextvars.ContextVar(
+    "active_metrics_cache", default=None
+)
+
+
+def default_cache_directory() -> Path:
+    """Returns the default cache root, which can be overridden by an environment variable."""
+    if (root := os.environ.get(CACHE_DIR_ENV_VARIABLE)) is not None:
+        return Path(root)
+    return Path.home() / ".cache" / "aind_behavior_vr_foraging_curricula"
+
+
+class MetricsCache:
+    """On-disk cache of the metrics computed from a session.
+
+    Entries are keyed by a fingerprint of the session files read by the metrics provider
+    (path, size and modification time), the identity of the provider and the package version.
+    If the provider declares its streams with `streams.requires_streams`, only those files are
+    fingerprinted; otherwise every file in the session directory is. The cache is bounded in
+    size, and the least recently used entries are evicted first.
+    """
+
+    def __init__(self, root: os.PathLike | str, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES) -> None:
+        self._root = Path(root) / "metrics"
+        self._max_size_bytes = max_size_bytes
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    def key(self, dataset_path: os.PathLike | str, metrics_provider: t.Callable[..., Metrics]) -> str:
+        """Computes the cache key of the metrics produced by a provider for a session."""
+        hasher = hashlib.sha256()
+        hasher.update(f"{metrics_provider.__module__}.{metrics_provider.__qualname__}\n".encode())
+        hasher.update(f"{__version__}\n".encode())
+        hasher.update(f"{Path(dataset_path).resolve()}\n".encode())
+        for path in self._fingerprinted_files(dataset_path, metrics_provider):
+            try:
+                stat = path.stat()
+                hasher.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+            except OSError:
+                hasher.update(f"{path}:missing\n".encode())
+        return hasher.hexdigest()
+
+    def get(self, key: str, model: type[Metrics]) -> t.Optional[Metrics]:
+        """Returns the cached metrics for a key, or None on a miss."""
+        path = self._root / f"{key}.json"
+        try:
+            metrics = model.model_validate_json(path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning("Discarding unreadable metrics cache entry %s: %s", path, e)
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # Mark as recently used
+        return metrics
+
+    def put(self, key: str, metrics: Metrics) -> None:
+        """Stores metrics under a key, evicting old entries if the cache is over its size limit."""
+        self._root.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("wb", dir=self._root, suffix=".tmp", delete=False) as f:
+            f.write(metrics.model_dump_json().encode())
+        os.replace(f.name, self._root / f"{key}.json")
+        self.evict()
+
+    def get_or_compute(
+        self, dataset_path: os.PathLike | str, metrics_provider: t.Callable[[os.PathLike | str], Metrics]
+    ) -> Metrics:
+        """Returns the cached metrics of a session, computing and storing them on a miss.
+
+        Providers whose return annotation is not a `Metrics` subclass cannot be restored
+        from disk and are always computed.
+        """
+        model = t.get_type_hints(metrics_provider).get("return", None)
+        if not (isinstance(model, type) and issubclass(model, Metrics)):
+            return metrics_provider(dataset_path)
+
+        try:
+            key = self.key(dataset_path, metrics_provider)
+            if (metrics := self.get(key, model)) is not None:
+                logger.debug("Metrics cache hit for %s", dataset_path)
+                return metrics
+        except OSError as e:
+            logger.warning("Metrics cache lookup failed: %s", e)
+            return metrics_provider(dataset_path)
+
+        metrics = metrics_provider(dataset_path)
+        try:
+            self.put(key, metrics)
+        except OSError as e:
+            logger.warning("Failed to write metrics cache entry: %s", e)
+        return metrics
+
+    def evict(self) -> None:
+        """Removes the least recently used entries until the cache fits its size limit."""
+        evict_least_recently_used(self._root, "*.json", self._max_size_bytes)
+
+    def clear(self) -> None:
+        for path in self._root.glob("*.json"):
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _fingerprinted_files(dataset_path: os.PathLike | str, metrics_provider: t.Callable[..., t.Any]) -> list[Path]:
+        required_streams = get_required_streams(metrics_provider)
+        if required_streams is None:
+            return sorted(p for p in Path(dataset_path).rglob("*") if p.is_file())
+
+        from aind_behavior_vr_foraging.data_contract import dataset as vr_foraging_dataset
+
+        dataset = vr_foraging_dataset(dataset_path)
+        return [Path(get_stream(dataset, path).reader_params.path) for path in required_streams]
+
+
+def evict_least_recently_used(directory: Path, pattern: str, max_size_bytes: int) -> None:
+    """Removes the least recently modified files matching `pattern` until they fit in `max_size_bytes`."""
+    entries = []
+    for path in directory.glob(pattern):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_size <= max_size_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total_size -= size
+
+
+@contextlib.contextmanager
+def use_metrics_cache(cache: t.Optional[MetricsCache]) -> t.Iterator[t.Optional[MetricsCache]]:
+    """Sets the metrics cache used by `utils.metrics_from_dataset_path` within the context."""
+    token = _active_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _active_cache.reset(token)
+
+
+def get_metrics_cache() -> t.Optional[MetricsCache]:
+    """Returns the metrics cache of the current context, if any."""
+    return _active_cache.get()
@@ -0,0 +1,248 @@
+import functools
+import importlib
+import json
+import logging
+import os
+import tempfile
+import time
+import typing as t
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from aind_behavior_curriculum import Stage, Trainer, TrainerState
+from pydantic import BaseModel, Field
+
+from .archive import _list_files
+from .cli import _KNOWN_CURRICULA
+from .json_patch import content_hash
+from .stage_store import StageStore, dehydrate, has_references
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 64
+
+
+class MigrationOptions(BaseModel):
+    """Options shared by every trainer state of a migration."""
+
+    curriculum: t.Optional[str] = Field(
+        default=None, description="Forces the use of a specific curriculum, bypassing any automatic detection."
+    )
+    reset_task: bool = False
+    stage_store: t.Optional[Path] = None
+    dry_run: bool = False
+
+
+class MigrationResult(BaseModel):
+    path: str = Field(description="Path of the trainer state, relative to the migrated directory.")
+    success: bool = Field(description="Whether the trainer state was migrated successfully.")
+    changed: bool = Field(default=False, description="Whether the migrated trainer state differs from the input.")
+    curriculum: t.Optional[str] = Field(default=None, description="The name of the curriculum.")
+    from_version: t.Optional[str] = Field(default=None, description="The curriculum version of the input.")
+    to_version: t.Optional[str] = Field(default=None, description="The curriculum version of the output.")
+    stage: t.Optional[str] = Field(default=None, description="The name of the stage.")
+    error: t.Optional[str] = Field(default=None, description="The error message, if unsuccessful.")
+    error_type: t.Optional[str] = Field(default=None, description="The error type, if unsuccessful.")
+
+
+class MigrationSummary(BaseModel):
+    n_files: int = Field(description="Number of trainer states found.")
+    n_migrated: int = Field(description="Number of trainer states that were changed by the migration.")
+    n_unchanged: int = Field(description="Number of trainer states already up to date.")
+    n_failed: int = Field(description="Number of trainer states that could not be migrated.")
+    seconds: float = Field(description="Wall time of the migration, in seconds.")
+    failures: list[MigrationResult] = Field(default_factory=list, description="The failed trainer states.")
+
+    @property
+    def files_per_second(self) -> float:
+        return self.n_files / self.seconds if self.seconds > 0 else 0.0
+
+
+@functools.cache
+def _trainer(curriculum: str) -> Trainer:
+    if curriculum not in _KNOWN_CURRICULA:
+        raise ValueError(f"Unknown curriculum: {curriculum}. Available: {list(_KNOWN_CURRICULA)}")
+    return getattr(importlib.import_module(f"{__package__}.{curriculum}"), "TRAINER")
+
+
+@functools.cache
+def _stages_by_name(curriculum: str) -> dict[str, Stage]:
+    # The stages are built once per process, from the memoized stage factories of the curriculum
+    return {stage.name: stage for stage in _trainer(curriculum).curriculum.see_stages()}
+
+
+@functools.cache
+def _stage_store(root: Path) -> StageStore:
+    return StageStore(root)
+
+
+def _curriculum_name(document: dict[str, t.Any], options: MigrationOptions) -> str:
+    if options.curriculum is not None:
+        return options.curriculum.replace(f"{__package__}.", "")
+    curriculum = document.get("curriculum")
+    if not isinstance(curriculum, dict) or not isinstance(pkg_location := curriculum.get("pkg_location"), str):
+        raise ValueError("Trainer state does not have a curriculum.")
+    return pkg_location.replace(f"{__package__}.", "")
+
+
+def _migrate_stage(document: t.Mapping[str, t.Any], stage: Stage, reset_task: bool) -> Stage:
+    if reset_task:
+        return stage
+    if not isinstance(task := document.get("task"), t.Mapping):
+        raise ValueError(f"Stage {stage.name} does not have a task logic.")
+    # The task logic is validated against the current model, under its current version, in JSON mode
+    # like the rest of the trainer state
+    task = type(stage.task).model_validate_json(json.dumps({**task, "version": stage.task.version}))
+    return stage.model_copy(update={"task": task})
+
+
+def migrate_trainer_state(
+    document: str | bytes | dict[str, t.Any], curriculum: str, reset_task: bool = False
+) -> TrainerState:
+    """Upgrades a serialized trainer state to the current version of its curriculum.
+
+    The stage is mapped by name to its current definition, and the active policies by name to the
+    policies of that stage. The task logic, which the policies tune for each subject, is kept and
+    validated against the current task model, unless `reset_task`. Off-curriculum trainer states
+    always keep their task logic, which was set by hand.
+
+    Args:
+        document: The trainer state, serialized or parsed, with its task logic references resolved
+            (e.g. lazily, see `stage_store.resolve`).
+        curriculum: The name of the curriculum module (e.g. "depletion").
+        reset_task: Resets the task logic of on-curriculum trainer states to the one of the current stage,
+            discarding the changes made by the policies.
+
+    Raises:
+        ValueError: If the stage or an active policy is not in the current curriculum, or the
+            task logic is not valid under the current task model.
+    """
+    trainer_state = json.loads(document) if isinstance(document, (str, bytes)) else document
+    if not isinstance(trainer_state, dict):
+        raise ValueError("Trainer state must be a JSON object.")
+    trainer = _trainer(curriculum)
+    is_on_curriculum = trainer_state.get("is_on_curriculum", True)
+    if (stage_document := trainer_state.get("stage")) is None:
+        return trainer.create_trainer_state(stage=None, is_on_curriculum=is_on_curriculum, active_policies=[])
+
+    stages = _stages_by_name(curriculum)
+    if (stage := stages.get(name := stage_document.get("name"))) is None:
+        raise ValueError(
+            f"Stage {name} is not in version {trainer.curriculum.version} of {trainer.curriculum.name}. "
+            f"Available: {list(stages)}"
+        )
+    stage = _migrate_stage(stage_document, stage, reset_task and is_on_curriculum)
+    policies = {policy.name: policy for policy in stage.see_policies()}
+    active_policies = []
+    for policy_name in trainer_state.get("active_policies") or []:
+        if (policy := policies.get(policy_name)) is None:
+            raise ValueError(f"Policy {policy_name} is not in stage {stage.name}. Available: {list(policies)}")
+        active_policies.append(policy)
+    return trainer.create_trainer_state(stage=stage, is_on_curriculum=is_on_curriculum, active_policies=active_policies)
+
+
+def _fingerprint(document: t.Any) -> str:
+    return content_hash(dehydrate(document, content_hash))
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile("wb", dir=path.parent, suffix=".tmp", delete=False) as f:
+        f.write(content)
+    os.replace(f.name, path)
+
+
+def migrate_file(
+    root: Path, path: str, output: Path, options: MigrationOptions = MigrationOptions()
+) -> MigrationResult:
+    """Migrates a trainer state file and writes it under the output directory, at the same relative path.
+
+    Errors are reported in the result instead of being raised, so that one bad trainer state
+    does not abort the whole migration. The migrated trainer state is validated before it is
+    written, and written atomically, so a failed or interrupted migration leaves the file as it was.
+    """
+    result = MigrationResult(path=path, success=False)
+    try:
+        contents = (root / path).read_bytes()
+        document = json.loads(contents)
+        store = _stage_store(options.stage_store) if options.stage_store is not None else None
+        if store is None and has_references(contents):
+            raise ValueError("Trainer state references task logic, but no stage store was provided.")
+        result.curriculum = _curriculum_name(document, options)
+        result.from_version = (document.get("curriculum") or {}).get("version")
+        result.stage = (document.get("stage") or {}).get("name")
+
+        with warnings.catch_warnings():
+            # Parsing the task logic of a previous version warns about the version coercion
+            warnings.simplefilter("ignore")
+            # Only the task logic read by the migration (the one of the current stage) is fetched from the store
+            trainer_state = migrate_trainer_state(
+                store.resolve(document) if store is not None else document, result.curriculum, options.reset_task
+            )
+        migrated = trainer_state.model_dump_json(indent=2)
+        trainer = _trainer(result.curriculum)
+        trainer.trainer_state_model.model_validate_json(migrated)
+        result.to_version = trainer.curriculum.version
+
+        migrated_document = json.loads(migrated)
+        # Compared with the task logic replaced by its hash, as stored, so that references need not be fetched
+        result.changed = _fingerprint(migrated_document) != _fingerprint(document)
+        if not options.dry_run and (result.changed or output != root):
+            if store is not None:
+                migrated_document = store.dehydrate(migrated_document)
+                migrated = json.dumps(migrated_document, indent=2, ensure_ascii=False)
+            _write_atomic(output / path, migrated.encode("utf-8"))
+        result.success = True
+    except Exception as e:
+        result.error, result.error_type = str(e), type(e).__name__
+    return result
+
+
+def _migrate_files(root: Path, paths: list[str], output: Path, options: MigrationOptions) -> list[MigrationResult]:
+    return [migrate_file(root, path, output, options) for path in paths]
+
+
+def migrate_directory(
+    root: os.PathLike | str,
+    output: t.Optional[os.PathLike | str] = None,
+    options: MigrationOptions = MigrationOptions(),
+    max_workers: t.Optional[int] = None,
+) -> MigrationSummary:
+    """Migrates every trainer state of a directory to the current version of its curriculum.
+
+    Args:
+        root: The directory. Every `.json` file under it is considered a trainer state.
+        output: Directory to write the migrated trainer states to, at the same relative paths.
+            Defaults to migrating them in place.
+        options: The migration options.
+        max_workers: Number of worker processes. Defaults to the number of CPUs.
+            If 1, trainer states are migrated sequentially in the current process.
+    """
+    start = time.perf_counter()
+    root = Path(root).resolve()
+    output = Path(output).resolve() if output is not None else root
+    paths = sorted(_list_files(root))
+    chunks = [paths[i : i + _CHUNK_SIZE] for i in range(0, len(paths), _CHUNK_SIZE)]
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(chunks))
+    if max_workers <= 1:
+        results = [_migrate_files(root, chunk, output, options) for chunk in chunks]
+    else:
+        n = len(chunks)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(_migrate_files, [root] * n, chunks, [output] * n, [options] * n))
+
+    flat = [result for chunk in results for result in chunk]
+    failures = [result for result in flat if not result.success]
+    n_migrated = sum(result.changed for result in flat if result.success)
+    summary = MigrationSummary(
+        n_files=len(flat),
+        n_migrated=n_migrated,
+        n_unchanged=len(flat) - n_migrated - len(failures),
+        n_failed=len(failures),
+        seconds=time.perf_counter() - start,
+        failures=failures,
+    )
+    logger.info("Migrated %d of %d trainer states", summary.n_migrated, summary.n_files)
+    return summary
@@ -1,3 +1,4 @@
+import functools
 from typing import Any, Type, TypeVar
 
 import aind_behavior_curriculum
@@ -15,12 +16,14 @@ from ..cli import CurriculumCliArgs, CurriculumSuggestion
 from ..depletion.curriculum import (
     metrics_from_dataset_path,
     st_s_stage_one_odor_no_depletion_s_stage_one_odor_w_depletion_day_0,
-    trainer_state_from_file,
+    trainer_state_from_json,
 )
 from ..depletion.metrics import DepletionCurriculumMetrics
 from ..depletion.stages import (
     make_s_stage_one_odor_no_depletion,
 )
+from ..phases import phase
+from ..stage_cache import stage_cache
 from .stages import make_s_stage_a100_b100_c0, make_s_stage_b100_c0, make_s_stage_reversals
 
 CURRICULUM_NAME = "OperantConditioning"
@@ -36,41 +39,57 @@ TModel = TypeVar("TModel", bound=pydantic.BaseModel)
 curriculum_class: Type[aind_behavior_curriculum.Curriculum[AindVrForagingTaskLogic]] = create_curriculum(
     CURRICULUM_NAME, __semver__, (AindVrForagingTaskLogic,), pkg_location=PKG_LOCATION
 )
-CURRICULUM = curriculum_class()
 
 
 def st_never(metrics: DepletionCurriculumMetrics) -> bool:
     return False
 
 
-CURRICULUM.add_stage_transition(
-    make_s_stage_one_odor_no_depletion(),
-    make_s_stage_a100_b100_c0(),
-    StageTransition(st_s_stage_one_odor_no_depletion_s_stage_one_odor_w_depletion_day_0),
-)
-
-CURRICULUM.add_stage_transition(
-    make_s_stage_a100_b100_c0(),
-    make_s_stage_b100_c0(),
-    StageTransition(st_never),
-)
+def make_curriculum() -> aind_behavior_curriculum.Curriculum[AindVrForagingTaskLogic]:
+    curriculum = curriculum_class()
+    with stage_cache():
+        curriculum.add_stage_transition(
+            make_s_stage_one_odor_no_depletion(),
+            make_s_stage_a100_b100_c0(),
+            StageTransition(st_s_stage_one_odor_no_depletion_s_stage_one_odor_w_depletion_day_0),
+        )
+        curriculum.add_stage_transition(
+            make_s_stage_a100_b100_c0(),
+            make_s_stage_b100_c0(),
+            StageTransition(st_never),
+        )
+        curriculum.add_stage_transition(
+            make_s_stage_b100_c0(),
+            make_s_stage_reversals(),
+            StageTransition(st_never),
+        )
+    return curriculum
 
-CURRICULUM.add_stage_transition(
-    make_s_stage_b100_c0(),
-    make_s_stage_reversals(),
-    StageTransition(st_never),
-)
 
 # ==============================================================================
 # Create a Trainer that uses the curriculum to bootstrap suggestions
 # ==============================================================================
 
-TRAINER = Trainer(CURRICULUM)
+
+@functools.cache
+def get_trainer() -> Trainer:
+    """Builds the curriculum and its trainer on first use."""
+    return Trainer(make_curriculum())
+
+
+def __getattr__(name: str) -> Any:
+    # CURRICULUM and TRAINER are only built when first accessed (PEP 562)
+    if name == "TRAINER":
+        return get_trainer()
+    if name == "CURRICULUM":
+        return get_trainer().curriculum
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def run_curriculum(args: CurriculumCliArgs) -> CurriculumSuggestion[TrainerState[Any], Any]:
     metrics: aind_behavior_curriculum.Metrics
-    trainer_state = trainer_state_from_file(args.input_trainer_state, TRAINER)
+    trainer_state = trainer_state_from_json(args.read_input_trainer_state(), get_trainer())
     metrics = metrics_from_dataset_path(args.data_directory, trainer_state)
-    trainer_state = TRAINER.evaluate(trainer_state, metrics)
+    with phase("evaluate"):
+        trainer_state = get_trainer().evaluate(trainer_state, metrics)
     return CurriculumSuggestion(trainer_state=trainer_state, metrics=metrics, version=__semver__)
@@ -7,6 +7,7 @@ from aind_behavior_vr_foraging.task_logic import (
 
 from ..depletion import helpers
 from ..depletion.metrics import metrics_from_dataset
+from ..stage_cache import cached_stage
 
 
 # ============================================================
@@ -111,6 +112,7 @@ def make_environment(
     return environment_statistics
 
 
+@cached_stage
 def make_s_stage_a100_b100_c0() -> Stage:
     env = make_environment(reward_probability=(1.0, 1.0, 0.0), state_occupancy=(0.2, 0.4, 0.4))
     task_logic = AindVrForagingTaskLogic(
@@ -130,6 +132,7 @@ def make_s_stage_a100_b100_c0() -> Stage:
     )
 
 
+@cached_stage
 def make_s_stage_b100_c0() -> Stage:
     env = make_environment(reward_probability=(1.0, 1.0, 0.0), state_occupancy=(0.0, 0.5, 0.5))
     task_logic = AindVrForagingTaskLogic(
@@ -159,6 +162,7 @@ def _make_block_end_condition() -> vr_task_logic.BlockEndCondition:
     )
 
 
+@cached_stage
 def make_s_stage_reversals() -> Stage:
     env_high = make_environment(reward_probability=(1.0, 1.0, 0.0), state_occupancy=(0.0, 0.5, 0.5))
     env_low = make_environment(reward_probability=(1.0, 0.0, 1.0), state_occupancy=(0.0, 0.5, 0.5))
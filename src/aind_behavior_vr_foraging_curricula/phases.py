@@ -0,0 +1,92 @@
+import contextlib
+import contextvars
+import time
+import tracemalloc
+import typing as t
+
+from pydantic import BaseModel, Field
+
+
+class PhaseTiming(BaseModel):
+    name: str = Field(description="Name of the phase. Nested phases are prefixed by their parent, separated by '/'.")
+    wall_time: float = Field(description="Wall time, in seconds.")
+    cpu_time: float = Field(description="CPU time of the process (all threads), in seconds.")
+    peak_memory: t.Optional[int] = Field(
+        default=None, description="Peak memory traced by Python during the phase, in bytes, if traced."
+    )
+
+
+class PhaseTimings(BaseModel):
+    phases: list[PhaseTiming] = Field(default_factory=list, description="Timings of each phase, in completion order.")
+
+
+class PhaseRecorder:
+    """Records the wall time, CPU time and (optionally) peak memory of nested phases.
+
+    Peak memory is measured with `tracemalloc`, which is started for the duration of
+    `record_phases` if `trace_memory` is set. It slows down allocations, and imports in
+    particular, by several times.
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.timings = PhaseTimings()
+        self._stack: list[str] = []
+        self._peaks: list[int] = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> t.Iterator[None]:
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            # The peak is reset for each phase, so the enclosing phase keeps its own peak so far
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._stack.append(name)
+        self._peaks.append(0)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            full_name = "/".join(self._stack)
+            self._stack.pop()
+            peak: t.Optional[int] = None
+            if tracing:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                tracemalloc.reset_peak()
+            else:
+                self._peaks.pop()
+            self.timings.phases.append(PhaseTiming(name=full_name, wall_time=wall, cpu_time=cpu, peak_memory=peak))
+
+
+_active_recorder: contextvars.ContextVar[t.Optional[PhaseRecorder]] = contextvars.ContextVar(
+    "active_phase_recorder", default=None
+)
+
+
+@contextlib.contextmanager
+def record_phases(recorder: t.Optional[PhaseRecorder]) -> t.Iterator[t.Optional[PhaseRecorder]]:
+    """Records the phases entered within the context with `recorder`. A None recorder disables recording."""
+    start_tracing = recorder is not None and recorder.trace_memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    token = _active_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _active_recorder.reset(token)
+        if start_tracing:
+            tracemalloc.stop()
+
+
+@contextlib.contextmanager
+def phase(name: str) -> t.Iterator[None]:
+    """Records a phase with the active recorder, if any. Does nothing otherwise."""
+    if (recorder := _active_recorder.get()) is None:
+        yield
+        return
+    with recorder.phase(name):
+        yield
@@ -5,7 +5,7 @@ from aind_behavior_vr_foraging import task_logic as vr_task_logic
 from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic
 
 from ..depletion.metrics import DepletionCurriculumMetrics
-from .utils import compute_cmc_transition_probability
+from .utils import compute_cmc_transition_probabilities
 
 # ============================================================
 # Policies to update task parameters based on metrics
@@ -37,6 +37,7 @@ def p_update_replenishment_rate(
 
     assert len(task.task_parameters.environment.blocks) == 1, "Only single block environments are supported."
     patches = task.task_parameters.environment.blocks[0].environment_statistics.patches
+    ctcm_functions: list[vr_task_logic.CtcmFunction] = []
     for patch in patches:
         reward_function_candidates = [
             f
@@ -50,11 +51,15 @@ def p_update_replenishment_rate(
             raise ValueError(
                 f"Expected exactly one CtcmFunction in OutsideRewardFunction for patch {patch.label}, found {reward_function_candidates}"
             )
-        # We assume a dt = 0.1, and an approximately poisson replenishment process
-        dt = 0.1
-        estimated_rate = -np.log(np.array(reward_function_candidates[0].probability.transition_matrix)[0, 0]) / dt
-        updated_rate = clamp(estimated_rate - gain_from_water, 0.05, 0.10)
-        reward_function_candidates[0].probability.transition_matrix = compute_cmc_transition_probability(
-            len(reward_function_candidates[0].probability.transition_matrix), updated_rate, dt
-        ).tolist()
+        ctcm_functions.append(reward_function_candidates[0].probability)
+
+    # We assume a dt = 0.1, and an approximately poisson replenishment process
+    dt = 0.1
+    estimated_rates = np.array([-np.log(f.transition_matrix[0][0]) / dt for f in ctcm_functions])
+    updated_rates = np.clip(estimated_rates - gain_from_water, 0.05, 0.10)
+    transition_matrices = compute_cmc_transition_probabilities(
+        [len(f.transition_matrix) for f in ctcm_functions], updated_rates, dt
+    )
+    for ctcm_function, transition_matrix in zip(ctcm_functions, transition_matrices):
+        ctcm_function.transition_matrix = transition_matrix.tolist()
     return task
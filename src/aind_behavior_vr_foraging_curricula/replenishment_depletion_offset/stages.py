@@ -4,6 +4,7 @@ from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic, AindVr
 
 from ..depletion import helpers
 from ..depletion.metrics import metrics_from_dataset
+from ..stage_cache import cached_stage
 from .policies import p_update_replenishment_rate
 from .utils import make_patch
 
@@ -26,6 +27,7 @@ num_ps_states = [16, 12, 7]  # number of discrete reward states within each patc
 rhos = [0.9, 0.9, 0.9]
 
 
+@cached_stage
 def make_s_mcm_final_stage() -> Stage:
     patch1 = make_patch(
         label="High",
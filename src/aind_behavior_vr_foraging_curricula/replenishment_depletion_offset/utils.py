@@ -1,8 +1,9 @@
-from typing import cast
+from typing import Sequence, cast
 
 import numpy as np
+import numpy.typing as npt
 from aind_behavior_vr_foraging import task_logic as vr_task_logic
-from scipy.linalg import expm
+from scipy.special import gammainc
 
 
 def compute_cmc_transition_probability(n_states: int, rep_rate: float, dt: float = 0.1) -> np.ndarray:
@@ -14,8 +15,6 @@ def compute_cmc_transition_probability(n_states: int, rep_rate: float, dt: float
         number reward states per patch.
     rep_rate: float
        replenishment rate.
-    T: float
-        model time step
     dt: float
         experiment time step
 
@@ -25,16 +24,59 @@ def compute_cmc_transition_probability(n_states: int, rep_rate: float, dt: float
     p_t: nd-array
         matrix of replenishment probabilities (#states * #states)
     """
+    return compute_cmc_transition_probabilities([n_states], [rep_rate], dt)[0]
 
-    q = np.zeros((n_states, n_states))
-    np.fill_diagonal(q, -rep_rate)
-    np.fill_diagonal(q[:, 1:], rep_rate)
-    q[-1, -1] = 0
 
-    # compute replenishment probability function dependent on replenishment time (here experiment dt)
-    p_t = expm(q * dt)
-    assert p_t.ndim == 2
-    return p_t
+def compute_cmc_transition_probabilities(
+    n_states: Sequence[int], rep_rates: Sequence[float] | npt.ArrayLike, dt: float = 0.1
+) -> list[np.ndarray]:
+    """Computes the replenishment transition probability matrices of many patches at once.
+
+    The replenishment process is a pure-birth chain with a constant rate, where the last
+    state is absorbing. Its transition probabilities over `dt` (i.e. `expm(Q * dt)` for the
+    bidiagonal generator `Q`) have a closed form: moving `k` states ahead follows a Poisson
+    distribution with mean `rep_rate * dt`, and the absorbing state collects the Poisson upper
+    tail, computed directly as a regularized incomplete gamma function so that it keeps its
+    relative precision far in the tail. This avoids the O(n^3) matrix exponential.
+
+    Args:
+        n_states: Number of reward states of each patch.
+        rep_rates: Replenishment rate of each patch.
+        dt: Experiment time step.
+
+    Returns:
+        A list with the (n_states, n_states) transition matrix of each patch.
+    """
+    n_states = [int(n) for n in n_states]
+    rates = np.asarray(rep_rates, dtype=float)
+    if rates.ndim != 1 or len(rates) != len(n_states):
+        raise ValueError("n_states and rep_rates must be sequences of the same length.")
+    if any(n < 1 for n in n_states):
+        raise ValueError("n_states must be positive.")
+    if np.any(rates < 0) or dt < 0:
+        raise ValueError("rep_rates and dt must be non-negative.")
+    if len(n_states) == 0:
+        return []
+
+    # Poisson pmf of the number of births, for every rate at once, computed in log space
+    k = np.arange(max(n_states))
+    mean = rates[:, None] * dt
+    log_factorial = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, len(k))))))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_pmf = np.where(k == 0, 0.0, k * np.log(mean)) - mean - log_factorial
+    pmf = np.exp(log_pmf)
+
+    matrices = []
+    for n, patch_pmf, patch_mean in zip(n_states, pmf, mean[:, 0]):
+        p_t = np.zeros((n, n))
+        # Transient states move k states ahead with Poisson probability, without reaching the absorbing state
+        i, j = np.triu_indices(n - 1)
+        p_t[i, j] = patch_pmf[j - i]
+        # The absorbing state collects the probability of n - 1 - i births or more, P(n - 1 - i, mean)
+        p_t[: n - 1, n - 1] = gammainc(np.arange(n - 1, 0, -1), patch_mean)
+        p_t[n - 1, n - 1] = 1.0
+        matrices.append(p_t)
+    return matrices
 
 
 def make_patch_replenishment_function(
@@ -0,0 +1,116 @@
+import functools
+import json
+import os
+import typing as t
+from pathlib import Path
+
+from .json_patch import canonical_json, content_hash
+from .stage_store import REFERENCE_KEY, REFERENCE_PREFIX, dehydrate, is_reference, rehydrate_json
+
+DEFINITIONS_NAME = "_defs.json"
+DEFINITIONS_KEY = "$defs"
+
+
+def bundle_curriculum(document: t.Any, definitions: dict[str, t.Any]) -> t.Any:
+    """Moves the task logic of the stages of a serialized curriculum to shared definitions.
+
+    Args:
+        document: The curriculum, as a JSON document.
+        definitions: The task logic of the bundle, by hash. Updated in place.
+
+    Returns:
+        The curriculum, with the task logic of its stages replaced by `{"$ref": "sha256:<hash>"}` references.
+    """
+
+    def put(task: dict[str, t.Any]) -> str:
+        digest = content_hash(task)
+        definitions.setdefault(digest, task)
+        return digest
+
+    return dehydrate(document, put)
+
+
+def dump_definitions(definitions: t.Mapping[str, t.Any]) -> str:
+    """Serializes the definitions of a bundle, sorted by hash, one canonical JSON definition per line."""
+    lines = [
+        f"        {json.dumps(digest)}: {canonical_json(definitions[digest]).decode()}"
+        for digest in sorted(definitions)
+    ]
+    return "{\n" + f"    {json.dumps(DEFINITIONS_KEY)}: {{\n" + ",\n".join(lines) + "\n    }\n}\n"
+
+
+class SchemaBundle:
+    """Reads curricula serialized as a bundle: one `_defs.json` file with the task logic of every
+    stage, by hash, and one file per curriculum referencing it (see `_schema.main`).
+
+    The definitions are parsed once, on first use, and each curriculum once, so that loading
+    many curricula does not parse the same task logic over and over.
+    """
+
+    def __init__(self, root: os.PathLike | str) -> None:
+        self._root = Path(root)
+        self._documents: dict[str, t.Any] = {}
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    @functools.cached_property
+    def definitions(self) -> dict[str, t.Any]:
+        """The task logic of the bundle, by hash."""
+        path = self._root / DEFINITIONS_NAME
+        if not path.exists():
+            return {}
+        return json.loads(path.read_bytes())[DEFINITIONS_KEY]
+
+    @functools.cached_property
+    def _definitions_json(self) -> dict[str, bytes]:
+        return {digest: canonical_json(task) for digest, task in self.definitions.items()}
+
+    def curricula(self) -> list[str]:
+        """Names of the curricula of the bundle."""
+        return sorted(path.stem for path in self._root.glob("*.json") if not path.name.startswith(("_", ".")))
+
+    def read_json(self, curriculum: str) -> bytes:
+        """Returns a curriculum serialized as JSON, with its references resolved.
+
+        The result can be validated with `model_validate_json` like a curriculum serialized in full.
+
+        Raises:
+            KeyError: If a referenced task logic is not in the definitions.
+        """
+        return rehydrate_json((self._root / f"{curriculum}.json").read_bytes(), self._get_json)
+
+    def load(self, curriculum: str) -> t.Any:
+        """Returns a curriculum as a JSON document, with its references resolved.
+
+        The document is cached, and the task logic of stages is shared across the curricula of
+        the bundle: it must not be modified.
+
+        Raises:
+            KeyError: If a referenced task logic is not in the definitions.
+        """
+        if (document := self._documents.get(curriculum)) is None:
+            document = self._documents[curriculum] = self._resolve(
+                json.loads((self._root / f"{curriculum}.json").read_bytes())
+            )
+        return document
+
+    def _get_json(self, digest: str) -> bytes:
+        try:
+            return self._definitions_json[digest]
+        except KeyError:
+            raise KeyError(f"Task logic {digest} is not in the definitions of {self._root}.") from None
+
+    def _resolve(self, document: t.Any) -> t.Any:
+        if is_reference(document):
+            digest = document[REFERENCE_KEY].removeprefix(REFERENCE_PREFIX)
+            try:
+                return self.definitions[digest]
+            except KeyError:
+                raise KeyError(f"Task logic {digest} is not in the definitions of {self._root}.") from None
+        if isinstance(document, dict):
+            return {key: self._resolve(value) for key, value in document.items()}
+        if isinstance(document, list):
+            return [self._resolve(value) for value in document]
+        return document
@@ -0,0 +1,195 @@
+import http.client
+import importlib
+import json
+import logging
+import os
+import typing as t
+import urllib.parse
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aind_behavior_curriculum
+from pydantic import ValidationError
+
+from . import __version__
+from .cli import _KNOWN_CURRICULA, CurriculumCliArgs
+from .settings import CurriculumInitArguments, CurriculumRunArguments
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CONNECT_TIMEOUT = 2.0
+DEFAULT_READ_TIMEOUT = 600.0
+
+_RUN_FIELDS = {
+    "data_directory",
+    "input_trainer_state",
+    "curriculum",
+    "loader_workers",
+    "no_cache",
+    "cache_directory",
+    "stage_store",
+}
+
+
+class ServerUnavailableError(ConnectionError):
+    """Raised when the curriculum server cannot be reached."""
+
+
+class ServerRequestError(RuntimeError):
+    """Raised when the curriculum server fails to process a request."""
+
+
+def _run(payload: dict[str, t.Any]) -> str:
+    return CurriculumRunArguments.model_validate(payload).compute_suggestion().model_dump_json()
+
+
+def _init(payload: dict[str, t.Any]) -> str:
+    return CurriculumInitArguments.model_validate(payload).create_trainer_state().model_dump_json()
+
+
+def _health(payload: dict[str, t.Any]) -> str:
+    return json.dumps(
+        {
+            "version": __version__,
+            "dsl_version": aind_behavior_curriculum.__version__,
+            "curricula": list(_KNOWN_CURRICULA),
+        }
+    )
+
+
+class CurriculumRequestHandler(BaseHTTPRequestHandler):
+    """Serves the curriculum commands as JSON over HTTP.
+
+    Routes:
+        GET /health: Versions and available curricula.
+        POST /run: Body with the `curriculum run` arguments, returns the suggestion.
+        POST /init: Body with the `curriculum init` arguments, returns the trainer state.
+    """
+
+    server_version = f"curriculum/{__version__}"
+    _GET_ROUTES: dict[str, t.Callable[[dict[str, t.Any]], str]] = {"/health": _health}
+    _POST_ROUTES: dict[str, t.Callable[[dict[str, t.Any]], str]] = {"/run": _run, "/init": _init}
+
+    def do_GET(self) -> None:
+        self._dispatch(self._GET_ROUTES, {})
+
+    def do_POST(self) -> None:
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        except ValueError as e:
+            self._respond(HTTPStatus.BAD_REQUEST, self._error_body(e))
+            return
+        self._dispatch(self._POST_ROUTES, payload)
+
+    def _dispatch(self, routes: dict[str, t.Callable[[dict[str, t.Any]], str]], payload: dict[str, t.Any]) -> None:
+        if (route := routes.get(self.path)) is None:
+            self._respond(HTTPStatus.NOT_FOUND, json.dumps({"error": f"Unknown route {self.path}"}))
+            return
+        try:
+            body = route(payload)
+        except (ValidationError, ValueError, FileNotFoundError) as e:
+            self._respond(HTTPStatus.BAD_REQUEST, self._error_body(e))
+        except Exception as e:
+            logger.exception("Error while processing %s", self.path)
+            self._respond(HTTPStatus.INTERNAL_SERVER_ERROR, self._error_body(e))
+        else:
+            self._respond(HTTPStatus.OK, body)
+
+    def _respond(self, status: HTTPStatus, body: str) -> None:
+        encoded = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(encoded)))
+        self.end_headers()
+        self.wfile.write(encoded)
+
+    @staticmethod
+    def _error_body(e: Exception) -> str:
+        return json.dumps({"error": str(e), "error_type": type(e).__name__})
+
+    def log_message(self, format: str, *args: t.Any) -> None:
+        logger.info("%s - %s", self.address_string(), format % args)
+
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> ThreadingHTTPServer:
+    """Creates a curriculum server with every known curriculum (and its trainer) already built."""
+    for curriculum in _KNOWN_CURRICULA:
+        getattr(importlib.import_module(f"{__package__}.{curriculum}"), "TRAINER")
+    return ThreadingHTTPServer((host, port), CurriculumRequestHandler)
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """Runs a curriculum server until interrupted."""
+    with make_server(host, port) as server:
+        logger.info("Serving curricula on http://%s:%s", *server.server_address[:2])
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def request_suggestion(
+    server_url: str,
+    args: CurriculumCliArgs,
+    connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+    read_timeout: float = DEFAULT_READ_TIMEOUT,
+) -> str:
+    """Requests a suggestion from a curriculum server.
+
+    Paths are made absolute, since they are resolved by the server process.
+
+    Args:
+        server_url: The URL of the server (e.g. http://127.0.0.1:8765).
+        args: The arguments of the run.
+        connect_timeout: Seconds to wait for the connection to the server.
+        read_timeout: Seconds to wait for the suggestion, once connected.
+
+    Returns:
+        The suggestion, serialized as JSON.
+
+    Raises:
+        ServerUnavailableError: If the server cannot be connected to.
+        ServerRequestError: If the server fails to compute the suggestion, or does not
+            respond within the read timeout.
+    """
+    payload = args.model_dump(mode="json", include=_RUN_FIELDS)
+    for field in ("data_directory", "input_trainer_state", "cache_directory", "stage_store"):
+        if payload.get(field) is not None:
+            payload[field] = os.path.abspath(payload[field])
+
+    url = urllib.parse.urlsplit(server_url)
+    connection_type = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+    connection = connection_type(url.hostname or DEFAULT_HOST, url.port, timeout=connect_timeout)
+    try:
+        try:
+            connection.connect()
+        except OSError as e:
+            raise ServerUnavailableError(str(e)) from e
+        # Only a failure to connect falls back to running in-process. Once connected, the server may
+        # still be computing the suggestion, so timeouts and errors are raised instead.
+        assert connection.sock is not None
+        connection.sock.settimeout(read_timeout)
+        try:
+            connection.request(
+                "POST",
+                url.path.rstrip("/") + "/run",
+                body=json.dumps(payload).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+            )
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise ServerRequestError(f"{type(e).__name__}: {e}") from e
+    finally:
+        connection.close()
+
+    if response.status != HTTPStatus.OK:
+        try:
+            error = json.loads(body)
+            message = f"{error['error_type']}: {error['error']}"
+        except (ValueError, KeyError, TypeError):
+            message = f"HTTP {response.status} {response.reason}"
+        raise ServerRequestError(message)
+    return body.decode("utf-8")
@@ -0,0 +1,27 @@
+import typing as t
+
+from pydantic_settings import BaseSettings, PydanticBaseSettingsSource
+
+from .cli import CurriculumCliArgs, CurriculumInitCliArgs
+
+
+class ArgumentSettings(BaseSettings):
+    """Settings read only from the arguments they are built with.
+
+    Used for commands run on behalf of a request or a manifest entry (e.g. by the server, or the
+    workers of a batch), which must not pick up the environment variables of the process.
+    """
+
+    @classmethod
+    def settings_customise_sources(
+        cls, settings_cls: type[BaseSettings], init_settings: PydanticBaseSettingsSource, *args: t.Any, **kwargs: t.Any
+    ) -> tuple[PydanticBaseSettingsSource, ...]:
+        return (init_settings,)
+
+
+class CurriculumRunArguments(ArgumentSettings, CurriculumCliArgs):
+    """The arguments of `curriculum run`, without environment variables."""
+
+
+class CurriculumInitArguments(ArgumentSettings, CurriculumInitCliArgs):
+    """The arguments of `curriculum init`, without environment variables."""
@@ -0,0 +1,515 @@
+import abc
+import logging
+import pickle
+import typing as t
+
+import numpy as np
+from aind_behavior_curriculum import Metrics, Policy, Stage, Trainer
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+MetricsColumns = dict[str, t.Union[np.ndarray, dict[int, np.ndarray]]]
+"""The metrics of a batch of sessions, one array per field. Dictionary fields (e.g. counts per patch)
+are dictionaries of arrays, and optional float fields use NaN for None."""
+
+TaskColumns = dict[str, np.ndarray]
+"""The task logic parameters of a batch of subjects that a metrics model draws from, one array per parameter."""
+
+
+class SubjectBatch(t.NamedTuple):
+    """The state of the subjects whose next session is sampled."""
+
+    ability: np.ndarray
+    """A latent trait of each subject, drawn once from a standard normal distribution."""
+    sessions: np.ndarray
+    """Number of sessions each subject has run so far."""
+    sessions_in_stage: np.ndarray
+    """Number of sessions each subject has run in its current stage so far."""
+    tasks: t.Optional[t.Sequence[t.Any]] = None
+    """The task logic each subject runs its next session with: the task logic of its stage, updated by the
+    policies of the stage at each of its previous sessions in it. None stands for the task logic of the stage.
+    They are updated in place after the session, and must not be modified nor kept."""
+    parameters: t.Optional[TaskColumns] = None
+    """The task logic parameters of each subject, in stages whose policies the metrics model applies in batch
+    (see `MetricsModel.task_parameters`), in place of `tasks`."""
+
+
+class MetricsModel(abc.ABC):
+    """Generative model of the metrics of the sessions of virtual subjects."""
+
+    @abc.abstractmethod
+    def sample(self, stage: Stage, subjects: SubjectBatch, rng: np.random.Generator) -> MetricsColumns:
+        """Draws the metrics of the next session of a batch of subjects in a stage.
+
+        Args:
+            stage: The stage the subjects are in.
+            subjects: The state of the subjects.
+            rng: The random number generator to draw from.
+
+        Returns:
+            One array of length `len(subjects.ability)` per metrics field.
+        """
+
+    def task_parameters(self, stage: Stage) -> t.Optional[dict[str, t.Any]]:
+        """Returns the task logic parameters of a stage that the model draws from, if it can apply all the
+        policies of the stage to them in batch (see `apply_policies`).
+
+        Subjects in the stage then carry these parameters (see `SubjectBatch.parameters`) instead
+        of their own copy of the task logic. By default, the policies are applied to the task
+        logic of each subject.
+        """
+        return None
+
+    def apply_policies(
+        self, stage: Stage, policies: t.Sequence[Policy], metrics: MetricsColumns, parameters: TaskColumns
+    ) -> TaskColumns:
+        """Applies policies to the task logic parameters of a batch of subjects, after a session.
+
+        Args:
+            stage: The stage the subjects stay in.
+            policies: The active policies of the subjects, in the order they are applied.
+            metrics: The metrics of the session of each subject.
+            parameters: The task logic parameters of each subject (see `task_parameters`).
+
+        Returns:
+            The updated task logic parameters.
+        """
+        raise NotImplementedError
+
+
+class SimulationSettings(BaseModel):
+    n_subjects: int = Field(default=1000, ge=1, description="Number of virtual subjects.")
+    n_sessions: int = Field(default=60, ge=1, description="Number of sessions run by each subject.")
+    initial_stage: t.Optional[str] = Field(
+        default=None, description="Stage the subjects are enrolled in. Defaults to the first stage of the curriculum."
+    )
+    graduation_stage: t.Optional[str] = Field(
+        default=None,
+        description="Stage counted as graduation. Defaults to the last stage without outgoing transitions.",
+    )
+    seed: t.Optional[int] = Field(default=None, description="Seed of the random number generator.")
+
+
+class DwellTime(BaseModel):
+    fraction_visited: float = Field(description="Fraction of the subjects that ran at least one session in the stage.")
+    mean: t.Optional[float] = Field(
+        description="Mean number of sessions in the stage, of the subjects that visited it."
+    )
+    quantiles: dict[str, float] = Field(description="Quantiles of the number of sessions in the stage.")
+
+
+class SimulationSummary(BaseModel):
+    n_subjects: int
+    n_sessions: int
+    graduation_stage: str
+    fraction_graduated: float = Field(description="Fraction of the subjects that graduated within `n_sessions`.")
+    sessions_to_graduation: dict[str, float] = Field(
+        description="Quantiles of the number of sessions run before graduating, of the subjects that graduated."
+    )
+    stage_dwell: dict[str, DwellTime] = Field(description="Number of sessions spent in each stage.")
+
+
+class SimulationResult:
+    """The stage every subject was in at each session."""
+
+    def __init__(self, stage_names: list[str], stages: np.ndarray, graduation_stage: str) -> None:
+        self.stage_names = stage_names
+        self.stages = stages
+        """Index in `stage_names` of the stage of each session, of shape (n_subjects, n_sessions + 1).
+        The last column is the stage suggested after the last session."""
+        self.graduation_stage = graduation_stage
+
+    def sessions_to_graduation(self) -> np.ndarray:
+        """Returns the number of sessions each subject ran before graduating, or -1 if it did not."""
+        graduated = self.stages == self.stage_names.index(self.graduation_stage)
+        return np.where(graduated.any(axis=1), graduated.argmax(axis=1), -1)
+
+    def dwell_times(self, stage: str) -> np.ndarray:
+        """Returns the number of sessions each subject ran in a stage."""
+        return np.count_nonzero(self.stages[:, :-1] == self.stage_names.index(stage), axis=1)
+
+    def summary(self, quantiles: t.Sequence[float] = (0.05, 0.25, 0.5, 0.75, 0.95)) -> SimulationSummary:
+        def _quantiles(values: np.ndarray) -> dict[str, float]:
+            if len(values) == 0:
+                return {}
+            return {f"p{round(q * 100)}": float(v) for q, v in zip(quantiles, np.quantile(values, quantiles))}
+
+        to_graduation = self.sessions_to_graduation()
+        graduated = to_graduation[to_graduation >= 0]
+        stage_dwell = {}
+        for name in self.stage_names:
+            if name == self.graduation_stage:
+                continue
+            dwell = self.dwell_times(name)
+            visited = dwell[dwell > 0]
+            stage_dwell[name] = DwellTime(
+                fraction_visited=len(visited) / len(dwell),
+                mean=float(visited.mean()) if len(visited) > 0 else None,
+                quantiles=_quantiles(visited),
+            )
+        return SimulationSummary(
+            n_subjects=self.stages.shape[0],
+            n_sessions=self.stages.shape[1] - 1,
+            graduation_stage=self.graduation_stage,
+            fraction_graduated=len(graduated) / len(to_graduation),
+            sessions_to_graduation=_quantiles(graduated),
+            stage_dwell=stage_dwell,
+        )
+
+
+class _MappingColumn:
+    """A dictionary field of a batch of metrics, e.g. `n_patches_visited_per_patch`."""
+
+    def __init__(self, columns: dict[int, np.ndarray], n: int) -> None:
+        self._columns = columns
+        self._n = n
+
+    def __getitem__(self, key: int) -> np.ndarray:
+        return self._columns[key]
+
+    def get(self, key: int, default: t.Any = None) -> np.ndarray:
+        if (column := self._columns.get(key)) is not None:
+            return column
+        return np.full(self._n, default)
+
+
+class _MetricsBatch:
+    """Stands in for a metrics instance, with an array per field, to evaluate rules on a batch of sessions."""
+
+    def __init__(self, columns: MetricsColumns, n: int) -> None:
+        self._columns = columns
+        self._n = n
+
+    def __getattr__(self, name: str) -> t.Any:
+        try:
+            column = self._columns[name]
+        except KeyError:
+            raise AttributeError(name) from None
+        return _MappingColumn(column, self._n) if isinstance(column, dict) else column
+
+
+def _take(columns: MetricsColumns, rows: np.ndarray) -> MetricsColumns:
+    return {
+        name: {key: c[rows] for key, c in column.items()} if isinstance(column, dict) else column[rows]
+        for name, column in columns.items()
+    }
+
+
+def _rows(columns: MetricsColumns, rows: np.ndarray) -> t.Iterator[dict[str, t.Any]]:
+    """Yields the fields of each of the `rows` of a batch of metrics, as Python values."""
+    values: dict[str, list[t.Any]] = {}
+    for name, column in columns.items():
+        if isinstance(column, dict):
+            per_key = {key: c[rows].tolist() for key, c in column.items()}
+            values[name] = [dict(zip(per_key, items)) for items in zip(*per_key.values())]
+        elif column.dtype.kind == "f":
+            values[name] = [None if np.isnan(v) else v for v in column[rows].tolist()]
+        else:
+            values[name] = column[rows].tolist()
+    for items in zip(*values.values()):
+        yield dict(zip(values, items))
+
+
+class _RuleEvaluator:
+    """Evaluates stage transition rules on batches of sessions.
+
+    Rules are first called once on the whole batch, with arrays in place of the metrics
+    fields (e.g. `metrics.n_patches_visited > 20` becomes an array comparison); a boolean
+    result applies to every session. The first batched result of a rule is checked against
+    its result on each of the sessions of the batch; rules that cannot be evaluated this way
+    (e.g. that combine conditions with `and`), or whose batched result does not match, are
+    evaluated one session at a time on metrics built without validation. Sessions with
+    missing (None) values are always evaluated one at a time.
+    """
+
+    def __init__(self, metrics_model: type[Metrics]) -> None:
+        self._metrics_model = metrics_model
+        self._vectorizable: dict[t.Callable[..., t.Any], bool] = {}
+
+    def __call__(self, rule: t.Callable[[t.Any], t.Any], columns: MetricsColumns, n: int) -> np.ndarray:
+        complete = np.ones(n, dtype=bool)
+        for column in columns.values():
+            if not isinstance(column, dict) and column.dtype.kind == "f":
+                complete &= ~np.isnan(column)
+
+        result = np.zeros(n, dtype=bool)
+        per_row = np.arange(n)
+        if self._vectorizable.get(rule, True) and complete.any():
+            rows = np.flatnonzero(complete)
+            if (batched := self._evaluate_batch(rule, _take(columns, rows), len(rows))) is not None:
+                result[rows] = batched
+                per_row = np.flatnonzero(~complete)
+        if len(per_row) > 0:
+            result[per_row] = self._evaluate_rows(rule, columns, per_row)
+        return result
+
+    def _evaluate_batch(
+        self, rule: t.Callable[[t.Any], t.Any], columns: MetricsColumns, n: int
+    ) -> t.Optional[np.ndarray]:
+        try:
+            with np.errstate(all="ignore"):
+                result = rule(_MetricsBatch(columns, n))
+        except Exception:
+            result = None
+        if isinstance(result, (bool, np.bool_)):
+            result = np.full(n, result)
+        if not (isinstance(result, np.ndarray) and result.dtype == bool and result.shape == (n,)):
+            # e.g. `and` only accepts arrays of a single session
+            self._vectorizable[rule] = False
+            logger.debug("Evaluating rule %s one session at a time.", rule)
+            return None
+        if rule not in self._vectorizable:
+            self._vectorizable[rule] = bool(np.array_equal(result, self._evaluate_rows(rule, columns, np.arange(n))))
+            if not self._vectorizable[rule]:
+                logger.debug("Rule %s does not evaluate the same on a batch, evaluating one session at a time.", rule)
+                return None
+        return result
+
+    def _evaluate_rows(self, rule: t.Callable[[t.Any], t.Any], columns: MetricsColumns, rows: np.ndarray) -> np.ndarray:
+        construct = self._metrics_model.model_construct
+        return np.fromiter(
+            (bool(rule(construct(**values))) for values in _rows(columns, rows)), dtype=bool, count=len(rows)
+        )
+
+
+def _graduation_stage(trainer: Trainer, stages: list[Stage]) -> str:
+    terminal = [stage for stage in stages if not trainer.curriculum.see_stage_transitions(stage)]
+    if not terminal:
+        raise ValueError("The curriculum does not have a stage without transitions to graduate to.")
+    return terminal[-1].name
+
+
+def simulate(
+    trainer: Trainer,
+    metrics_model: MetricsModel,
+    settings: SimulationSettings = SimulationSettings(),
+) -> SimulationResult:
+    """Runs virtual subjects through the stages of a curriculum.
+
+    At each session, the metrics of all subjects in a stage are drawn at once from
+    `metrics_model`, and the stage transitions are evaluated in order, with the first one
+    that fires moving the subject to its destination stage, as in `Trainer.evaluate`.
+    Subjects that stay in their stage then go through its policy transitions, evaluated the
+    same way, and its policies (see `_PolicyUpdater`), which update the task logic of their
+    next session that the metrics model draws from. Subjects moving to a new stage start
+    with its task logic and start policies.
+
+    Args:
+        trainer: The trainer of the curriculum.
+        metrics_model: The generative model of the metrics of each session.
+        settings: The simulation settings.
+
+    Returns:
+        The stage of each subject at each session.
+    """
+    stages = list(trainer.curriculum.see_stages())
+    names = [stage.name for stage in stages]
+    for name in (settings.initial_stage, settings.graduation_stage):
+        if name is not None and name not in names:
+            raise ValueError(f"Unknown stage: {name}. Available: {names}")
+    graduation_stage = settings.graduation_stage or _graduation_stage(trainer, stages)
+
+    transitions: list[list[tuple[t.Callable[[t.Any], t.Any], int]]] = []
+    evaluators: dict[int, _RuleEvaluator] = {}
+    updaters: dict[int, _PolicyUpdater] = {}
+    for i, stage in enumerate(stages):
+        transitions.append(
+            [
+                (transition.callable, names.index(dest.name))
+                for transition, dest in trainer.curriculum.see_stage_transitions(stage)
+            ]
+        )
+        if transitions[-1] or stage.see_policies():
+            if stage.metrics_provider is None:
+                raise ValueError(f"Stage {stage.name} has transitions or policies but no metrics provider.")
+            model = t.get_type_hints(stage.metrics_provider.callable).get("return", Metrics)
+            model = model if isinstance(model, type) and issubclass(model, Metrics) else Metrics
+            evaluators[i] = _RuleEvaluator(model)
+            if stage.see_policies():
+                updaters[i] = _PolicyUpdater(stage, i, model, evaluators[i], metrics_model)
+
+    rng = np.random.default_rng(settings.seed)
+    n = settings.n_subjects
+    ability = rng.standard_normal(n)
+    current = np.full(n, names.index(settings.initial_stage) if settings.initial_stage else 0, dtype=np.intp)
+    sessions_in_stage = np.zeros(n, dtype=np.int64)
+    state = _TaskState(stages, updaters, current)
+    history = np.empty((n, settings.n_sessions + 1), dtype=np.intp)
+    for session in range(settings.n_sessions):
+        history[:, session] = current
+        following = current.copy()
+        for i in np.unique(current):
+            if i not in evaluators:
+                continue
+            rows = np.flatnonzero(current == i)
+            tasks, parameters = state.get(i, rows)
+            subjects = SubjectBatch(
+                ability[rows], np.full(len(rows), session), sessions_in_stage[rows], tasks, parameters
+            )
+            columns = metrics_model.sample(stages[i], subjects, rng)
+            undecided = np.arange(len(rows))
+            for rule, destination in transitions[i]:
+                fired = evaluators[i](rule, _take(columns, undecided), len(undecided))
+                following[rows[undecided[fired]]] = destination
+                state.enter(destination, rows[undecided[fired]])
+                if len(undecided := undecided[~fired]) == 0:
+                    break
+            if i in updaters and len(undecided) > 0:
+                updaters[i](columns, rows, undecided, state)
+        sessions_in_stage = np.where(following == current, sessions_in_stage + 1, 0)
+        current = following
+    history[:, -1] = current
+    return SimulationResult(names, history, graduation_stage)
+
+
+class _TaskState:
+    """The active policies and task logic of each subject."""
+
+    def __init__(self, stages: list[Stage], updaters: dict[int, "_PolicyUpdater"], current: np.ndarray) -> None:
+        n = len(current)
+        self._stages = stages
+        self._initial_parameters = {i: updater.task_parameters for i, updater in updaters.items()}
+        # The task logic of a stage is shared by the subjects that have not been updated by a policy in it
+        self.tasks: list[t.Any] = [stages[current[0]].task] * n
+        self.owned = np.zeros(n, dtype=bool)
+        """Whether each subject has its own copy of its task logic."""
+        self._start_policies = [tuple(stage.start_policies) for stage in stages]
+        self.policies: list[tuple[Policy, ...]] = [self._start_policies[current[0]]] * n
+        self.parameters: dict[int, TaskColumns] = {
+            i: {name: np.full(n, value) for name, value in values.items()}
+            for i, values in self._initial_parameters.items()
+            if values is not None
+        }
+        """The task logic parameters of the subjects in each stage whose policies the metrics model applies."""
+
+    def get(self, stage: int, rows: np.ndarray) -> tuple[t.Optional[list[t.Any]], t.Optional[TaskColumns]]:
+        """Returns the task logic, or the task logic parameters, of the subjects of `rows` in a stage."""
+        if (parameters := self.parameters.get(stage)) is not None:
+            return None, {name: column[rows] for name, column in parameters.items()}
+        return [self.tasks[r] for r in rows], None
+
+    def enter(self, stage: int, rows: np.ndarray) -> None:
+        """Starts the subjects of `rows` with the task logic and start policies of a stage."""
+        self.owned[rows] = False
+        task, policies = self._stages[stage].task, self._start_policies[stage]
+        for r in rows:
+            self.tasks[r], self.policies[r] = task, policies
+        if (parameters := self.parameters.get(stage)) is not None:
+            for name, column in parameters.items():
+                column[rows] = self._initial_parameters[stage][name]
+
+
+class _PolicyUpdater:
+    """Updates the active policies and task logic of the subjects staying in a stage, as `Trainer.evaluate` does.
+
+    The policy transitions of the subjects with the same active policies are evaluated at
+    once with a `_RuleEvaluator`; duplicate destination policies are dropped, keeping the
+    first one. The policies are then applied in batch by the metrics model, to the task
+    logic parameters of the subjects, if it supports the policies of the stage (see
+    `MetricsModel.task_parameters`). Otherwise, they are applied one subject at a time, on
+    metrics built without validation, to a copy of the task logic of the stage that each
+    subject makes the first time it goes through the policies.
+    """
+
+    def __init__(
+        self,
+        stage: Stage,
+        stage_index: int,
+        metrics_type: type[Metrics],
+        evaluator: _RuleEvaluator,
+        metrics_model: MetricsModel,
+    ) -> None:
+        self._stage = stage
+        self._stage_index = stage_index
+        self._metrics_type = metrics_type
+        self._evaluator = evaluator
+        self._metrics_model = metrics_model
+        self._transitions: dict[Policy, list[tuple[t.Callable[[t.Any], t.Any], Policy]]] = {}
+        self.task_parameters = metrics_model.task_parameters(self._stage)
+        """The initial task logic parameters of the subjects, if the metrics model applies the policies."""
+
+    def __call__(self, columns: MetricsColumns, rows: np.ndarray, staying: np.ndarray, state: _TaskState) -> None:
+        tasks, owned, policies = state.tasks, state.owned, state.policies
+        # Subjects are grouped by the identity of their tuple of active policies, which is shared, as policies are
+        # slow to hash
+        groups: dict[int, tuple[tuple[Policy, ...], list[int]]] = {}
+        for j in staying.tolist():
+            groups.setdefault(id(policies[rows[j]]), (policies[rows[j]], []))[1].append(j)
+        updated: dict[int, tuple[tuple[Policy, ...], list[int]]] = {}
+        for active, members in groups.values():
+            for j, following in zip(members, self._evaluate_transitions(active, columns, np.array(members))):
+                policies[rows[j]] = following
+                updated.setdefault(id(following), (following, []))[1].append(j)
+
+        if (parameters := state.parameters.get(self._stage_index)) is not None:
+            for active, members in updated.values():
+                group = np.array(members)
+                batch = {name: column[rows[group]] for name, column in parameters.items()}
+                batch = self._metrics_model.apply_policies(self._stage, active, _take(columns, group), batch)
+                for name, column in batch.items():
+                    parameters[name][rows[group]] = column
+            return
+
+        construct = self._metrics_type.model_construct
+        pickled: dict[int, bytes] = {}
+        for j, values in zip(staying.tolist(), _rows(columns, staying)):
+            r = rows[j]
+            if not owned[r]:
+                # Unpickling is faster than a deep copy of the task logic
+                if (blob := pickled.get(id(tasks[r]))) is None:
+                    blob = pickled[id(tasks[r])] = pickle.dumps(tasks[r], protocol=pickle.HIGHEST_PROTOCOL)
+                tasks[r], owned[r] = pickle.loads(blob), True
+            metrics = construct(**values)
+            for policy in policies[r]:
+                tasks[r] = policy.invoke(metrics, tasks[r])
+
+    def _see_transitions(self, policy: Policy) -> list[tuple[t.Callable[[t.Any], t.Any], Policy]]:
+        if (transitions := self._transitions.get(policy)) is None:
+            transitions = [(rule.callable, dest) for rule, dest in self._stage.see_policy_transitions(policy)]
+            self._transitions[policy] = transitions
+        return transitions
+
+    def _evaluate_transitions(
+        self, active: tuple[Policy, ...], columns: MetricsColumns, rows: np.ndarray
+    ) -> list[tuple[Policy, ...]]:
+        """Returns the policies active after the session of each of the `rows`."""
+        if not any(self._see_transitions(policy) for policy in active):
+            return [active] * len(rows)
+        candidates: list[Policy] = []
+        destinations = np.empty((len(rows), len(active)), dtype=np.intp)
+        for k, policy in enumerate(active):
+            destinations[:, k] = len(candidates)
+            candidates.append(policy)
+            undecided = np.arange(len(rows))
+            for rule, destination in self._see_transitions(policy):
+                fired = self._evaluator(rule, _take(columns, rows[undecided]), len(undecided))
+                destinations[undecided[fired], k] = len(candidates)
+                candidates.append(destination)
+                if len(undecided := undecided[~fired]) == 0:
+                    break
+        following: dict[tuple[int, ...], tuple[Policy, ...]] = {}
+        keys = list(map(tuple, destinations.tolist()))
+        for key in keys:
+            if key not in following:
+                following[key] = tuple(dict.fromkeys(candidates[c] for c in key))
+        return [following[key] for key in keys]
+
+
+def default_metrics_model(trainer: Trainer) -> MetricsModel:
+    """Returns the generative model of the metrics of the stages of a curriculum.
+
+    Raises:
+        ValueError: If no model is available for the metrics of the curriculum.
+    """
+    from .depletion.metrics import DepletionCurriculumMetrics
+    from .depletion.simulation import DepletionMetricsModel
+
+    metrics_types = {
+        t.get_type_hints(stage.metrics_provider.callable).get("return")
+        for stage in trainer.curriculum.see_stages()
+        if stage.metrics_provider is not None and trainer.curriculum.see_stage_transitions(stage)
+    }
+    if metrics_types and all(isinstance(m, type) and issubclass(m, DepletionCurriculumMetrics) for m in metrics_types):
+        return DepletionMetricsModel()
+    raise ValueError(f"No metrics model is available for curriculum {trainer.curriculum.name}.")
@@ -1,10 +1,9 @@
-import os
-from typing import Any, Type, TypeVar, Union
+import functools
+from typing import Any, Type, TypeVar
 
 import aind_behavior_curriculum
 import pydantic
 from aind_behavior_curriculum import (
-    Metrics,
     StageTransition,
     Trainer,
     TrainerState,
@@ -14,7 +13,9 @@ from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic
 
 from .. import __semver__
 from ..cli import CurriculumCliArgs, CurriculumSuggestion
-from ..utils import model_from_json_file
+from ..phases import phase
+from ..stage_cache import stage_cache
+from ..utils import metrics_from_dataset_path, trainer_state_from_json
 from .metrics import SingleSiteMatchingMetrics
 from .stages import (
     make_s_graduated_stage,
@@ -55,38 +56,43 @@ def st_s_learn_to_stop_to_s_graduated_stage(metrics: SingleSiteMatchingMetrics)
 curriculum_class: Type[aind_behavior_curriculum.Curriculum[AindVrForagingTaskLogic]] = create_curriculum(
     CURRICULUM_NAME, __semver__, (AindVrForagingTaskLogic,), pkg_location=PKG_LOCATION
 )
-CURRICULUM = curriculum_class()
 
-CURRICULUM.add_stage_transition(
-    make_s_learn_to_stop(),
-    make_s_graduated_stage(),
-    StageTransition(st_s_learn_to_stop_to_s_graduated_stage),
-)
+
+def make_curriculum() -> aind_behavior_curriculum.Curriculum[AindVrForagingTaskLogic]:
+    curriculum = curriculum_class()
+    with stage_cache():
+        curriculum.add_stage_transition(
+            make_s_learn_to_stop(),
+            make_s_graduated_stage(),
+            StageTransition(st_s_learn_to_stop_to_s_graduated_stage),
+        )
+    return curriculum
+
 
 # ==============================================================================
 # Create a Trainer that uses the curriculum to bootstrap suggestions
 # ==============================================================================
 
-TRAINER = Trainer(CURRICULUM)
-
 
-def trainer_state_from_file(path: Union[str, os.PathLike], trainer: Trainer = TRAINER) -> TrainerState:
-    return model_from_json_file(path, trainer.trainer_state_model)
+@functools.cache
+def get_trainer() -> Trainer:
+    """Builds the curriculum and its trainer on first use."""
+    return Trainer(make_curriculum())
 
 
-def metrics_from_dataset_path(dataset_path: Union[str, os.PathLike], trainer_state: TrainerState) -> Metrics:
-    stage = trainer_state.stage
-    if stage is None:
-        raise ValueError("Trainer state does not have a stage")
-    if stage.metrics_provider is None:
-        raise ValueError("Stage does not have a metrics provider")
-    metrics_provider = stage.metrics_provider
-    return metrics_provider.callable(dataset_path)
+def __getattr__(name: str) -> Any:
+    # CURRICULUM and TRAINER are only built when first accessed (PEP 562)
+    if name == "TRAINER":
+        return get_trainer()
+    if name == "CURRICULUM":
+        return get_trainer().curriculum
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def run_curriculum(args: CurriculumCliArgs) -> CurriculumSuggestion[TrainerState[Any], Any]:
     metrics: aind_behavior_curriculum.Metrics
-    trainer_state = trainer_state_from_file(args.input_trainer_state)
+    trainer_state = trainer_state_from_json(args.read_input_trainer_state(), get_trainer())
     metrics = metrics_from_dataset_path(args.data_directory, trainer_state)
-    trainer_state = TRAINER.evaluate(trainer_state, metrics)
+    with phase("evaluate"):
+        trainer_state = get_trainer().evaluate(trainer_state, metrics)
     return CurriculumSuggestion(trainer_state=trainer_state, metrics=metrics, version=__semver__)
@@ -1,14 +1,20 @@
+import collections
 import logging
 import os
+import typing as t
 from typing import cast
 
-import pandas as pd
+import numpy as np
 from aind_behavior_curriculum import Metrics
 from aind_behavior_vr_foraging.data_contract import dataset as vr_foraging_dataset
 from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic
-from contraqctor.contract.json import SoftwareEvents
 from pydantic import Field, NonNegativeFloat, NonNegativeInt
 
+from ..columnar import load_event_columns
+from ..extraction import extract_field
+from ..live import IncrementalMetrics, SoftwareEvent, supports_incremental
+from ..streams import load_streams, requires_streams
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,18 +35,75 @@ class SingleSiteMatchingMetrics(Metrics):
     )
 
 
-def _try_get_datastream_as_dataframe(datastream: SoftwareEvents) -> pd.DataFrame | None:
-    try:
-        datastream.load()
-        return datastream.data
-    except FileNotFoundError:
-        return None
+REQUIRED_STREAMS = (
+    "Behavior/InputSchemas/TaskLogic",
+    *(
+        f"Behavior/SoftwareEvents/{name}"
+        for name in (
+            "GiveReward",
+            "ChoiceFeedback",
+            "UpdaterStopVelocityThreshold",
+            "UpdaterStopDurationOffset",
+            "ActivePatch",
+        )
+    ),
+)
+
+
+class IncrementalSingleSiteMatchingMetrics(IncrementalMetrics):
+    """Running aggregates of `metrics_from_dataset`, for a session that is still being acquired."""
+
+    def __init__(self, data_directory: os.PathLike) -> None:
+        super().__init__(data_directory)
+        self._unique_patches_indices: list[int] | None = None
+        self._total_water_consumed = 0.0
+        self._n_choices = 0
+        self._n_patches_seen_per_index: collections.Counter[int] = collections.Counter()
+        self._last_stop_threshold: float | None = None
+        self._last_stop_duration_offset: float | None = None
+
+    def update(self, stream: str, events: t.Sequence[SoftwareEvent]) -> None:
+        if stream == "GiveReward":
+            self._total_water_consumed += sum(event.data for event in events)
+        elif stream == "ChoiceFeedback":
+            self._n_choices += len(events)
+        elif stream == "ActivePatch":
+            self._n_patches_seen_per_index.update(
+                extract_field([event.data for event in events], "state_index", np.int64).tolist()
+            )
+        elif stream == "UpdaterStopVelocityThreshold":
+            self._last_stop_threshold = events[-1].data
+        elif stream == "UpdaterStopDurationOffset":
+            self._last_stop_duration_offset = events[-1].data
+
+    def _read_unique_patches_indices(self) -> list[int]:
+        # The task logic is written once at the start of the session
+        if self._unique_patches_indices is None:
+            task_logic = vr_foraging_dataset(self.data_directory)["Behavior"]["InputSchemas"]["TaskLogic"]
+            try:
+                task_logic.load()
+                patches = task_logic.data.task_parameters.environment.blocks[0].environment_statistics.patches
+            except FileNotFoundError as e:
+                raise ValueError("No task logic yet.") from e
+            self._unique_patches_indices = list(set(cast(int, p.state_index) for p in patches))
+        return self._unique_patches_indices
+
+    def metrics(self) -> SingleSiteMatchingMetrics:
+        unique_patches_indices = self._read_unique_patches_indices()
+        return SingleSiteMatchingMetrics(
+            total_water_consumed=self._total_water_consumed * 1e-3,
+            n_patches_visited=self._n_choices,
+            n_patches_seen=sum(self._n_patches_seen_per_index[index] for index in unique_patches_indices),
+            last_stop_threshold_updater=self._last_stop_threshold,
+            last_stop_duration_offset_updater=self._last_stop_duration_offset,
+        )
 
 
+@supports_incremental(IncrementalSingleSiteMatchingMetrics)
+@requires_streams(*REQUIRED_STREAMS)
 def metrics_from_dataset(data_directory: os.PathLike) -> SingleSiteMatchingMetrics:
     dataset = vr_foraging_dataset(data_directory)
-
-    task_logic = dataset["Behavior"]["InputSchemas"]["TaskLogic"].load().data
+    task_logic = load_streams(dataset, REQUIRED_STREAMS[:1])["TaskLogic"].data
     if isinstance(task_logic, dict):
         task_logic = AindVrForagingTaskLogic.model_validate(task_logic)
 
@@ -52,38 +115,24 @@ def metrics_from_dataset(data_directory: os.PathLike) -> SingleSiteMatchingMetri
         )
     )
 
-    total_water_consumed = _try_get_datastream_as_dataframe(dataset["Behavior"]["SoftwareEvents"]["GiveReward"])
-    choices = _try_get_datastream_as_dataframe(dataset["Behavior"]["SoftwareEvents"]["ChoiceFeedback"])
-    stop_velocity_threshold = _try_get_datastream_as_dataframe(
-        dataset["Behavior"]["SoftwareEvents"]["UpdaterStopVelocityThreshold"]
-    )
-    stop_duration_offset = _try_get_datastream_as_dataframe(
-        dataset["Behavior"]["SoftwareEvents"]["UpdaterStopDurationOffset"]
-    )
-
-    visited_patches = _try_get_datastream_as_dataframe(dataset["Behavior"]["SoftwareEvents"]["ActivePatch"])
+    events = load_event_columns(dataset, REQUIRED_STREAMS[1:])
+    total_water_consumed = events["GiveReward"]
+    choices = events["ChoiceFeedback"]
+    stop_velocity_threshold = events["UpdaterStopVelocityThreshold"]
+    stop_duration_offset = events["UpdaterStopDurationOffset"]
+    visited_patches = events["ActivePatch"]
 
-    visited_patches_per_index = (
-        (
-            visited_patches["data"]
-            .apply(lambda x: x["state_index"])
-            .value_counts()
-            .reindex(unique_patches_indices, fill_value=0)
-            .to_dict()
-        )
-        if visited_patches is not None
-        else {index: 0 for index in unique_patches_indices}
-    )
+    if visited_patches is not None and len(visited_patches) > 0:
+        state_indices, counts = np.unique(visited_patches["state_index"], return_counts=True)
+        visited_patches_per_index = dict(zip(state_indices.tolist(), counts.tolist()))
+    else:
+        visited_patches_per_index = {}
 
     return SingleSiteMatchingMetrics(
-        total_water_consumed=(total_water_consumed["data"].sum() if total_water_consumed is not None else 0.0)
+        total_water_consumed=(total_water_consumed["data"].sum().item() if total_water_consumed else 0.0)
         * 1e-3,  # convert from uL to mL
         n_patches_visited=len(choices) if choices is not None else 0,
-        n_patches_seen=sum(visited_patches_per_index.values()),
-        last_stop_threshold_updater=stop_velocity_threshold["data"].iloc[-1]
-        if stop_velocity_threshold is not None
-        else None,
-        last_stop_duration_offset_updater=stop_duration_offset["data"].iloc[-1]
-        if stop_duration_offset is not None
-        else None,
+        n_patches_seen=sum(visited_patches_per_index.get(index, 0) for index in unique_patches_indices),
+        last_stop_threshold_updater=stop_velocity_threshold["data"][-1].item() if stop_velocity_threshold else None,
+        last_stop_duration_offset_updater=stop_duration_offset["data"][-1].item() if stop_duration_offset else None,
     )
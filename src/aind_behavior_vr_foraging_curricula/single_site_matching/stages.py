@@ -5,6 +5,7 @@ import aind_behavior_vr_foraging.task_logic as vr_task_logic
 from aind_behavior_curriculum import MetricsProvider, Policy, Stage
 from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic, AindVrForagingTaskParameters
 
+from ..stage_cache import cached_stage
 from .metrics import metrics_from_dataset
 from .policies import p_learn_to_stop
 
@@ -169,6 +170,7 @@ def make_operation_control(velocity_threshold: float) -> vr_task_logic.Operation
 # ============================================================
 
 
+@cached_stage
 def make_s_learn_to_stop() -> Stage:
     return Stage(
         name="learn_to_stop",
@@ -218,6 +220,7 @@ def make_s_learn_to_stop() -> Stage:
     )
 
 
+@cached_stage
 def make_s_graduated_stage() -> Stage:
     _graduated_make_patch_kwargs = {
         "inter_patch_min_length": 30,
@@ -0,0 +1,83 @@
+import contextlib
+import contextvars
+import functools
+import typing as t
+
+from aind_behavior_curriculum import Stage
+
+_TFactory = t.TypeVar("_TFactory", bound=t.Callable[..., Stage])
+
+
+class StageCacheInfo(t.NamedTuple):
+    hits: int
+    misses: int
+
+
+class StageCache:
+    """Builds each stage factory at most once.
+
+    A curriculum keeps the first instance of every stage it is given, so the repeated
+    factory calls used to declare its transitions can safely share one instance. Instances
+    are never shared across caches, so stages of different curricula can still be mutated
+    independently. Deep copies are deliberately avoided, as copying a stage is not cheaper
+    than building it.
+    """
+
+    def __init__(self) -> None:
+        self._stages: dict[t.Callable[..., Stage], Stage] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get_or_build(self, factory: t.Callable[[], Stage]) -> Stage:
+        if (stage := self._stages.get(factory)) is not None:
+            self._hits += 1
+            return stage
+        self._misses += 1
+        stage = self._stages[factory] = factory()
+        return stage
+
+    def info(self) -> StageCacheInfo:
+        return StageCacheInfo(self._hits, self._misses)
+
+
+_active_cache: contextvars.ContextVar[t.Optional[StageCache]] = contextvars.ContextVar(
+    "active_stage_cache", default=None
+)
+_total_hits = 0
+_total_misses = 0
+
+
+@contextlib.contextmanager
+def stage_cache() -> t.Iterator[StageCache]:
+    """Shares the stages built by `cached_stage` factories within the context."""
+    global _total_hits, _total_misses
+    cache = StageCache()
+    token = _active_cache.set(cache)
+    try:
+        yield cache
+    finally:
+        _active_cache.reset(token)
+        _total_hits += cache.info().hits
+        _total_misses += cache.info().misses
+
+
+def stage_cache_info() -> StageCacheInfo:
+    """Returns the hits and misses accumulated over every `stage_cache` context that has exited."""
+    return StageCacheInfo(_total_hits, _total_misses)
+
+
+def cached_stage(factory: _TFactory) -> _TFactory:
+    """Marks a stage factory as cacheable by `stage_cache`.
+
+    Outside of a `stage_cache` context, or when called with arguments, the factory
+    builds a new stage on every call.
+    """
+
+    @functools.wraps(factory)
+    def wrapper(*args: t.Any, **kwargs: t.Any) -> Stage:
+        cache = _active_cache.get()
+        if cache is None or args or kwargs:
+            return factory(*args, **kwargs)
+        return cache.get_or_build(factory)
+
+    return t.cast(_TFactory, wrapper)
@@ -0,0 +1,198 @@
+import json
+import os
+import re
+import tempfile
+import typing as t
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from .json_patch import canonical_json, content_hash
+
+REFERENCE_KEY = "$ref"
+REFERENCE_PREFIX = "sha256:"
+_STAGE_KEYS = frozenset(("name", "task", "graph", "metrics_provider"))
+_REFERENCE_PATTERN = re.compile(rb'\{\s*"\$ref"\s*:\s*"sha256:([0-9a-f]{64})"\s*\}')
+
+
+def is_reference(value: t.Any) -> bool:
+    """Returns whether a JSON value is a reference to a task logic of a stage store."""
+    return (
+        isinstance(value, dict)
+        and len(value) == 1
+        and isinstance(reference := value.get(REFERENCE_KEY), str)
+        and reference.startswith(REFERENCE_PREFIX)
+    )
+
+
+def has_references(document: t.Union[str, bytes]) -> bool:
+    """Returns whether a serialized JSON document references task logic of a stage store."""
+    if isinstance(document, str):
+        document = document.encode()
+    return _REFERENCE_PATTERN.search(document) is not None
+
+
+def referenced_hashes(document: t.Union[str, bytes]) -> set[str]:
+    """Returns the hashes of the task logic referenced by a serialized JSON document."""
+    if isinstance(document, str):
+        document = document.encode()
+    return {match.decode() for match in _REFERENCE_PATTERN.findall(document)}
+
+
+def dehydrate(document: t.Any, put: t.Callable[[dict[str, t.Any]], str]) -> t.Any:
+    """Replaces the task logic of every stage of a JSON document by a reference.
+
+    Stages are found anywhere in the document (e.g. the current stage of a trainer state,
+    and the stages of its curriculum). The input is not modified.
+
+    Args:
+        document: The JSON document.
+        put: Stores a task logic and returns its hash.
+    """
+    if isinstance(document, list):
+        return [dehydrate(value, put) for value in document]
+    if not isinstance(document, dict):
+        return document
+    dehydrated = {key: dehydrate(value, put) for key, value in document.items() if key != "task"}
+    if "task" in document:
+        task = document["task"]
+        if _STAGE_KEYS <= document.keys() and isinstance(task, dict) and not is_reference(task):
+            dehydrated["task"] = {REFERENCE_KEY: REFERENCE_PREFIX + put(task)}
+        else:
+            dehydrated["task"] = dehydrate(task, put)
+        # Keep the key order of the input
+        dehydrated = {key: dehydrated[key] for key in document}
+    return dehydrated
+
+
+class LazyTaskLogic(t.Mapping[str, t.Any]):
+    """A task logic referenced by hash, which is only fetched and parsed when one of its fields is read."""
+
+    def __init__(self, digest: str, get_json: t.Callable[[str], bytes]) -> None:
+        self.digest = digest
+        self._get_json = get_json
+        self._document: t.Optional[dict[str, t.Any]] = None
+
+    @property
+    def is_resolved(self) -> bool:
+        return self._document is not None
+
+    def _resolve(self) -> dict[str, t.Any]:
+        if self._document is None:
+            self._document = json.loads(self._get_json(self.digest))
+        return self._document
+
+    def __getitem__(self, key: str) -> t.Any:
+        return self._resolve()[key]
+
+    def __iter__(self) -> t.Iterator[str]:
+        return iter(self._resolve())
+
+    def __len__(self) -> int:
+        return len(self._resolve())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({REFERENCE_PREFIX}{self.digest})"
+
+
+def resolve(document: t.Any, get_json: t.Callable[[str], bytes]) -> t.Any:
+    """Replaces the references of a JSON document by task logic that is fetched lazily (see `LazyTaskLogic`).
+
+    Reading a document this way only fetches the task logic that is actually read, e.g. the
+    task of the current stage of a trainer state but not those of its curriculum. The input
+    is not modified.
+
+    Args:
+        document: The JSON document.
+        get_json: Returns the serialized task logic of a hash.
+    """
+    if isinstance(document, list):
+        return [resolve(value, get_json) for value in document]
+    if not isinstance(document, dict):
+        return document
+    if is_reference(document):
+        return LazyTaskLogic(document[REFERENCE_KEY].removeprefix(REFERENCE_PREFIX), get_json)
+    return {key: resolve(value, get_json) for key, value in document.items()}
+
+
+def rehydrate_json(document: t.Union[str, bytes], get_json: t.Callable[[str], bytes]) -> bytes:
+    """Replaces the references of a serialized JSON document by the task logic they point to.
+
+    Every reference is fetched, since this is meant for documents that are then validated
+    as a whole (e.g. an input trainer state). See `resolve` to only fetch what is read.
+
+    Args:
+        document: The serialized JSON document.
+        get_json: Returns the serialized task logic of a hash.
+    """
+    if isinstance(document, str):
+        document = document.encode()
+    if b"$ref" not in document:
+        return document
+    return _REFERENCE_PATTERN.sub(lambda match: get_json(match.group(1).decode()), document)
+
+
+class StageStore:
+    """Content-addressed store of the task logic of stages.
+
+    Each task logic is stored once, as canonical JSON (see `json_patch.canonical_json`) in a
+    file named after its SHA-256. Serialized trainer states, curricula and suggestions can be
+    "dehydrated", replacing the task of every stage by a `{"$ref": "sha256:<hash>"}` reference,
+    and "rehydrated" back. Rehydration splices the stored JSON into the serialized document,
+    so the result is parsed and validated like any other document. Documents that are only
+    partially read can instead be resolved lazily (see `resolve`), so that the task logic
+    nobody reads is never fetched. Each task logic is read from disk at most once per store
+    instance.
+    """
+
+    def __init__(self, root: os.PathLike | str) -> None:
+        self._root = Path(root)
+        self._documents: dict[str, bytes] = {}
+
+    @property
+    def root(self) -> Path:
+        return self._root
+
+    def path(self, digest: str) -> Path:
+        return self._root / f"{digest}.json"
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._documents or self.path(digest).exists()
+
+    def put(self, task: t.Union[BaseModel, t.Mapping[str, t.Any]]) -> str:
+        """Stores a task logic, if not already stored, and returns its hash."""
+        document = task.model_dump(mode="json") if isinstance(task, BaseModel) else task
+        digest = content_hash(document)
+        if digest not in self:
+            content = canonical_json(document)
+            self._root.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile("wb", dir=self._root, suffix=".tmp", delete=False) as f:
+                f.write(content)
+            os.replace(f.name, self.path(digest))
+            self._documents[digest] = content
+        return digest
+
+    def get_json(self, digest: str) -> bytes:
+        """Returns the canonical JSON of a stored task logic.
+
+        Raises:
+            FileNotFoundError: If the task logic is not in the store.
+        """
+        if (content := self._documents.get(digest)) is None:
+            try:
+                content = self._documents[digest] = self.path(digest).read_bytes()
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Task logic {digest} is not in the stage store {self._root}.") from None
+        return content
+
+    def dehydrate(self, document: t.Any) -> t.Any:
+        """Stores the task logic of every stage of a JSON document and replaces it by a reference (see `dehydrate`)."""
+        return dehydrate(document, self.put)
+
+    def resolve(self, document: t.Any) -> t.Any:
+        """Replaces the references of a JSON document by task logic that is fetched lazily (see `resolve`)."""
+        return resolve(document, self.get_json)
+
+    def rehydrate_json(self, document: t.Union[str, bytes]) -> bytes:
+        """Replaces the references of a serialized JSON document by the task logic they point to."""
+        return rehydrate_json(document, self.get_json)
@@ -0,0 +1,100 @@
+import contextlib
+import contextvars
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+from .phases import phase
+
+if t.TYPE_CHECKING:
+    from contraqctor.contract import DataStream
+
+_TCallable = t.TypeVar("_TCallable", bound=t.Callable[..., t.Any])
+
+DEFAULT_MAX_WORKERS = 8
+_max_workers: contextvars.ContextVar[t.Optional[int]] = contextvars.ContextVar("max_workers", default=None)
+
+
+@contextlib.contextmanager
+def loader_workers(max_workers: t.Optional[int]) -> t.Iterator[None]:
+    """Sets the default number of threads used by `load_streams` within the context.
+
+    This allows callers (e.g. the CLI) to tune loading without threading the value
+    through the metrics providers. If None, the current default is kept.
+    """
+    token = _max_workers.set(max_workers if max_workers is not None else _max_workers.get())
+    try:
+        yield
+    finally:
+        _max_workers.reset(token)
+
+
+def default_max_workers() -> int:
+    """Returns the number of loader threads set by `loader_workers`, or `DEFAULT_MAX_WORKERS`."""
+    return _max_workers.get() or DEFAULT_MAX_WORKERS
+
+
+def requires_streams(*paths: str) -> t.Callable[[_TCallable], _TCallable]:
+    """Declares the data streams a metrics provider reads from the dataset.
+
+    Paths are relative to the dataset root and use "/" as a separator,
+    e.g. "Behavior/SoftwareEvents/GiveReward". The function is returned unchanged,
+    with the paths stored in its ``required_streams`` attribute.
+    """
+
+    def decorator(func: _TCallable) -> _TCallable:
+        setattr(func, "required_streams", tuple(paths))
+        return func
+
+    return decorator
+
+
+def get_required_streams(func: t.Callable[..., t.Any]) -> t.Optional[tuple[str, ...]]:
+    """Returns the stream paths declared with `requires_streams`, or None if nothing was declared."""
+    return getattr(func, "required_streams", None)
+
+
+def get_stream(dataset: "DataStream", path: str) -> "DataStream":
+    """Resolves a "/" separated path to a data stream, without loading it."""
+    stream = dataset
+    for name in path.split("/"):
+        stream = stream[name]
+    return stream
+
+
+def load_streams(
+    dataset: "DataStream", paths: t.Iterable[str], max_workers: t.Optional[int] = None
+) -> dict[str, "DataStream"]:
+    """Loads only the requested data streams of a dataset.
+
+    Streams are loaded concurrently in a bounded thread pool, so that the wall time on
+    network-mounted sessions is not the sum of the latency of every file.
+    Loading errors are not raised, but stored in each stream (see `DataStream.has_error`),
+    mirroring the behavior of `DataStream.load_all`.
+
+    Args:
+        dataset: The dataset to load the streams from.
+        paths: "/" separated paths of the streams, relative to the dataset root.
+        max_workers: Maximum number of loader threads. Defaults to the value set by
+            `loader_workers`, or `DEFAULT_MAX_WORKERS`.
+
+    Returns:
+        A dictionary of the loaded streams keyed by stream name.
+    """
+    streams: dict[str, "DataStream"] = {}
+    for path in paths:
+        stream = get_stream(dataset, path)
+        if stream.name in streams:
+            raise ValueError(f"Duplicated stream name {stream.name} in {path}.")
+        streams[stream.name] = stream
+
+    max_workers = max_workers or default_max_workers()
+    max_workers = min(max_workers, len(streams))
+    with phase("load_streams"):
+        if max_workers <= 1:
+            for stream in streams.values():
+                stream.load()
+        else:
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="load_streams") as executor:
+                # DataStream.load never raises, errors are stored in the stream itself
+                list(executor.map(lambda stream: stream.load(), streams.values()))
+    return streams
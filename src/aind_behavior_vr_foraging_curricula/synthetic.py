@@ -0,0 +1,142 @@
+import json
+import os
+import typing as t
+from pathlib import Path
+
+import numpy as np
+from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic
+from pydantic import BaseModel, Field, NonNegativeFloat, PositiveFloat
+
+_SOFTWARE_EVENTS = "SoftwareEvents"
+_UPDATER_EVENTS = "UpdaterEvents"
+
+
+class UpdaterRange(BaseModel):
+    """Range of an updater, which drifts from `start` to `stop` over the session."""
+
+    start: float
+    stop: float
+    noise: NonNegativeFloat = Field(default=0.0, description="Standard deviation of the noise added to each update.")
+
+
+class SyntheticSessionSettings(BaseModel):
+    duration: PositiveFloat = Field(default=3600.0, description="Duration of the session, in seconds.")
+    n_patches: t.Optional[int] = Field(
+        default=None, ge=1, description="Number of patches. If not provided, it is derived from `patch_rate`."
+    )
+    patch_rate: PositiveFloat = Field(default=0.1, description="Patches per second, if `n_patches` is not provided.")
+    reward_sites_per_patch: float = Field(default=4.0, ge=1, description="Mean number of reward sites per patch.")
+    choice_probability: float = Field(default=0.6, ge=0, le=1, description="Probability of stopping at a site.")
+    reward_probability: float = Field(default=0.8, ge=0, le=1, description="Probability of a choice being rewarded.")
+    reward_amount: NonNegativeFloat = Field(default=5.0, description="Reward amount, in microliters.")
+    reward_site_length: PositiveFloat = Field(default=50.0, description="Length of the reward sites, in cm.")
+    inter_site_length: PositiveFloat = Field(default=20.0, description="Length of the inter-site intervals, in cm.")
+    inter_patch_length: PositiveFloat = Field(default=200.0, description="Length of the inter-patch intervals, in cm.")
+    reward_delay_offset: UpdaterRange = Field(default=UpdaterRange(start=0.0, stop=0.5, noise=0.01))
+    stop_duration_offset: UpdaterRange = Field(default=UpdaterRange(start=0.0, stop=0.5, noise=0.01))
+    stop_velocity_threshold: UpdaterRange = Field(default=UpdaterRange(start=60.0, stop=10.0, noise=1.0))
+    seed: int = Field(default=0, description="Seed of the random number generator.")
+
+
+def _default_task_logic() -> AindVrForagingTaskLogic:
+    from .depletion.stages import make_s_stage_all_odors_rewarded
+
+    return make_s_stage_all_odors_rewarded().task
+
+
+def _write_events(root: Path, folder: str, name: str, timestamps: np.ndarray, data: t.Sequence[t.Any]) -> None:
+    path = root / "behavior" / folder / f"{name}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(
+            json.dumps({"name": name, "timestamp": timestamp, "data": value}) + "\n"
+            for timestamp, value in zip(timestamps.tolist(), data)
+        )
+
+
+def _updater_values(rng: np.random.Generator, updater: UpdaterRange, progress: np.ndarray) -> list[float]:
+    values = updater.start + (updater.stop - updater.start) * progress + rng.normal(0, updater.noise, len(progress))
+    return np.clip(values, min(updater.start, updater.stop), max(updater.start, updater.stop)).tolist()
+
+
+def generate_session(
+    root: os.PathLike,
+    settings: SyntheticSessionSettings = SyntheticSessionSettings(),
+    task_logic: t.Optional[AindVrForagingTaskLogic] = None,
+) -> Path:
+    """Writes a synthetic session in the layout expected by `aind_behavior_vr_foraging.data_contract.dataset`.
+
+    Patches are spread over the session and split into an inter-patch interval followed by
+    alternating inter-site intervals and reward sites. A choice may be made at each reward site,
+    and may be rewarded. Every choice triggers an update of each updater. The output is
+    reproducible for a given `settings`.
+
+    Args:
+        root: The session directory. It is created if it does not exist.
+        settings: The session settings.
+        task_logic: The task logic to save. Patches are drawn from its first block.
+            Defaults to the task of the depletion "all odors rewarded" stage.
+
+    Returns:
+        The session directory.
+    """
+    root = Path(root)
+    task_logic = task_logic if task_logic is not None else _default_task_logic()
+    rng = np.random.default_rng(settings.seed)
+
+    # Patches
+    n_patches = settings.n_patches or max(1, round(settings.duration * settings.patch_rate))
+    patch_starts = np.sort(rng.uniform(0, settings.duration, n_patches))
+    patch_starts[0] = 0.0
+    patch_ends = np.append(patch_starts[1:], settings.duration)
+    state_indices = [
+        p.state_index for p in task_logic.task_parameters.environment.blocks[0].environment_statistics.patches
+    ]
+    patch_states = rng.choice(state_indices, n_patches)
+
+    # Sites: an inter-patch interval, then (inter-site, reward site) pairs
+    n_reward_sites = 1 + rng.poisson(settings.reward_sites_per_patch - 1, n_patches)
+    n_sites = 1 + 2 * n_reward_sites
+    site_patch = np.repeat(np.arange(n_patches), n_sites)
+    site_order = np.arange(len(site_patch)) - np.repeat(np.cumsum(n_sites) - n_sites, n_sites)
+    site_durations = ((patch_ends - patch_starts) / n_sites)[site_patch]
+    site_times = patch_starts[site_patch] + site_durations * site_order
+    is_reward_site = (site_order > 0) & (site_order % 2 == 0)
+    labels = np.where(site_order == 0, "InterPatch", np.where(is_reward_site, "RewardSite", "InterSite"))
+    lengths = np.select(
+        [site_order == 0, is_reward_site],
+        [settings.inter_patch_length, settings.reward_site_length],
+        settings.inter_site_length,
+    )
+
+    # Choices happen shortly after entering a reward site
+    reward_site_times = site_times[is_reward_site]
+    reward_site_durations = site_durations[is_reward_site]
+    chosen = rng.random(len(reward_site_times)) < settings.choice_probability
+    choice_times = reward_site_times[chosen] + 0.5 * reward_site_durations[chosen]
+    rewarded = rng.random(len(choice_times)) < settings.reward_probability
+    reward_times = choice_times[rewarded] + 0.1 * reward_site_durations[chosen][rewarded]
+
+    _write_events(root, _SOFTWARE_EVENTS, "ActivePatch", patch_starts, [{"state_index": int(i)} for i in patch_states])
+    _write_events(
+        root,
+        _SOFTWARE_EVENTS,
+        "ActiveSite",
+        site_times,
+        [{"label": str(label), "length": float(length)} for label, length in zip(labels, lengths)],
+    )
+    _write_events(root, _SOFTWARE_EVENTS, "ChoiceFeedback", choice_times, [None] * len(choice_times))
+    _write_events(root, _SOFTWARE_EVENTS, "GiveReward", reward_times, [settings.reward_amount] * len(reward_times))
+
+    progress = choice_times / settings.duration
+    for name, updater in (
+        ("UpdaterRewardDelayOffset", settings.reward_delay_offset),
+        ("UpdaterStopDurationOffset", settings.stop_duration_offset),
+        ("UpdaterStopVelocityThreshold", settings.stop_velocity_threshold),
+    ):
+        _write_events(root, _UPDATER_EVENTS, name, choice_times, _updater_values(rng, updater, progress))
+
+    task_logic_path = root / "behavior" / "Logs" / "tasklogic_output.json"
+    task_logic_path.parent.mkdir(parents=True, exist_ok=True)
+    task_logic_path.write_text(task_logic.model_dump_json(), encoding="utf-8")
+    return root
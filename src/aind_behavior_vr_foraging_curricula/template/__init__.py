@@ -1,4 +1,8 @@
-from .curriculum import CURRICULUM, CURRICULUM_NAME, PKG_LOCATION, TRAINER, run_curriculum
+import importlib
+import typing as t
+
+if t.TYPE_CHECKING:
+    from .curriculum import CURRICULUM, CURRICULUM_NAME, PKG_LOCATION, TRAINER, run_curriculum
 
 __all__ = [
     "CURRICULUM_NAME",
@@ -7,3 +11,10 @@ __all__ = [
     "run_curriculum",
     "PKG_LOCATION",
 ]
+
+
+def __getattr__(name: str) -> t.Any:
+    # Defer importing the curriculum (and building it) until one of its attributes is used
+    if name in __all__:
+        return getattr(importlib.import_module(".curriculum", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,7 @@
+import functools
 import os
 from pathlib import Path
-from typing import Any, TypeVar, Union
+from typing import Any, Optional, TypeVar, Union
 
 import aind_behavior_curriculum
 import pydantic
@@ -17,7 +18,10 @@ from aind_behavior_curriculum import (
 from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic
 
 from .. import __semver__
-from ..cli import CurriculumCliArgs, CurriculumSuggestion, model_from_json_file
+from ..cli import CurriculumCliArgs, CurriculumSuggestion
+from ..phases import phase
+from ..stage_cache import stage_cache
+from ..utils import model_from_json_file, trainer_state_from_json
 from .metrics import VrForagingTemplateMetrics
 from .stages import s_stage_a, s_stage_b
 
@@ -43,19 +47,37 @@ def st_s_stage_a_s_stage_b(metrics: VrForagingTemplateMetrics) -> bool:
 curriculum_class: type = create_curriculum(
     CURRICULUM_NAME, __semver__, (AindVrForagingTaskLogic,), pkg_location=PKG_LOCATION
 )
-CURRICULUM = curriculum_class()
 
 
-CURRICULUM.add_stage_transition(s_stage_a, s_stage_b, StageTransition(st_s_stage_a_s_stage_b))
+def make_curriculum() -> aind_behavior_curriculum.Curriculum[AindVrForagingTaskLogic]:
+    curriculum = curriculum_class()
+    with stage_cache():
+        curriculum.add_stage_transition(s_stage_a, s_stage_b, StageTransition(st_s_stage_a_s_stage_b))
+    return curriculum
+
 
 # ==============================================================================
 # Create a Trainer that uses the curriculum to bootstrap suggestions
 # ==============================================================================
 
-TRAINER = Trainer(CURRICULUM)
+
+@functools.cache
+def get_trainer() -> Trainer:
+    """Builds the curriculum and its trainer on first use."""
+    return Trainer(make_curriculum())
+
+
+def __getattr__(name: str) -> Any:
+    # CURRICULUM and TRAINER are only built when first accessed (PEP 562)
+    if name == "TRAINER":
+        return get_trainer()
+    if name == "CURRICULUM":
+        return get_trainer().curriculum
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-def trainer_state_from_file(path: Union[str, os.PathLike], trainer: Trainer = TRAINER) -> TrainerState:
+def trainer_state_from_file(path: Union[str, os.PathLike], trainer: Optional[Trainer] = None) -> TrainerState:
+    trainer = trainer or get_trainer()
     return model_from_json_file(path, trainer.trainer_state_model)
 
 
@@ -77,10 +99,11 @@ def run_curriculum(args: CurriculumCliArgs) -> CurriculumSuggestion[TrainerState
         trainer_state, metrics = __test_placeholder.make()
 
     else:
-        trainer_state = trainer_state_from_file(args.input_trainer_state)
+        trainer_state = trainer_state_from_json(args.read_input_trainer_state(), get_trainer())
         metrics = metrics_from_dataset_path(args.data_directory, trainer_state)
         return CurriculumSuggestion(
             trainer_state=trainer_state, metrics=metrics, dsl_version=aind_behavior_curriculum.__version__
         )
-    trainer_state = TRAINER.evaluate(trainer_state, metrics)
+    with phase("evaluate"):
+        trainer_state = get_trainer().evaluate(trainer_state, metrics)
     return CurriculumSuggestion(trainer_state=trainer_state, metrics=metrics, version=__semver__)
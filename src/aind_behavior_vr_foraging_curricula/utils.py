@@ -1,10 +1,14 @@
+import json
 import os
 from pathlib import Path
-from typing import Any, TypeVar
+from typing import Any, Optional, TypeVar
 
 import pydantic
 from aind_behavior_curriculum import Curriculum, Metrics, Trainer, TrainerState
 
+from .metrics_cache import get_metrics_cache
+from .phases import phase
+
 TModel = TypeVar("TModel", bound=pydantic.BaseModel)
 TCurriculum = TypeVar("TCurriculum", bound=Curriculum)
 
@@ -14,6 +18,26 @@ def model_from_json_file(json_path: os.PathLike | str, model: type[TModel]) -> T
         return model.model_validate_json(file.read())
 
 
+def trainer_state_from_json(document: str | bytes, trainer: Trainer[TCurriculum]) -> TrainerState[TCurriculum]:
+    with phase("parse_trainer_state"):
+        return trainer.trainer_state_model.model_validate_json(document)
+
+
+def pkg_location_from_json(document: str | bytes) -> Optional[str]:
+    """Returns the `pkg_location` of the curriculum of a serialized trainer state, without validating it.
+
+    Returns None if the trainer state does not have a curriculum.
+    """
+    trainer_state = json.loads(document)
+    if not isinstance(trainer_state, dict):
+        raise ValueError("Trainer state must be a JSON object.")
+    if (curriculum := trainer_state.get("curriculum")) is None:
+        return None
+    if not isinstance(curriculum, dict) or not isinstance(pkg_location := curriculum.get("pkg_location"), str):
+        raise ValueError("Trainer state curriculum does not have a valid pkg_location.")
+    return pkg_location
+
+
 def trainer_state_from_file(path: str | os.PathLike, trainer: Trainer[TCurriculum]) -> TrainerState[TCurriculum]:
     return model_from_json_file(path, trainer.trainer_state_model)
 
@@ -25,4 +49,7 @@ def metrics_from_dataset_path(dataset_path: str | os.PathLike, trainer_state: Tr
     if stage.metrics_provider is None:
         raise ValueError("Stage does not have a metrics provider")
     metrics_provider = stage.metrics_provider
-    return metrics_provider.callable(dataset_path)
+    with phase("metrics"):
+        if (cache := get_metrics_cache()) is not None:
+            return cache.get_or_compute(dataset_path, metrics_provider.callable)
+        return metrics_provider.callable(dataset_path)
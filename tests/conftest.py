@@ -0,0 +1,45 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+
+def write_software_events(
+    root: Path, name: str, events: list[tuple[float, Any]], folder: str = "SoftwareEvents"
+) -> None:
+    path = root / "behavior" / folder / f"{name}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for timestamp, data in events:
+            f.write(json.dumps({"name": name, "timestamp": timestamp, "data": data}) + "\n")
+
+
+@pytest.fixture
+def session_directory(tmp_path: Path) -> Path:
+    """A minimal session with three patches, where choices are made in the first two."""
+    write_software_events(
+        tmp_path,
+        "ActivePatch",
+        [(0.0, {"state_index": 0}), (10.0, {"state_index": 1}), (20.0, {"state_index": 0})],
+    )
+    write_software_events(tmp_path, "ChoiceFeedback", [(2.0, None), (3.0, None), (12.0, None)])
+    write_software_events(tmp_path, "GiveReward", [(2.5, 5.0), (3.5, 5.0), (12.5, 5.0)])
+    write_software_events(
+        tmp_path,
+        "ActiveSite",
+        [
+            (1.0, {"label": "InterSite", "length": 20.0}),
+            (2.0, {"label": "RewardSite", "length": 50.0}),
+            (11.0, {"label": "RewardSite", "length": 40.0}),
+        ],
+    )
+    write_software_events(tmp_path, "UpdaterRewardDelayOffset", [(2.0, 0.1), (12.0, 0.2)], folder="UpdaterEvents")
+    write_software_events(tmp_path, "UpdaterStopDurationOffset", [(2.0, 0.3), (12.0, 0.4)], folder="UpdaterEvents")
+    write_software_events(tmp_path, "UpdaterStopVelocityThreshold", [(2.0, 30.0), (12.0, 20.0)], folder="UpdaterEvents")
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def _isolated_metrics_cache(tmp_path_factory: pytest.TempPathFactory, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("AIND_VR_FORAGING_CURRICULA_CACHE_DIR", str(tmp_path_factory.mktemp("cache")))
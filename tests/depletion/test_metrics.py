@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from aind_behavior_vr_foraging_curricula.depletion.metrics import count_patches_visited, metrics_from_dataset
+
+
+def _count_patches_visited_reference(
+    patch_timestamps: np.ndarray, patch_state_indices: np.ndarray, choice_timestamps: np.ndarray
+) -> dict[int, int]:
+    counts = {int(patch): 0 for patch in dict.fromkeys(patch_state_indices.tolist())}
+    for i in range(len(patch_timestamps) - 1):
+        in_patch = (choice_timestamps > patch_timestamps[i]) & (choice_timestamps < patch_timestamps[i + 1])
+        if in_patch.any():
+            counts[int(patch_state_indices[i])] += 1
+    return counts
+
+
+class TestCountPatchesVisited:
+    @pytest.mark.parametrize("seed", [0, 1, 2])
+    def test_matches_reference(self, seed: int):
+        rng = np.random.default_rng(seed)
+        patch_timestamps = np.sort(rng.uniform(0, 1000, size=200))
+        patch_state_indices = rng.integers(0, 3, size=200)
+        choice_timestamps = np.sort(rng.uniform(0, 1000, size=500))
+        # Choices that coincide with a patch onset belong to neither interval
+        choice_timestamps[:10] = patch_timestamps[:10]
+
+        assert count_patches_visited(
+            patch_timestamps, patch_state_indices, choice_timestamps
+        ) == _count_patches_visited_reference(patch_timestamps, patch_state_indices, choice_timestamps)
+
+    def test_unsorted_inputs(self):
+        counts = count_patches_visited(
+            patch_timestamps=[3.0, 1.0, 2.0],
+            patch_state_indices=[2, 0, 1],
+            choice_timestamps=[2.5, 1.5, 1.6],
+        )
+        assert counts == {2: 0, 0: 1, 1: 1}
+
+    def test_last_patch(self):
+        kwargs = dict(patch_timestamps=[0.0, 1.0], patch_state_indices=[0, 1], choice_timestamps=[0.5, 1.5])
+        assert count_patches_visited(**kwargs) == {0: 1, 1: 0}
+        assert count_patches_visited(**kwargs, include_last_patch=True) == {0: 1, 1: 1}
+
+    def test_empty(self):
+        assert count_patches_visited([], [], [1.0, 2.0]) == {}
+        assert count_patches_visited([0.0, 1.0], [0, 0], []) == {0: 0}
+
+    def test_shape_mismatch(self):
+        with pytest.raises(ValueError):
+            count_patches_visited([0.0, 1.0], [0], [])
+
+
+def test_metrics_from_dataset(session_directory):
+    metrics = metrics_from_dataset(session_directory)
+    assert metrics.n_choices == 3
+    assert metrics.n_patches_visited_per_patch == {0: 1, 1: 1}
+    assert metrics.n_patches_visited == 2
+    assert metrics.total_water_consumed == pytest.approx(0.015)
+    assert metrics.n_reward_sites_traveled == 2
+    assert metrics.last_reward_site_length == 40.0
+    assert metrics.last_delay_duration == 0.2
+    assert metrics.last_stop_duration_offset_updater == 0.4
@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+import pytest
+from scipy.linalg import expm
+
+from aind_behavior_vr_foraging_curricula.replenishment_depletion_offset.utils import (
+    compute_cmc_transition_probabilities,
+    compute_cmc_transition_probability,
+)
+
+
+def _expm_transition_probability(n_states: int, rep_rate: float, dt: float) -> np.ndarray:
+    q = np.zeros((n_states, n_states))
+    np.fill_diagonal(q, -rep_rate)
+    np.fill_diagonal(q[:, 1:], rep_rate)
+    q[-1, -1] = 0
+    return expm(q * dt)
+
+
+@pytest.mark.parametrize("n_states", [1, 2, 7, 16, 128])
+@pytest.mark.parametrize("rep_rate", [0.0, 0.05, 0.1, 1.0, 50.0])
+@pytest.mark.parametrize("dt", [0.1, 1.0])
+def test_matches_expm(n_states: int, rep_rate: float, dt: float):
+    p_t = compute_cmc_transition_probability(n_states, rep_rate, dt)
+    np.testing.assert_allclose(p_t, _expm_transition_probability(n_states, rep_rate, dt), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(p_t.sum(axis=1), 1.0, atol=1e-14)
+
+
+def _poisson_upper_tail(m: int, mean: float) -> float:
+    return math.fsum(math.exp(k * math.log(mean) - mean - math.lgamma(k + 1)) for k in range(m, m + 200))
+
+
+@pytest.mark.parametrize("n_states, rep_rate", [(16, 0.1), (50, 5.0), (7, 50.0)])
+def test_absorbing_tail_is_relatively_exact(n_states: int, rep_rate: float):
+    p_t = compute_cmc_transition_probability(n_states, rep_rate, 0.1)
+    expected = [_poisson_upper_tail(n_states - 1 - i, rep_rate * 0.1) for i in range(n_states - 1)]
+    assert min(expected) > 0
+    np.testing.assert_allclose(p_t[:-1, -1], expected, rtol=1e-12, atol=0)
+
+
+def test_matches_expm_large():
+    n_states = 2048
+    np.testing.assert_allclose(
+        compute_cmc_transition_probability(n_states, 0.1),
+        _expm_transition_probability(n_states, 0.1, 0.1),
+        rtol=0,
+        atol=1e-12,
+    )
+
+
+def test_batched():
+    n_states = [16, 12, 7, 3000]
+    rates = [0.1, 0.05, 2.0, 0.1]
+    batched = compute_cmc_transition_probabilities(n_states, rates, dt=0.1)
+    for n, rate, p_t in zip(n_states, rates, batched):
+        assert p_t.shape == (n, n)
+        np.testing.assert_array_equal(p_t, compute_cmc_transition_probability(n, rate, 0.1))
+    assert compute_cmc_transition_probabilities([], []) == []
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        compute_cmc_transition_probabilities([2, 3], [0.1])
+    with pytest.raises(ValueError):
+        compute_cmc_transition_probability(0, 0.1)
+    with pytest.raises(ValueError):
+        compute_cmc_transition_probability(3, -0.1)
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import pytest
+
+from aind_behavior_vr_foraging_curricula.single_site_matching.metrics import metrics_from_dataset
+from aind_behavior_vr_foraging_curricula.single_site_matching.stages import make_s_learn_to_stop
+
+
+@pytest.fixture
+def single_site_session_directory(session_directory: Path) -> Path:
+    path = session_directory / "behavior" / "Logs" / "tasklogic_output.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(make_s_learn_to_stop().task.model_dump_json(), encoding="utf-8")
+    return session_directory
+
+
+def test_metrics_from_dataset(single_site_session_directory: Path):
+    metrics = metrics_from_dataset(single_site_session_directory)
+    assert metrics.total_water_consumed == pytest.approx(0.015)
+    assert metrics.n_patches_visited == 3
+    assert metrics.n_patches_seen == 3
+    assert metrics.last_stop_threshold_updater == 20.0
+    assert metrics.last_stop_duration_offset_updater == 0.4
+
+
+def test_metrics_from_dataset_missing_streams(single_site_session_directory: Path):
+    (single_site_session_directory / "behavior" / "UpdaterEvents" / "UpdaterStopVelocityThreshold.json").unlink()
+    metrics = metrics_from_dataset(single_site_session_directory)
+    assert metrics.last_stop_threshold_updater is None
@@ -0,0 +1,65 @@
+import json
+import os
+from pathlib import Path
+
+import pytest
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.archive import ArchiveIndex, scan_trainer_state
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+
+
+@pytest.fixture
+def archive(tmp_path: Path) -> Path:
+    root = tmp_path / "archive"
+    stages = TRAINER.curriculum.see_stages()
+    for i, stage in enumerate(stages[:3]):
+        trainer_state = TRAINER.create_trainer_state(
+            stage=stage, is_on_curriculum=True, active_policies=stage.start_policies
+        )
+        (root / f"mouse{i}").mkdir(parents=True)
+        (root / f"mouse{i}" / "trainer_state.json").write_text(trainer_state.model_dump_json(), encoding="utf-8")
+    return root
+
+
+def test_scan_trainer_state():
+    trainer_state = TRAINER.create_enrollment()
+    fields = scan_trainer_state(trainer_state.model_dump_json())
+    assert fields["curriculum"] == TRAINER.curriculum.name
+    assert fields["curriculum_version"] == TRAINER.curriculum.version
+    assert fields["stage"] == trainer_state.stage.name
+    assert fields["is_on_curriculum"] is True
+    assert len(fields["active_policies"]) == len(trainer_state.active_policies)
+    with pytest.raises(ValueError):
+        scan_trainer_state("[]")
+
+
+def test_index_is_incremental(archive: Path, tmp_path: Path):
+    stage = TRAINER.curriculum.see_stages()[1].name
+    with ArchiveIndex(tmp_path / "index.sqlite") as index:
+        update = index.update(archive, max_workers=2)
+        assert (update.n_files, update.n_indexed, update.n_errors) == (3, 3, 0)
+        assert index.subjects(TRAINER.curriculum.name, stage) == ["mouse1"]
+        assert [s.path for s in index.query(subject="mouse0")] == ["mouse0/trainer_state.json"]
+        assert index.update(archive, max_workers=1).n_indexed == 0
+
+        # Modified, broken, and removed files
+        moved = archive / "mouse1" / "trainer_state.json"
+        (archive / "mouse0" / "trainer_state.json").write_bytes(moved.read_bytes())
+        os.utime(archive / "mouse0" / "trainer_state.json", ns=(0, 0))
+        (archive / "mouse2" / "trainer_state.json").write_text("{", encoding="utf-8")
+        moved.unlink()
+        update = index.update(archive, max_workers=1)
+        assert (update.n_files, update.n_indexed, update.n_removed, update.n_errors) == (2, 2, 1, 1)
+        assert index.subjects(TRAINER.curriculum.name, stage) == ["mouse0"]
+        assert index.query(subject="mouse2")[0].error is not None
+
+
+def test_cli_index(archive: Path, tmp_path: Path, capsys):
+    stage = TRAINER.curriculum.see_stages()[0].name
+    database = tmp_path / "index.sqlite"
+    args = ["index", "--archive", str(archive), "--database", str(database), "--max-workers", "1"]
+    CliApp.run(CurriculumAppCliArgs, cli_args=[*args, "--curriculum", TRAINER.curriculum.name, "--stage", stage])
+    rows = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [row["subject"] for row in rows] == ["mouse0"]
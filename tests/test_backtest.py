@@ -0,0 +1,121 @@
+import json
+from pathlib import Path
+
+import pytest
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.backtest import BacktestSession, backtest_subject, read_backtest_manifest
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+from aind_behavior_vr_foraging_curricula.history import HistoryRecord, HistoryStore
+from aind_behavior_vr_foraging_curricula.settings import CurriculumRunArguments
+from aind_behavior_vr_foraging_curricula.synthetic import SyntheticSessionSettings, generate_session
+
+
+@pytest.fixture(scope="module")
+def sessions(tmp_path_factory: pytest.TempPathFactory) -> list[Path]:
+    root = tmp_path_factory.mktemp("sessions")
+    return [
+        generate_session(root / f"session_{i}", SyntheticSessionSettings(duration=600, n_patches=n, seed=i))
+        for i, n in enumerate((80, 80, 5))
+    ]
+
+
+def _expected_stages(sessions: list[Path]) -> list[str]:
+    trainer_state = TRAINER.create_enrollment()
+    stages = []
+    for session in sessions:
+        stages.append(trainer_state.stage.name)
+        trainer_state = TRAINER.evaluate(trainer_state, trainer_state.stage.metrics_provider.callable(session))
+    return stages + [trainer_state.stage.name]
+
+
+def test_replay_matches_trainer(sessions: list[Path]):
+    expected = _expected_stages(sessions)
+    actual = [expected[0], "graduation", None]
+    result = backtest_subject(
+        "mouse",
+        [
+            BacktestSession(subject="mouse", data_directory=s, stage=stage, curriculum="depletion")
+            for s, stage in zip(sessions, actual)
+        ],
+    )
+    assert result.success
+    assert [s.replayed_stage for s in result.sessions] == expected[:-1]
+    assert [s.suggested_stage for s in result.sessions] == expected[1:]
+    assert len(set(expected)) == 3
+    assert (result.divergences, result.first_divergence) == ([1], 1)
+
+
+def test_failed_session_keeps_replayed_sessions(tmp_path: Path, sessions: list[Path]):
+    trainer_state = tmp_path / "trainer_state.json"
+    trainer_state.write_text(TRAINER.create_enrollment().model_dump_json(), encoding="utf-8")
+    result = backtest_subject(
+        "mouse",
+        [
+            BacktestSession(subject="mouse", data_directory=sessions[0], input_trainer_state=trainer_state),
+            BacktestSession(subject="mouse", data_directory=tmp_path / "missing"),
+        ],
+    )
+    assert not result.success
+    assert result.error_type is not None
+    assert len(result.sessions) == 1
+
+    result = backtest_subject("mouse", [BacktestSession(subject="mouse", data_directory=sessions[0])])
+    assert (result.success, result.error_type) == (False, "ValueError")
+
+
+def test_actual_stages_from_history(tmp_path: Path, sessions: list[Path]):
+    for i, session in enumerate(sessions):
+        (session / "behavior" / "Logs" / "session_output.json").write_text(
+            json.dumps({"subject": "mouse", "session_name": f"session_{i}"}), encoding="utf-8"
+        )
+    with HistoryStore(tmp_path / "history.sqlite") as store:
+        store.append(HistoryRecord(subject="mouse", session="session_0", date="2024-01-01", stage="a", metrics={}))
+    result = backtest_subject(
+        "mouse",
+        [BacktestSession(subject="mouse", data_directory=s, curriculum="depletion") for s in sessions[:2]],
+        history=tmp_path / "history.sqlite",
+    )
+    assert [s.actual_stage for s in result.sessions] == ["a", None]
+    assert result.divergences == [0]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_cli_backtest(tmp_path: Path, sessions: list[Path], max_workers: int):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(
+        "subject,data_directory,curriculum\n"
+        + "".join(f"{subject},{session},depletion\n" for subject in ("a", "b") for session in sessions),
+        encoding="utf-8",
+    )
+    assert [len(v) for v in read_backtest_manifest(manifest).values()] == [3, 3]
+    relative = tmp_path / "relative.jsonl"
+    relative.write_text('{"subject": "a", "data_directory": "session"}\n', encoding="utf-8")
+    assert read_backtest_manifest(relative)["a"][0].data_directory == tmp_path / "session"
+    output = tmp_path / "results.jsonl"
+    CliApp.run(
+        CurriculumAppCliArgs,
+        cli_args=["backtest", "--manifest", str(manifest), "--output", str(output), "--max-workers", str(max_workers)],
+    )
+    results = {r["subject"]: r for r in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert set(results) == {"a", "b"}
+    assert [s["replayed_stage"] for s in results["a"]["sessions"]] == _expected_stages(sessions)[:-1]
+
+
+def test_cli_backtest_exits_with_failures(tmp_path: Path, sessions: list[Path], monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("STAGE_STORE", str(tmp_path / "stages"))
+    compute_suggestion = CurriculumRunArguments.compute_suggestion
+    stage_stores = []
+
+    def spy(self):
+        stage_stores.append(self.stage_store)
+        return compute_suggestion(self)
+
+    monkeypatch.setattr(CurriculumRunArguments, "compute_suggestion", spy)
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text(f"subject,data_directory,curriculum\na,{sessions[0]},depletion\nb,missing,depletion\n")
+    with pytest.raises(SystemExit) as exit_info:
+        CliApp.run(CurriculumAppCliArgs, cli_args=["backtest", "--manifest", str(manifest), "--max-workers", "1"])
+    assert exit_info.value.code == 1
+    assert stage_stores and all(stage_store is None for stage_store in stage_stores)
@@ -0,0 +1,104 @@
+import json
+from pathlib import Path
+
+import pytest
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.batch import BatchEntry, evaluate_entry, read_manifest, run_batch
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+from aind_behavior_vr_foraging_curricula.settings import CurriculumRunArguments
+
+
+@pytest.fixture
+def entries(tmp_path: Path, session_directory: Path) -> list[BatchEntry]:
+    trainer_state_path = tmp_path / "trainer_state.json"
+    trainer_state_path.write_text(TRAINER.create_enrollment().model_dump_json(), encoding="utf-8")
+    return [
+        BatchEntry(data_directory=session_directory, input_trainer_state=trainer_state_path),
+        BatchEntry(data_directory=session_directory, input_trainer_state=tmp_path / "missing.json"),
+    ]
+
+
+def test_read_manifest(tmp_path: Path):
+    csv_manifest = tmp_path / "manifest.csv"
+    csv_manifest.write_text(
+        "data_directory,input_trainer_state,output_suggestion,curriculum\n"
+        "session_a,state_a.json,,\n"
+        "session_b,state_b.json,out_b,depletion\n",
+        encoding="utf-8",
+    )
+    jsonl_manifest = tmp_path / "manifest.jsonl"
+    jsonl_manifest.write_text(
+        '{"data_directory": "session_a", "input_trainer_state": "state_a.json"}\n\n'
+        '{"data_directory": "session_b", "input_trainer_state": "state_b.json", '
+        '"output_suggestion": "out_b", "curriculum": "depletion"}\n',
+        encoding="utf-8",
+    )
+    expected = [
+        BatchEntry(data_directory=tmp_path / "session_a", input_trainer_state=tmp_path / "state_a.json"),
+        BatchEntry(
+            data_directory=tmp_path / "session_b",
+            input_trainer_state=tmp_path / "state_b.json",
+            output_suggestion=tmp_path / "out_b",
+            curriculum="depletion",
+        ),
+    ]
+    assert read_manifest(csv_manifest) == expected
+    assert read_manifest(jsonl_manifest) == expected
+
+    absolute = tmp_path / "nested" / "manifest.csv"
+    absolute.parent.mkdir()
+    absolute.write_text(f"data_directory,input_trainer_state\n{tmp_path / 'session_a'},../state_a.json\n")
+    assert read_manifest(absolute) == [
+        BatchEntry(
+            data_directory=tmp_path / "session_a", input_trainer_state=tmp_path / "nested" / ".." / "state_a.json"
+        )
+    ]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_run_batch_reports_failures(entries: list[BatchEntry], max_workers: int):
+    results = list(run_batch(entries, max_workers=max_workers))
+    assert len(results) == 2
+
+    records = {record["entry"]["input_trainer_state"]: record for record in (json.loads(r.json) for r in results)}
+    succeeded = records[str(entries[0].input_trainer_state)]
+    assert succeeded["success"] is True
+    assert succeeded["suggestion"]["metrics"]["n_choices"] == 3
+    assert succeeded["suggestion"]["trainer_state"]["stage"]["name"] == TRAINER.create_enrollment().stage.name
+
+    failed = records[str(entries[1].input_trainer_state)]
+    assert failed["success"] is False
+    assert failed["error_type"] == "FileNotFoundError"
+    assert failed["suggestion"] is None
+
+
+def test_cli_run_batch(tmp_path: Path, entries: list[BatchEntry]):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text("\n".join(entry.model_dump_json() for entry in entries), encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+    cli_args = ["run-batch", "--manifest", str(manifest), "--output", str(output), "--max-workers", "1"]
+    with pytest.raises(SystemExit) as exit_info:
+        CliApp.run(CurriculumAppCliArgs, cli_args=cli_args)
+    assert exit_info.value.code == 1
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["success"] for line in lines] == [True, False]
+
+    manifest.write_text(entries[0].model_dump_json(), encoding="utf-8")
+    CliApp.run(CurriculumAppCliArgs, cli_args=cli_args)
+
+
+def test_entries_ignore_the_environment(tmp_path: Path, entries: list[BatchEntry], monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("STAGE_STORE", str(tmp_path / "stages"))
+    monkeypatch.setenv("SERVER", "http://127.0.0.1:1")
+    compute_suggestion = CurriculumRunArguments.compute_suggestion
+    arguments = []
+
+    def spy(self):
+        arguments.append(self)
+        return compute_suggestion(self)
+
+    monkeypatch.setattr(CurriculumRunArguments, "compute_suggestion", spy)
+    assert evaluate_entry(entries[0]).success
+    assert (arguments[0].stage_store, arguments[0].server) == (None, None)
@@ -1,7 +1,10 @@
 import importlib
 import logging
 import os
+import subprocess
+import sys
 import tempfile
+from pathlib import Path
 
 from aind_behavior_curriculum import __version__ as dsl_version
 from pydantic_settings import CliApp
@@ -20,6 +23,33 @@ def test_known_curricula(capsys):
     assert set(recovered) == set(_KNOWN_CURRICULA)
 
 
+def test_known_curricula_match_subpackages():
+    import aind_behavior_vr_foraging_curricula
+
+    package_root = Path(aind_behavior_vr_foraging_curricula.__file__).parent
+    subpackages = {
+        p.name for p in package_root.iterdir() if (p / "__init__.py").exists() and not p.name.startswith("_")
+    }
+    assert subpackages == set(_KNOWN_CURRICULA)
+
+
+def test_curricula_are_built_lazily():
+    code = """
+import sys
+import aind_behavior_vr_foraging_curricula.cli
+assert "contraqctor" not in sys.modules
+assert "numpy" not in sys.modules
+from aind_behavior_vr_foraging_curricula import depletion, depletion_stops_offset
+assert "aind_behavior_vr_foraging_curricula.depletion.curriculum" not in sys.modules
+depletion_stops_offset.run_curriculum
+from aind_behavior_vr_foraging_curricula.depletion import curriculum
+assert curriculum.get_trainer.cache_info().currsize == 0
+assert depletion.TRAINER is curriculum.get_trainer()
+assert depletion.CURRICULUM is depletion.TRAINER.curriculum
+"""
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
 def test_version(capsys):
     CliApp.run(CurriculumAppCliArgs, cli_args=["version"])
     captured = capsys.readouterr()
@@ -0,0 +1,130 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from aind_behavior_vr_foraging.data_contract import dataset as vr_foraging_dataset
+from pydantic import ValidationError
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula import columnar
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.columnar import (
+    ColumnarCache,
+    EventColumns,
+    load_event_columns,
+    use_columnar_cache,
+)
+from aind_behavior_vr_foraging_curricula.depletion.metrics import metrics_from_dataset as depletion_metrics
+from aind_behavior_vr_foraging_curricula.single_site_matching.metrics import metrics_from_dataset as single_site_metrics
+from aind_behavior_vr_foraging_curricula.synthetic import SyntheticSessionSettings, generate_session
+
+
+def test_events_are_flattened_to_typed_columns():
+    columns = EventColumns.from_records(
+        [0.0, 1.0],
+        [
+            {"state_index": 0, "label": "A", "length": 1, "extra": {"a": 1}},
+            {"state_index": 1, "label": "B", "length": 2.5},
+        ],
+    )
+    assert len(columns) == 2
+    assert columns.column_names == ["state_index", "label", "length", "extra"]
+    assert columns["state_index"].dtype == np.int64
+    assert columns["label"].tolist() == ["A", "B"]
+    assert columns["length"].dtype == float
+    assert columns["extra"].tolist() == [{"a": 1}, None]
+
+    assert EventColumns.from_records([0.0], [None]).column_names == []
+    assert EventColumns.from_records([0.0], [5])["data"].tolist() == [5]
+    mixed = EventColumns.from_records([0.0, 1.0], [5, "a"])
+    assert mixed["data"].tolist() == [5, "a"]
+
+
+def test_cache_round_trip_and_invalidation(tmp_path: Path, session_directory: Path):
+    cache = ColumnarCache(tmp_path / "cache")
+    source = session_directory / "behavior" / "SoftwareEvents" / "ActiveSite.json"
+    stream = "Behavior/SoftwareEvents/ActiveSite"
+    assert cache.get(source) is None
+
+    loaded = load_event_columns(vr_foraging_dataset(session_directory), [stream])["ActiveSite"]
+    assert loaded is not None and cache.get(source) is None
+    with use_columnar_cache(cache):
+        converted = load_event_columns(vr_foraging_dataset(session_directory), [stream])["ActiveSite"]
+    cached = cache.get(source)
+    assert converted is not None and cached is not None
+    assert cached.column_names == converted.column_names == loaded.column_names
+    for name in converted.column_names:
+        np.testing.assert_array_equal(cached[name], converted[name])
+    np.testing.assert_array_equal(cached.timestamp, loaded.timestamp)
+
+    with open(source, "a", encoding="utf-8") as f:
+        f.write('{"name": "ActiveSite", "timestamp": 30.0, "data": {"label": "RewardSite", "length": 10.0}}\n')
+    assert cache.get(source) is None
+    with use_columnar_cache(cache):
+        assert len(load_event_columns(vr_foraging_dataset(session_directory), [stream])["ActiveSite"]) == 4
+    assert cache.get(source) is not None
+
+    cache.entry_path(source).write_bytes(b"corrupted")
+    assert cache.get(source) is None
+    assert not cache.entry_path(source).exists()
+
+
+def test_load_errors(tmp_path: Path, session_directory: Path):
+    events = session_directory / "behavior" / "SoftwareEvents"
+    (events / "ActivePatch.json").unlink()
+    (events / "ChoiceFeedback.json").write_bytes(b"")
+    cache = ColumnarCache(tmp_path / "cache")
+    paths = ["Behavior/SoftwareEvents/ActivePatch", "Behavior/SoftwareEvents/ChoiceFeedback"]
+    with use_columnar_cache(cache):
+        columns = load_event_columns(vr_foraging_dataset(session_directory), paths)
+    assert columns["ActivePatch"] is None
+    assert columns["ChoiceFeedback"] is not None and len(columns["ChoiceFeedback"]) == 0
+
+    (events / "GiveReward.json").write_text("{invalid\n", encoding="utf-8")
+    with use_columnar_cache(cache), pytest.raises(ValidationError):
+        load_event_columns(vr_foraging_dataset(session_directory), ["Behavior/SoftwareEvents/GiveReward"])
+    assert not list(cache.root.glob("*.npz"))
+
+
+@pytest.mark.parametrize("provider", [depletion_metrics, single_site_metrics], ids=["depletion", "single_site"])
+def test_corrupt_streams_are_raised(tmp_path: Path, provider):
+    session = generate_session(tmp_path / "session", SyntheticSessionSettings(duration=60))
+    with open(session / "behavior" / "SoftwareEvents" / "ChoiceFeedback.json", "a", encoding="utf-8") as f:
+        f.write("{truncated")
+    with pytest.raises(ValidationError):
+        provider(session)
+
+
+@pytest.mark.parametrize("provider", [depletion_metrics, single_site_metrics], ids=["depletion", "single_site"])
+def test_metrics_from_cache_match_json(tmp_path: Path, provider, monkeypatch: pytest.MonkeyPatch):
+    session = generate_session(tmp_path / "session", SyntheticSessionSettings(duration=600))
+    expected = provider(session)
+    cache = ColumnarCache(tmp_path / "cache")
+    with use_columnar_cache(cache):
+        assert provider(session) == expected
+        assert len(list(cache.root.glob("*.npz"))) > 0
+
+        def fail(stream):
+            raise AssertionError(f"{stream.name} was loaded")
+
+        monkeypatch.setattr(columnar, "columns_from_stream", fail)
+        assert provider(session) == expected
+
+
+def test_cli_convert(tmp_path: Path, session_directory: Path, capsys):
+    CliApp.run(
+        CurriculumAppCliArgs,
+        cli_args=[
+            "convert",
+            "--data-directory",
+            str(session_directory),
+            "--curriculum",
+            "depletion",
+            "--cache-directory",
+            str(tmp_path / "cache"),
+        ],
+    )
+    output = capsys.readouterr().out
+    assert "Behavior/SoftwareEvents/ActivePatch: 3 events" in output
+    cache = ColumnarCache(tmp_path / "cache")
+    assert cache.get(session_directory / "behavior" / "SoftwareEvents" / "ActivePatch.json") is not None
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aind_behavior_vr_foraging_curricula.extraction import extract_field, extract_fields, infer_native_array
+
+RECORDS = [
+    {"state_index": 0, "label": "InterSite", "length": 20, "position": [0.0, 1.0]},
+    {"state_index": 2, "label": "RewardSite", "length": 50.5, "position": [1.0, 2.0]},
+]
+
+
+@pytest.mark.parametrize("records", [RECORDS, pd.Series(RECORDS), iter(RECORDS)], ids=["list", "series", "iterator"])
+def test_extract_field(records):
+    state_index = extract_field(records, "state_index", np.int64)
+    assert state_index.dtype == np.int64
+    assert state_index.tolist() == [0, 2]
+
+
+def test_extract_fields_dtypes():
+    fields = extract_fields(RECORDS, {"state_index": np.int64, "label": str, "length": float, "position": object})
+    assert fields["label"].tolist() == ["InterSite", "RewardSite"]
+    assert fields["label"].dtype.kind == "U"
+    assert fields["length"].dtype == float
+    assert fields["length"].tolist() == [20.0, 50.5]
+    assert fields["position"].shape == (2,)
+    assert fields["position"].tolist() == [[0.0, 1.0], [1.0, 2.0]]
+    assert extract_field([], "length", float).shape == (0,)
+
+
+def test_missing_fields():
+    records = [*RECORDS, {"label": "InterPatch"}, None]
+    with pytest.raises(KeyError):
+        extract_field(records[:3], "length", float)
+    with pytest.raises(KeyError):
+        extract_field(records, "label", str)
+
+    fields = extract_fields(records, {"label": str, "length": float}, defaults={"label": "", "length": np.nan})
+    assert fields["label"].tolist() == ["InterSite", "RewardSite", "InterPatch", ""]
+    np.testing.assert_array_equal(fields["length"], [20.0, 50.5, np.nan, np.nan])
+
+
+def test_infer_native_array():
+    assert infer_native_array([1, 2]).dtype == np.int64
+    np.testing.assert_array_equal(infer_native_array([1, None, 2.5]), [1.0, np.nan, 2.5])
+    assert infer_native_array([True, False]).dtype == bool
+    assert infer_native_array(["a", "b"]).tolist() == ["a", "b"]
+    assert infer_native_array([1, "a"]) is None
+    assert infer_native_array([[1], [2]]) is None
@@ -0,0 +1,83 @@
+import datetime
+import json
+from pathlib import Path
+
+import pytest
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+from aind_behavior_vr_foraging_curricula.history import HistoryRecord, HistoryStore
+from aind_behavior_vr_foraging_curricula.synthetic import SyntheticSessionSettings, generate_session
+
+
+def _record(session: str, day: int, stage: str, hour: int = 10, subject: str = "mouse") -> HistoryRecord:
+    return HistoryRecord(
+        subject=subject,
+        session=session,
+        date=datetime.datetime(2024, 1, day, hour, tzinfo=datetime.timezone.utc),
+        stage=stage,
+        metrics={"n_reward_sites_traveled": day},
+    )
+
+
+def test_stage_streaks(tmp_path: Path):
+    with HistoryStore(tmp_path / "history.sqlite") as store:
+        assert store.latest("mouse") is None
+        assert store.append(_record("s1", 1, "a")).sessions_in_stage == 1
+        store.append(_record("s2", 2, "b"))
+        store.append(_record("s3", 3, "b"))
+        last = store.append(_record("s4", 3, "b", hour=15))
+        assert (last.sessions_in_stage, last.days_in_stage) == (3, 2)
+        assert store.sessions_in_stage("mouse", "b") == 3
+        assert store.days_in_stage("mouse", "b") == 2
+        assert store.sessions_in_stage("mouse", "a") == 0
+        store.append(_record("other", 5, "b", subject="rat"))
+        assert store.subjects() == ["mouse", "rat"]
+
+        assert [r.session for r in store.last_sessions("mouse", 2)] == ["s4", "s3"]
+        assert [r.session for r in store.last_sessions("mouse", 10, stage="a")] == ["s1"]
+        assert store.metric_values("mouse", "n_reward_sites_traveled", 3) == [3, 3, 2]
+
+
+def test_out_of_order_append_recomputes_streaks(tmp_path: Path):
+    with HistoryStore(tmp_path / "history.sqlite") as store:
+        store.append(_record("s1", 1, "a"))
+        store.append(_record("s3", 3, "a"))
+        assert store.append(_record("s2", 2, "b")).sessions_in_stage == 1
+        assert store.get("mouse", "s3").sessions_in_stage == 1
+
+        store.append(_record("s2", 2, "a"))  # Replaces the session
+        assert len(store.last_sessions("mouse", 10)) == 3
+        assert (store.get("mouse", "s3").sessions_in_stage, store.days_in_stage("mouse", "a")) == (3, 3)
+
+    with HistoryStore(tmp_path / "history.sqlite") as store:
+        assert store.sessions_in_stage("mouse", "a") == 3
+
+
+def test_cli_run_appends_to_history(tmp_path: Path, capsys):
+    session = generate_session(tmp_path / "session", SyntheticSessionSettings(duration=600))
+    (session / "behavior" / "Logs" / "session_output.json").write_text(
+        json.dumps({"subject": "mouse", "session_name": "mouse_2024-01-01", "date": "2024-01-01T10:00:00Z"}),
+        encoding="utf-8",
+    )
+    trainer_state = tmp_path / "trainer_state.json"
+    trainer_state.write_text(TRAINER.create_enrollment().model_dump_json(), encoding="utf-8")
+    database = tmp_path / "history.sqlite"
+    run_args = ["run", "--data-directory", str(session), "--input-trainer-state", str(trainer_state)]
+    CliApp.run(CurriculumAppCliArgs, cli_args=[*run_args, "--history", str(database), "--mute-suggestion"])
+
+    with HistoryStore(database) as store:
+        record = store.latest("mouse")
+    assert record is not None
+    assert record.session == "mouse_2024-01-01"
+    assert record.curriculum == "depletion"
+    assert record.stage == TRAINER.create_enrollment().stage.name
+    assert record.metrics["n_reward_sites_traveled"] > 0
+
+    capsys.readouterr()
+    CliApp.run(CurriculumAppCliArgs, cli_args=["history", "--database", str(database), "--subject", "mouse"])
+    assert HistoryRecord.model_validate_json(capsys.readouterr().out) == record
+
+    with pytest.raises(FileNotFoundError):
+        CliApp.run(CurriculumAppCliArgs, cli_args=["history", "--database", str(tmp_path / "x"), "--subject", "a"])
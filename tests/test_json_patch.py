@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+import pytest
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+from aind_behavior_vr_foraging_curricula.json_patch import apply_patch, content_hash, make_patch
+from aind_behavior_vr_foraging_curricula.synthetic import SyntheticSessionSettings, generate_session
+
+CASES = [
+    ({"a": 1, "b": [1, 2, 3]}, {"a": 1, "b": [1, 5]}),
+    ({"a": 1}, {"a": True}),
+    ({"a/b": {"c~d": 1}}, {"a/b": {"c~d": 2, "e": None}}),
+    ([1, {"a": 1}], [1, {"a": 1}, [2]]),
+    ({"a": {"b": 1}}, {"a": [1]}),
+    ({"a": 1}, 5),
+    ({}, {}),
+]
+
+
+@pytest.mark.parametrize("source, target", CASES)
+def test_patch_round_trip(source, target):
+    patch = make_patch(source, target)
+    assert apply_patch(source, patch) == target
+    assert json.loads(json.dumps(patch)) == patch
+    if source == target:
+        assert patch == []
+
+
+def test_patch_is_minimal_and_escaped():
+    assert make_patch({"a/b": [1, 2]}, {"a/b": [1, 3]}) == [{"op": "replace", "path": "/a~1b/1", "value": 3}]
+    assert make_patch({"a": [1, 2, 3]}, {"a": [1]}) == [
+        {"op": "remove", "path": "/a/2"},
+        {"op": "remove", "path": "/a/1"},
+    ]
+
+
+def test_apply_patch_errors():
+    with pytest.raises(ValueError):
+        apply_patch({"a": 1}, [{"op": "move", "from": "/a", "path": "/b"}])
+    with pytest.raises(ValueError):
+        apply_patch({"a": 1}, [{"op": "replace", "path": "/b", "value": 1}])
+    with pytest.raises(ValueError):
+        apply_patch({"a": [1]}, [{"op": "remove", "path": "/a/3"}])
+    assert apply_patch({"a": [1]}, [{"op": "add", "path": "/a/-", "value": 2}]) == {"a": [1, 2]}
+
+
+def test_content_hash_ignores_key_order():
+    assert content_hash({"a": 1, "b": [1, 2]}) == content_hash({"b": [1, 2], "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 1.5})
+
+
+def test_cli_slim_output(tmp_path: Path, capsys):
+    session = generate_session(tmp_path / "session", SyntheticSessionSettings(n_patches=80, duration=600))
+    input_trainer_state = TRAINER.create_enrollment().model_dump(mode="json")
+    trainer_state_path = tmp_path / "trainer_state.json"
+    trainer_state_path.write_text(json.dumps(input_trainer_state), encoding="utf-8")
+    run_args = ["run", "--data-directory", str(session), "--input-trainer-state", str(trainer_state_path)]
+    outputs = {}
+    for output_format in ("full", "slim"):
+        (tmp_path / output_format).mkdir()
+        CliApp.run(
+            CurriculumAppCliArgs,
+            cli_args=[
+                *run_args,
+                "--output-suggestion",
+                str(tmp_path / output_format),
+                "--output-format",
+                output_format,
+            ],
+        )
+        outputs[output_format] = capsys.readouterr().out.strip()
+    assert outputs["slim"] == (tmp_path / "slim" / "suggestion.json").read_text(encoding="utf-8")
+
+    full, slim = json.loads(outputs["full"]), json.loads(outputs["slim"])
+    assert len(outputs["slim"]) < len(outputs["full"]) / 5
+    assert slim["stage"] == full["trainer_state"]["stage"]["name"] != input_trainer_state["stage"]["name"]
+    assert slim["task_logic_hash"] == content_hash(full["trainer_state"]["stage"]["task"])
+    assert slim["input_trainer_state_hash"] == content_hash(input_trainer_state)
+    assert slim["metrics"] == full["metrics"]
+    assert apply_patch(input_trainer_state, slim["trainer_state_patch"]) == full["trainer_state"]
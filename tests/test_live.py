@@ -0,0 +1,112 @@
+import json
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER as DEPLETION_TRAINER
+from aind_behavior_vr_foraging_curricula.depletion.metrics import IncrementalPatchVisitCounter, count_patches_visited
+from aind_behavior_vr_foraging_curricula.live import JsonLinesTail, LiveMetricsEngine
+from aind_behavior_vr_foraging_curricula.single_site_matching import TRAINER as SINGLE_SITE_TRAINER
+from aind_behavior_vr_foraging_curricula.synthetic import SyntheticSessionSettings, generate_session
+
+
+def test_tail_reads_only_complete_new_lines(tmp_path: Path):
+    path = tmp_path / "events.json"
+    tail = JsonLinesTail(path)
+    assert tail.read_new() == ([], False)
+
+    path.write_bytes(b'{"a": 1}\n{"a": 2}\n{"a"')
+    assert tail.read_new() == ([{"a": 1}, {"a": 2}], False)
+    assert tail.read_new() == ([], False)
+    with open(path, "ab") as f:
+        f.write(b": 3}\n")
+    assert tail.read_new() == ([{"a": 3}], False)
+
+    path.write_bytes(b'{"a": 4}\n')
+    assert tail.read_new() == ([{"a": 4}], True)
+
+
+@pytest.mark.parametrize("in_order", [False, True])
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_patch_visits_match_batch(seed: int, in_order: bool):
+    rng = np.random.default_rng(seed)
+    patches = rng.uniform(0, 100, 30).round(1)
+    states = rng.integers(0, 3, 30)
+    choices = np.concatenate([rng.uniform(0, 100, 40).round(1), patches[:3]])  # Some choices on patch onsets
+
+    counter = IncrementalPatchVisitCounter()
+    events = [("patch", t, s) for t, s in zip(patches, states)] + [("choice", t, None) for t in choices]
+    order = sorted(range(len(events)), key=lambda i: events[i][1]) if in_order else rng.permutation(len(events))
+    for i in order:
+        kind, timestamp, state = events[i]
+        if kind == "patch":
+            counter.add_patch(float(timestamp), int(state))
+        else:
+            counter.add_choice(float(timestamp))
+
+    expected = count_patches_visited(patches, states, choices)
+    assert counter.counts == expected
+
+
+def _grow_session(source: Path, target: Path, fraction: float) -> None:
+    """Copies the first `fraction` of the bytes of every stream of `source`, possibly cutting a line."""
+    for path in source.rglob("*.json"):
+        destination = target / path.relative_to(source)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        if path.name == "tasklogic_output.json":
+            shutil.copy(path, destination)
+            continue
+        content = path.read_bytes()
+        destination.write_bytes(content[: int(len(content) * fraction)])
+
+
+@pytest.mark.parametrize("trainer", [DEPLETION_TRAINER, SINGLE_SITE_TRAINER], ids=["depletion", "single_site"])
+def test_live_metrics_match_offline_metrics(tmp_path: Path, trainer):
+    source = generate_session(tmp_path / "source", SyntheticSessionSettings(duration=600))
+    session = tmp_path / "session"
+    trainer_state = trainer.create_enrollment()
+    provider = trainer_state.stage.metrics_provider.callable
+
+    engine = LiveMetricsEngine(session, trainer, trainer_state)
+    assert engine.update().error is not None
+
+    for fraction in (0.25, 0.5, 0.5, 0.9):
+        _grow_session(source, session, fraction)
+        status = engine.update()
+    assert status.metrics != provider(source)
+
+    _grow_session(source, session, 1.0)
+    status = engine.update()
+    assert status.metrics == provider(source)
+    assert [t.stage for t in status.transitions] == [
+        s.name for _, s in trainer.curriculum.see_stage_transitions(trainer_state.stage)
+    ]
+    assert engine.update().n_new_events == 0
+
+
+def test_cli_watch(tmp_path: Path, capsys):
+    session = generate_session(tmp_path / "session", SyntheticSessionSettings(duration=600))
+    trainer_state = tmp_path / "trainer_state.json"
+    trainer_state.write_text(DEPLETION_TRAINER.create_enrollment().model_dump_json(), encoding="utf-8")
+    CliApp.run(
+        CurriculumAppCliArgs,
+        cli_args=[
+            "watch",
+            "--data-directory",
+            str(session),
+            "--input-trainer-state",
+            str(trainer_state),
+            "--max-updates",
+            "2",
+            "--interval",
+            "0.01",
+        ],
+    )
+    updates = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert len(updates) == 2
+    assert updates[0]["n_new_events"] > 0 and updates[1]["n_new_events"] == 0
+    assert updates[0]["metrics"] == updates[1]["metrics"]
@@ -0,0 +1,102 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from aind_behavior_vr_foraging_curricula import metrics_cache
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+from aind_behavior_vr_foraging_curricula.depletion.metrics import DepletionCurriculumMetrics, metrics_from_dataset
+from aind_behavior_vr_foraging_curricula.metrics_cache import MetricsCache, get_metrics_cache, use_metrics_cache
+from aind_behavior_vr_foraging_curricula.utils import metrics_from_dataset_path
+
+
+@pytest.fixture
+def counting_provider():
+    calls: list[Path] = []
+
+    def provider(data_directory: os.PathLike) -> DepletionCurriculumMetrics:
+        calls.append(Path(data_directory))
+        return metrics_from_dataset(data_directory)
+
+    provider.__module__ = metrics_from_dataset.__module__
+    provider.__qualname__ = metrics_from_dataset.__qualname__
+    provider.required_streams = metrics_from_dataset.required_streams
+    provider.calls = calls
+    return provider
+
+
+def test_hit_returns_cached_metrics(tmp_path: Path, session_directory: Path, counting_provider):
+    cache = MetricsCache(tmp_path / "cache")
+    first = cache.get_or_compute(session_directory, counting_provider)
+    second = cache.get_or_compute(session_directory, counting_provider)
+
+    assert len(counting_provider.calls) == 1
+    assert isinstance(second, DepletionCurriculumMetrics)
+    assert second == first
+    assert second.n_patches_visited_per_patch == {0: 1, 1: 1}
+
+
+def test_modified_stream_invalidates_entry(tmp_path: Path, session_directory: Path, counting_provider):
+    cache = MetricsCache(tmp_path / "cache")
+    cache.get_or_compute(session_directory, counting_provider)
+
+    with open(session_directory / "behavior" / "SoftwareEvents" / "GiveReward.json", "a", encoding="utf-8") as f:
+        f.write('{"name": "GiveReward", "timestamp": 13.0, "data": 5.0}\n')
+    metrics = cache.get_or_compute(session_directory, counting_provider)
+
+    assert len(counting_provider.calls) == 2
+    assert metrics.total_water_consumed == pytest.approx(0.020)
+
+
+def test_unrelated_file_does_not_invalidate_entry(tmp_path: Path, session_directory: Path, counting_provider):
+    cache = MetricsCache(tmp_path / "cache")
+    cache.get_or_compute(session_directory, counting_provider)
+    (session_directory / "behavior" / "unrelated.bin").write_bytes(b"0" * 16)
+    cache.get_or_compute(session_directory, counting_provider)
+    assert len(counting_provider.calls) == 1
+
+
+def test_key_depends_on_provider_and_version(
+    tmp_path: Path, session_directory: Path, counting_provider, monkeypatch: pytest.MonkeyPatch
+):
+    cache = MetricsCache(tmp_path / "cache")
+    key = cache.key(session_directory, counting_provider)
+    monkeypatch.setattr(metrics_cache, "__version__", "0.0.0-other")
+    assert cache.key(session_directory, counting_provider) != key
+    monkeypatch.undo()
+    counting_provider.__qualname__ = "other_provider"
+    assert cache.key(session_directory, counting_provider) != key
+
+
+def test_corrupted_entry_is_recomputed(tmp_path: Path, session_directory: Path, counting_provider):
+    cache = MetricsCache(tmp_path / "cache")
+    cache.get_or_compute(session_directory, counting_provider)
+    for path in cache.root.glob("*.json"):
+        path.write_text("not json")
+    assert cache.get_or_compute(session_directory, counting_provider).n_choices == 3
+    assert len(counting_provider.calls) == 2
+
+
+def test_lru_eviction(tmp_path: Path, session_directory: Path):
+    metrics = metrics_from_dataset(session_directory)
+    entry_size = len(metrics.model_dump_json())
+    cache = MetricsCache(tmp_path / "cache", max_size_bytes=2 * entry_size)
+
+    cache.put("a", metrics)
+    cache.put("b", metrics)
+    os.utime(cache.root / "a.json", ns=(0, 0))
+    os.utime(cache.root / "b.json", ns=(1, 1))
+    assert cache.get("a", DepletionCurriculumMetrics) is not None  # "a" becomes the most recently used
+    cache.put("c", metrics)
+
+    assert sorted(p.stem for p in cache.root.glob("*.json")) == ["a", "c"]
+
+
+def test_metrics_from_dataset_path_uses_active_cache(tmp_path: Path, session_directory: Path):
+    trainer_state = TRAINER.create_enrollment()
+    assert get_metrics_cache() is None
+    with use_metrics_cache(MetricsCache(tmp_path / "cache")) as cache:
+        metrics = metrics_from_dataset_path(session_directory, trainer_state)
+        assert len(list(cache.root.glob("*.json"))) == 1
+        assert metrics_from_dataset_path(session_directory, trainer_state) == metrics
+    assert get_metrics_cache() is None
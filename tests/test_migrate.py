@@ -0,0 +1,134 @@
+import json
+from pathlib import Path
+
+import pytest
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+from aind_behavior_vr_foraging_curricula.depletion.metrics import DepletionCurriculumMetrics
+from aind_behavior_vr_foraging_curricula.depletion.policies import p_learn_to_run
+from aind_behavior_vr_foraging_curricula.migrate import MigrationOptions, migrate_directory, migrate_trainer_state
+from aind_behavior_vr_foraging_curricula.stage_store import StageStore
+
+
+def _previous_version(stage_index: int = 0) -> dict:
+    stage = TRAINER.curriculum.see_stages()[stage_index]
+    trainer_state = TRAINER.create_trainer_state(
+        stage=stage, is_on_curriculum=True, active_policies=stage.start_policies
+    )
+    document = json.loads(trainer_state.model_dump_json())
+    document["curriculum"]["version"] = "0.0.1"
+    document["stage"]["task"]["version"] = "0.0.1"
+    document["stage"]["task"]["task_parameters"]["rng_seed"] = 42
+    return document
+
+
+@pytest.fixture
+def archive(tmp_path: Path) -> Path:
+    root = tmp_path / "archive"
+    (root / "mouse0").mkdir(parents=True)
+    (root / "mouse1").mkdir(parents=True)
+    (root / "mouse0" / "trainer_state.json").write_text(json.dumps(_previous_version()), encoding="utf-8")
+    (root / "mouse1" / "trainer_state.json").write_text(TRAINER.create_enrollment().model_dump_json(), encoding="utf-8")
+    unknown = _previous_version()
+    unknown["stage"]["name"] = "removed_stage"
+    (root / "mouse2.json").write_text(json.dumps(unknown), encoding="utf-8")
+    return root
+
+
+def test_migrate_trainer_state():
+    document = _previous_version()
+    migrated = migrate_trainer_state(json.dumps(document), "depletion")
+    current = TRAINER.curriculum.see_stages()[0]
+    assert migrated.curriculum.version == TRAINER.curriculum.version
+    assert migrated.stage.task.task_parameters.rng_seed == 42
+    assert migrated.stage.task.version == current.task.version
+    assert [p.name for p in migrated.active_policies] == document["active_policies"]
+
+    reset = migrate_trainer_state(json.dumps(document), "depletion", reset_task=True)
+    assert reset.stage.task == current.task
+
+    document["active_policies"].append("removed_policy")
+    with pytest.raises(ValueError, match="removed_policy"):
+        migrate_trainer_state(json.dumps(document), "depletion")
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_migrate_directory(archive: Path, tmp_path: Path, max_workers: int):
+    output = tmp_path / f"output{max_workers}"
+    summary = migrate_directory(archive, output, max_workers=max_workers)
+    assert (summary.n_files, summary.n_migrated, summary.n_unchanged, summary.n_failed) == (3, 1, 1, 1)
+    assert [failure.path for failure in summary.failures] == ["mouse2.json"]
+    assert "removed_stage" in summary.failures[0].error
+    migrated = TRAINER.trainer_state_model.model_validate_json((output / "mouse0" / "trainer_state.json").read_bytes())
+    assert migrated.curriculum.version == TRAINER.curriculum.version
+    assert (output / "mouse1" / "trainer_state.json").exists()
+    assert not (output / "mouse2.json").exists()
+    assert json.loads((archive / "mouse0" / "trainer_state.json").read_bytes())["curriculum"]["version"] == "0.0.1"
+
+
+def test_migrate_in_place(archive: Path):
+    unchanged = (archive / "mouse1" / "trainer_state.json").stat().st_mtime_ns
+    assert migrate_directory(archive, options=MigrationOptions(dry_run=True), max_workers=1).n_migrated == 1
+    assert json.loads((archive / "mouse0" / "trainer_state.json").read_bytes())["curriculum"]["version"] == "0.0.1"
+
+    assert migrate_directory(archive, max_workers=1).n_migrated == 1
+    assert migrate_directory(archive, max_workers=1).n_migrated == 0
+    assert (archive / "mouse1" / "trainer_state.json").stat().st_mtime_ns == unchanged
+    assert not list(archive.rglob("*.tmp"))
+
+
+def test_migrate_with_stage_store(archive: Path, tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    store = tmp_path / "stages"
+    (archive / "mouse2.json").unlink()
+    options = MigrationOptions(stage_store=store)
+    assert migrate_directory(archive, options=options, max_workers=1).n_failed == 0
+    assert '"$ref"' in (archive / "mouse0" / "trainer_state.json").read_text(encoding="utf-8")
+    summary = migrate_directory(archive, max_workers=1)
+    assert [failure.path for failure in summary.failures] == ["mouse0/trainer_state.json"]
+    assert "stage store" in summary.failures[0].error
+
+    # Only the task logic of the current stage is read, not those of the stages of the curriculum
+    fetched = []
+    get_json = StageStore.get_json
+    monkeypatch.setattr(StageStore, "get_json", lambda self, digest: fetched.append(digest) or get_json(self, digest))
+    assert migrate_directory(archive, options=options, max_workers=1).n_migrated == 0
+    stage = json.loads((archive / "mouse0" / "trainer_state.json").read_bytes())["stage"]
+    assert fetched == [stage["task"]["$ref"].removeprefix("sha256:")]
+
+
+def test_cli_migrate(archive: Path, tmp_path: Path, capsys):
+    output = tmp_path / "output"
+    args = ["migrate", "--directory", str(archive), "--output", str(output), "--max-workers", "1", "--reset-task"]
+    CliApp.run(CurriculumAppCliArgs, cli_args=args)
+    failures = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [failure["path"] for failure in failures] == ["mouse2.json"]
+    migrated = json.loads((output / "mouse0" / "trainer_state.json").read_bytes())
+    assert migrated["stage"]["task"]["task_parameters"]["rng_seed"] is None
+
+
+def test_migrate_keeps_policy_changes(tmp_path: Path):
+    stage = TRAINER.curriculum.see_stages()[0]
+    metrics = DepletionCurriculumMetrics(
+        total_water_consumed=0,
+        n_reward_sites_traveled=400,
+        n_choices=0,
+        n_patches_visited=0,
+        n_patches_visited_per_patch={},
+        last_stop_duration_offset_updater=0,
+        last_reward_site_length=None,
+        last_delay_duration=None,
+    )
+    task = p_learn_to_run(metrics, stage.task.model_copy(deep=True))
+    tuned = TRAINER.create_trainer_state(
+        stage=stage.model_copy(update={"task": task}), is_on_curriculum=True, active_policies=stage.start_policies
+    )
+    document = json.loads(tuned.model_dump_json())
+    document["curriculum"]["version"] = "0.0.1"
+    (tmp_path / "mouse0.json").write_text(json.dumps(document), encoding="utf-8")
+
+    assert migrate_directory(tmp_path, max_workers=1).n_migrated == 1
+    migrated = TRAINER.trainer_state_model.model_validate_json((tmp_path / "mouse0.json").read_bytes())
+    assert migrated.curriculum.version == TRAINER.curriculum.version
+    assert migrated.stage.task == task != stage.task
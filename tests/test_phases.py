@@ -0,0 +1,67 @@
+import json
+import pstats
+from pathlib import Path
+
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+from aind_behavior_vr_foraging_curricula.phases import PhaseRecorder, phase, record_phases
+
+
+def test_phases_are_only_recorded_when_active():
+    recorder = PhaseRecorder()
+    with phase("ignored"):
+        pass
+    with record_phases(recorder):
+        with phase("outer"):
+            with phase("inner"):
+                pass
+    with phase("ignored"):
+        pass
+
+    assert [p.name for p in recorder.timings.phases] == ["outer/inner", "outer"]
+    assert all(p.peak_memory is None for p in recorder.timings.phases)
+    assert recorder.timings.phases[1].wall_time >= recorder.timings.phases[0].wall_time
+
+
+def test_peak_memory_includes_nested_phases():
+    recorder = PhaseRecorder(trace_memory=True)
+    with record_phases(recorder):
+        with phase("outer"):
+            with phase("inner"):
+                buffer = bytearray(10_000_000)
+            del buffer
+            with phase("after"):
+                pass
+
+    timings = {p.name: p for p in recorder.timings.phases}
+    assert timings["outer/inner"].peak_memory >= 10_000_000
+    assert timings["outer/after"].peak_memory < 10_000_000
+    assert timings["outer"].peak_memory >= 10_000_000
+
+
+def test_cli_timings_and_profile(tmp_path: Path, session_directory: Path, capsys):
+    trainer_state = tmp_path / "trainer_state.json"
+    trainer_state.write_text(TRAINER.create_enrollment().model_dump_json(), encoding="utf-8")
+    CliApp.run(
+        CurriculumAppCliArgs,
+        cli_args=[
+            "run",
+            "--data-directory",
+            str(session_directory),
+            "--input-trainer-state",
+            str(trainer_state),
+            "--timings",
+            str(tmp_path / "timings.json"),
+            "--profile",
+            str(tmp_path / "run.prof"),
+        ],
+    )
+
+    names = [p["name"] for p in json.loads((tmp_path / "timings.json").read_text(encoding="utf-8"))["phases"]]
+    for name in ("import", "run_curriculum/parse_trainer_state", "run_curriculum/metrics", "run_curriculum/evaluate"):
+        assert name in names
+    assert "serialize" in names
+    assert pstats.Stats(str(tmp_path / "run.prof")).total_calls > 0
+    assert "trainer_state" in json.loads(capsys.readouterr().out)
@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from aind_behavior_vr_foraging_curricula import _schema
+from aind_behavior_vr_foraging_curricula.cli import _KNOWN_CURRICULA
+from aind_behavior_vr_foraging_curricula.schema_bundle import DEFINITIONS_NAME, SchemaBundle
+
+
+@pytest.fixture(scope="module")
+def generated_root(tmp_path_factory) -> Path:
+    root = tmp_path_factory.mktemp("schema")
+    assert sorted(_schema.main(root, max_workers=2)) == sorted(_KNOWN_CURRICULA)
+    return root
+
+
+def test_schema_matches_repository(generated_root: Path):
+    for curriculum in _KNOWN_CURRICULA:
+        expected = Path(__file__).parents[1] / "schema" / f"{curriculum}.json"
+        assert (generated_root / f"{curriculum}.json").read_bytes() == expected.read_bytes()
+
+
+def test_schema_is_incremental(generated_root: Path, monkeypatch):
+    manifest = json.loads((generated_root / _schema.MANIFEST_NAME).read_text(encoding="utf-8"))
+    depletion = manifest["curricula"]["depletion"]
+    assert "depletion/stages.py" in depletion["sources"]
+    assert "template/stages.py" not in depletion["sources"]
+    assert "aind-behavior-curriculum" in depletion["distributions"]
+    assert "cli.py" not in depletion["sources"]
+    assert set(depletion["distributions"]) <= {
+        "aind-behavior-curriculum",
+        "aind-behavior-services",
+        "aind-behavior-vr-foraging",
+        "pydantic",
+        "pydantic_core",
+    }
+
+    def fail(curriculum: str):
+        raise AssertionError(f"{curriculum} should not be regenerated")
+
+    with monkeypatch.context() as m:
+        m.setattr(_schema, "_generate", fail)
+        assert _schema.main(generated_root) == []
+
+    # A changed source and a tampered schema file are regenerated, an unchanged schema is not rewritten
+    depletion["sources"]["depletion/stages.py"] = "0" * 64
+    manifest["curricula"]["depletion"] = depletion
+    (generated_root / _schema.MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+    (generated_root / "template.json").write_text("{}", encoding="utf-8")
+    assert _schema.main(generated_root, max_workers=1) == ["template"]
+    assert json.loads((generated_root / "template.json").read_text(encoding="utf-8"))["name"]
+    assert _schema.main(generated_root, dry_run=True, force=True) == []
+
+
+def test_schema_bundle(tmp_path: Path):
+    assert sorted(_schema.main(tmp_path, max_workers=1, bundle=True)) == sorted(_KNOWN_CURRICULA)
+    definitions = (tmp_path / DEFINITIONS_NAME).read_bytes()
+    bundle = SchemaBundle(tmp_path)
+    assert bundle.curricula() == sorted(_KNOWN_CURRICULA)
+    for curriculum in _KNOWN_CURRICULA:
+        expected = json.loads((Path(__file__).parents[1] / "schema" / f"{curriculum}.json").read_bytes())
+        assert bundle.load(curriculum) == expected
+        assert json.loads(bundle.read_json(curriculum)) == expected
+        assert bundle.load(curriculum) is bundle.load(curriculum)
+
+    # Tampered definitions invalidate every curriculum of the bundle
+    (tmp_path / DEFINITIONS_NAME).write_text('{"$defs": {}}', encoding="utf-8")
+    with pytest.raises(KeyError):
+        SchemaBundle(tmp_path).load("depletion")
+    assert _schema.main(tmp_path, max_workers=1, bundle=True) == []
+    assert (tmp_path / DEFINITIONS_NAME).read_bytes() == definitions
+    assert _schema.main(tmp_path, bundle=True) == []
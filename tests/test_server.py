@@ -0,0 +1,124 @@
+import json
+import logging
+import socket
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs, CurriculumCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+from aind_behavior_vr_foraging_curricula.server import (
+    ServerRequestError,
+    ServerUnavailableError,
+    make_server,
+    request_suggestion,
+)
+from aind_behavior_vr_foraging_curricula.settings import CurriculumRunArguments
+
+
+@pytest.fixture(scope="module")
+def server_url() -> Iterator[str]:
+    server = make_server(port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://{server.server_address[0]}:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def trainer_state_path(tmp_path: Path) -> Path:
+    path = tmp_path / "trainer_state.json"
+    path.write_text(TRAINER.create_enrollment().model_dump_json(), encoding="utf-8")
+    return path
+
+
+def test_health(server_url: str):
+    with urllib.request.urlopen(f"{server_url}/health") as response:
+        assert "depletion" in json.loads(response.read())["curricula"]
+
+
+def test_init(server_url: str):
+    request = urllib.request.Request(
+        f"{server_url}/init", data=json.dumps({"curriculum": "depletion"}).encode(), method="POST"
+    )
+    with urllib.request.urlopen(request) as response:
+        trainer_state = TRAINER.trainer_state_model.model_validate_json(response.read())
+    assert trainer_state == TRAINER.create_enrollment()
+
+
+def test_request_suggestion(server_url: str, session_directory: Path, trainer_state_path: Path):
+    args = CurriculumCliArgs(data_directory=session_directory, input_trainer_state=trainer_state_path, no_cache=True)
+    suggestion = json.loads(request_suggestion(server_url, args))
+    assert suggestion == json.loads(args.compute_suggestion().model_dump_json())
+
+    args = CurriculumCliArgs(data_directory=session_directory, input_trainer_state=session_directory / "missing.json")
+    with pytest.raises(ServerRequestError, match="FileNotFoundError"):
+        request_suggestion(server_url, args)
+
+
+def test_cli_run_with_server(server_url: str, session_directory: Path, trainer_state_path: Path, tmp_path: Path):
+    CliApp.run(
+        CurriculumAppCliArgs,
+        cli_args=[
+            "run",
+            "--data-directory",
+            str(session_directory),
+            "--input-trainer-state",
+            str(trainer_state_path),
+            "--server",
+            server_url,
+            "--output-suggestion",
+            str(tmp_path),
+            "--mute-suggestion",
+        ],
+    )
+    suggestion = json.loads((tmp_path / "suggestion.json").read_text(encoding="utf-8"))
+    assert suggestion["metrics"]["n_choices"] == 3
+
+
+def test_cli_run_falls_back_to_in_process(
+    session_directory: Path, trainer_state_path: Path, capsys, caplog: pytest.LogCaptureFixture
+):
+    with caplog.at_level(logging.WARNING):
+        CliApp.run(
+            CurriculumAppCliArgs,
+            cli_args=[
+                "run",
+                "--data-directory",
+                str(session_directory),
+                "--input-trainer-state",
+                str(trainer_state_path),
+                "--server",
+                "http://127.0.0.1:1",
+            ],
+        )
+    assert json.loads(capsys.readouterr().out)["metrics"]["n_choices"] == 3
+    assert any("unavailable" in record.getMessage() for record in caplog.records)
+
+
+def test_read_timeout_is_not_a_fallback(session_directory: Path, trainer_state_path: Path):
+    args = CurriculumCliArgs(data_directory=session_directory, input_trainer_state=trainer_state_path)
+    with socket.create_server(("127.0.0.1", 0)) as listener:
+        url = f"http://127.0.0.1:{listener.getsockname()[1]}"
+        with pytest.raises(ServerRequestError, match="timed out"):
+            request_suggestion(url, args, read_timeout=0.1)
+    with pytest.raises(ServerUnavailableError):
+        request_suggestion(url, args)
+
+
+def test_requests_ignore_the_server_environment(
+    session_directory: Path, trainer_state_path: Path, monkeypatch: pytest.MonkeyPatch
+):
+    monkeypatch.setenv("OUTPUT_FORMAT", "slim")
+    monkeypatch.setenv("HISTORY", "history.db")
+    payload = {"data_directory": str(session_directory), "input_trainer_state": str(trainer_state_path)}
+    request = CurriculumRunArguments.model_validate(payload)
+    assert request.output_format == CurriculumCliArgs.model_fields["output_format"].default
+    assert request.history is None
@@ -0,0 +1,211 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+from aind_behavior_vr_foraging_curricula.depletion.metrics import DepletionCurriculumMetrics
+from aind_behavior_vr_foraging_curricula.depletion.simulation import DepletionMetricsModel
+from aind_behavior_vr_foraging_curricula.simulation import (
+    MetricsModel,
+    SimulationSettings,
+    SubjectBatch,
+    _rows,
+    _RuleEvaluator,
+    default_metrics_model,
+    simulate,
+)
+
+
+class RecordingModel(DepletionMetricsModel):
+    """Records the metrics drawn for each session."""
+
+    def model_post_init(self, __context) -> None:
+        self._sessions = []
+
+    def sample(self, stage, subjects, rng):
+        columns = super().sample(stage, subjects, rng)
+        self._sessions.append(columns)
+        return columns
+
+
+def test_batched_rules_match_rules_on_each_session():
+    rng = np.random.default_rng(0)
+    model = DepletionMetricsModel()
+    n = 500
+    subjects = SubjectBatch(rng.standard_normal(n), rng.integers(0, 20, n), rng.integers(0, 5, n))
+    for stage in TRAINER.curriculum.see_stages():
+        columns = model.sample(stage, subjects, rng)
+        columns["last_reward_site_length"][::7] = np.nan
+        evaluator = _RuleEvaluator(DepletionCurriculumMetrics)
+        for transition, _ in TRAINER.curriculum.see_stage_transitions(stage):
+            expected = [
+                transition.invoke(DepletionCurriculumMetrics.model_validate(row))
+                for row in _rows(columns, np.arange(n))
+            ]
+            np.testing.assert_array_equal(evaluator(transition.callable, columns, n), expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_single_subject_matches_trainer(seed: int):
+    model = RecordingModel()
+    result = simulate(TRAINER, model, SimulationSettings(n_subjects=1, n_sessions=20, seed=seed))
+
+    trainer_state = TRAINER.create_enrollment()
+    stages = [trainer_state.stage.name]
+    for columns in model._sessions:
+        metrics = DepletionCurriculumMetrics.model_validate(next(_rows(columns, np.arange(1))))
+        trainer_state = TRAINER.evaluate(trainer_state, metrics)
+        stages.append(trainer_state.stage.name)
+    simulated = [result.stage_names[i] for i in result.stages[0]]
+    assert simulated[: len(stages)] == stages
+    assert set(simulated[len(stages) :]) <= {result.graduation_stage}
+
+
+def test_summary():
+    settings = SimulationSettings(n_subjects=200, n_sessions=5, seed=0)
+    result = simulate(TRAINER, DepletionMetricsModel(), settings)
+    summary = result.summary()
+    assert summary.graduation_stage == "graduation"
+    assert result.stages.shape == (200, 6)
+    to_graduation = result.sessions_to_graduation()
+    assert summary.fraction_graduated == np.mean(to_graduation >= 0)
+    assert sum(result.dwell_times(name) for name in result.stage_names).tolist() == [5] * 200
+    assert summary.stage_dwell[result.stage_names[0]].fraction_visited == 1.0
+
+    np.testing.assert_array_equal(simulate(TRAINER, DepletionMetricsModel(), settings).stages, result.stages)
+    with pytest.raises(ValueError):
+        simulate(TRAINER, DepletionMetricsModel(), SimulationSettings(initial_stage="unknown"))
+
+
+def test_cli_simulate(tmp_path: Path, capsys):
+    output = tmp_path / "summary.json"
+    CliApp.run(
+        CurriculumAppCliArgs,
+        cli_args=[
+            "simulate",
+            "--curriculum",
+            "depletion",
+            "--n-subjects",
+            "100",
+            "--seed",
+            "0",
+            "--output",
+            str(output),
+        ],
+    )
+    summary = json.loads(capsys.readouterr().out)
+    assert summary == json.loads(output.read_text(encoding="utf-8"))
+    assert summary["n_subjects"] == 100
+
+    from aind_behavior_vr_foraging_curricula.template import TRAINER as TEMPLATE_TRAINER
+
+    with pytest.raises(ValueError):
+        default_metrics_model(TEMPLATE_TRAINER)
+
+
+def test_policies_drive_task_metrics():
+    class TaskRecordingModel(DepletionMetricsModel):
+        def model_post_init(self, __context) -> None:
+            self._lengths = []
+
+        def sample(self, stage, subjects, rng):
+            columns = super().sample(stage, subjects, rng)
+            self._lengths.append(columns["last_reward_site_length"].copy())
+            return columns
+
+    # p_learn_to_run grows the reward site length of experts (600+ reward sites: gain 3, +30 cm) up to 50 cm
+    experts = TaskRecordingModel(
+        max_reward_sites=5000, learning_sessions=0.01, learning_sessions_spread=0, session_spread=0
+    )
+    simulate(TRAINER, experts, SimulationSettings(n_subjects=10, n_sessions=2, seed=0))
+    assert experts._lengths[0].tolist() == [20.0] * 10
+    assert experts._lengths[1].tolist() == [50.0] * 10
+
+    # Subjects that never travel enough for p_learn_to_run keep a 20 cm reward site, and never leave the first stage
+    novices = TaskRecordingModel(max_reward_sites=150, session_spread=0)
+    result = simulate(TRAINER, novices, SimulationSettings(n_subjects=50, n_sessions=10, seed=0))
+    assert all(lengths.tolist() == [20.0] * 50 for lengths in novices._lengths)
+    assert result.dwell_times(result.stage_names[0]).tolist() == [10] * 50
+
+
+def test_reward_sites_per_patch_is_at_least_one():
+    with pytest.raises(ValidationError):
+        DepletionMetricsModel(reward_sites_per_patch=0.5)
+    rng = np.random.default_rng(0)
+    subjects = SubjectBatch(rng.standard_normal(10), np.zeros(10, dtype=int), np.zeros(10, dtype=int))
+    assert DepletionMetricsModel(reward_sites_per_patch=1).sample(TRAINER.curriculum.see_stages()[1], subjects, rng)
+
+
+def test_batched_policies_match_policies_on_each_subject():
+    class PerSubjectModel(RecordingModel):
+        def task_parameters(self, stage):
+            return None
+
+    settings = SimulationSettings(n_subjects=300, n_sessions=30, seed=0)
+    batched, per_subject = RecordingModel(), PerSubjectModel()
+    assert batched.task_parameters(TRAINER.curriculum.see_stages()[0]) is not None
+    np.testing.assert_array_equal(
+        simulate(TRAINER, batched, settings).stages, simulate(TRAINER, per_subject, settings).stages
+    )
+    for expected, actual in zip(per_subject._sessions, batched._sessions, strict=True):
+        for name in ("last_reward_site_length", "last_stop_duration_offset_updater", "last_delay_duration"):
+            np.testing.assert_array_equal(actual[name], expected[name])
+
+
+def test_default_model_varies_across_subjects():
+    result = simulate(TRAINER, DepletionMetricsModel(), SimulationSettings(n_subjects=2000, seed=0))
+    summary = result.summary()
+    assert 0 < summary.fraction_graduated < 1
+    for name in result.stage_names:
+        if name != result.graduation_stage:
+            dwell = result.dwell_times(name)
+            assert len(np.unique(dwell[dwell > 0])) > 1, name
+
+
+def test_policy_transitions_match_trainer():
+    from aind_behavior_curriculum import Policy, PolicyTransition, Stage, StageTransition, Trainer, create_curriculum
+    from aind_behavior_vr_foraging.task_logic import AindVrForagingTaskLogic
+
+    from aind_behavior_vr_foraging_curricula.template import stages
+    from aind_behavior_vr_foraging_curricula.template.metrics import VrForagingTemplateMetrics
+
+    def st_to_b(metrics: VrForagingTemplateMetrics) -> bool:
+        return metrics.metric1 > 2
+
+    def pt_to_set_mode(metrics: VrForagingTemplateMetrics) -> bool:
+        return metrics.metric1 > 0.5
+
+    stage_a = Stage(
+        name="stage_a",
+        task=stages.s_stage_a.task.model_copy(deep=True),
+        metrics_provider=stages.s_stage_a.metrics_provider,
+    )
+    identity, set_mode = Policy(stages.p_identity_policy), Policy(stages.p_set_mode_from_metric1)
+    stage_a.add_policy_transition(identity, set_mode, PolicyTransition(pt_to_set_mode))
+    stage_a.set_start_policies(identity)
+    curriculum = create_curriculum("TestCurriculum", "0.1.0", (AindVrForagingTaskLogic,))()
+    curriculum.add_stage_transition(stage_a, stages.s_stage_b, StageTransition(st_to_b))
+    trainer = Trainer(curriculum)
+
+    class TemplateModel(MetricsModel):
+        def __init__(self) -> None:
+            self.sessions = []
+
+        def sample(self, stage, subjects, rng):
+            self.sessions.append((subjects.tasks[0].task_parameters.rng_seed, rng.normal(0, 1, len(subjects.ability))))
+            return {"metric1": self.sessions[-1][1]}
+
+    model = TemplateModel()
+    result = simulate(trainer, model, SimulationSettings(n_subjects=1, n_sessions=20, seed=1))
+
+    trainer_state = trainer.create_enrollment()
+    for rng_seed, metric1 in model.sessions:
+        assert rng_seed == trainer_state.stage.task.task_parameters.rng_seed
+        trainer_state = trainer.evaluate(trainer_state, VrForagingTemplateMetrics(metric1=metric1[0]))
+    assert result.stage_names[result.stages[0, len(model.sessions)]] == trainer_state.stage.name
+    assert len({rng_seed for rng_seed, _ in model.sessions}) > 1
@@ -0,0 +1,28 @@
+from aind_behavior_vr_foraging_curricula.depletion import stages
+from aind_behavior_vr_foraging_curricula.depletion.curriculum import make_curriculum
+from aind_behavior_vr_foraging_curricula.stage_cache import StageCacheInfo, stage_cache, stage_cache_info
+
+
+def test_stages_are_shared_within_a_cache():
+    with stage_cache() as cache:
+        stage = stages.make_s_stage_one_odor_no_depletion()
+        assert stages.make_s_stage_one_odor_no_depletion() is stage
+        assert stages.make_s_stage_graduation() is not stage
+        assert cache.info() == StageCacheInfo(hits=1, misses=2)
+
+    with stage_cache():
+        assert stages.make_s_stage_one_odor_no_depletion() is not stage
+    assert stages.make_s_stage_one_odor_no_depletion() is not stages.make_s_stage_one_odor_no_depletion()
+
+
+def test_cached_curriculum_matches_uncached():
+    before = stage_cache_info()
+    curriculum = make_curriculum()
+    after = stage_cache_info()
+    assert after.misses - before.misses == 5
+    assert after.hits - before.hits == 7
+
+    for stage in curriculum.see_stages():
+        factory = getattr(stages, f"make_s_stage_{stage.name}")
+        assert stage.model_dump_json() == factory().model_dump_json()
+    assert curriculum.model_dump_json() == make_curriculum().model_dump_json()
@@ -0,0 +1,106 @@
+import json
+from pathlib import Path
+
+import pytest
+from pydantic_settings import CliApp
+
+from aind_behavior_vr_foraging_curricula.cli import CurriculumAppCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import TRAINER
+from aind_behavior_vr_foraging_curricula.json_patch import content_hash
+from aind_behavior_vr_foraging_curricula.stage_store import LazyTaskLogic, StageStore, has_references, is_reference
+from aind_behavior_vr_foraging_curricula.synthetic import SyntheticSessionSettings, generate_session
+
+
+def test_dehydrate_round_trip(tmp_path: Path):
+    store = StageStore(tmp_path / "store")
+    trainer_state = TRAINER.create_enrollment()
+    document = trainer_state.model_dump(mode="json")
+    dehydrated = store.dehydrate(document)
+
+    assert is_reference(dehydrated["stage"]["task"])
+    assert dehydrated["stage"]["task"]["$ref"] == "sha256:" + content_hash(document["stage"]["task"])
+    # Every stage of the curriculum shares the store, and the input is untouched
+    n_stages = len(TRAINER.curriculum.see_stages())
+    assert 0 < len(list(store.root.glob("*.json"))) <= n_stages
+    assert not is_reference(document["stage"]["task"])
+    dehydrated_json = json.dumps(dehydrated)
+    assert has_references(dehydrated_json)
+    assert len(dehydrated_json) < len(trainer_state.model_dump_json()) / 2
+
+    rehydrated = StageStore(store.root).rehydrate_json(dehydrated_json)
+    assert not has_references(rehydrated)
+    assert type(trainer_state).model_validate_json(rehydrated) == trainer_state
+    assert store.dehydrate(dehydrated) == dehydrated
+
+
+def test_resolve_only_fetches_what_is_read(tmp_path: Path):
+    document = TRAINER.create_enrollment().model_dump(mode="json")
+    dehydrated = StageStore(tmp_path).dehydrate(document)
+    store = StageStore(tmp_path)
+    fetched = []
+
+    def get_json(digest: str) -> bytes:
+        fetched.append(digest)
+        return StageStore.get_json(store, digest)
+
+    store.get_json = get_json  # type: ignore[method-assign]
+    resolved = store.resolve(dehydrated)
+    assert resolved["stage"]["name"] == document["stage"]["name"]
+    assert fetched == []
+
+    task = resolved["stage"]["task"]
+    assert isinstance(task, LazyTaskLogic) and not task.is_resolved
+    assert dict(task) == document["stage"]["task"]
+    assert fetched == [content_hash(document["stage"]["task"])]
+    assert task["version"] == document["stage"]["task"]["version"]
+    assert len(fetched) == 1
+
+
+def test_missing_task_logic(tmp_path: Path):
+    document = {"name": "a", "task": {"$ref": "sha256:" + "0" * 64}, "graph": {}, "metrics_provider": None}
+    with pytest.raises(FileNotFoundError):
+        StageStore(tmp_path).rehydrate_json(json.dumps(document))
+
+
+def test_cli_stage_store(tmp_path: Path, capsys):
+    store = tmp_path / "store"
+    trainer_state_path = tmp_path / "trainer_state.json"
+    CliApp.run(
+        CurriculumAppCliArgs,
+        cli_args=[
+            "init",
+            "--curriculum",
+            "depletion",
+            "--output",
+            str(trainer_state_path),
+            "--stage-store",
+            str(store),
+        ],
+    )
+    capsys.readouterr()
+    assert has_references(trainer_state_path.read_bytes())
+
+    session = generate_session(tmp_path / "session", SyntheticSessionSettings(n_patches=80, duration=600))
+    run_args = ["run", "--data-directory", str(session), "--input-trainer-state", str(trainer_state_path)]
+    with pytest.raises(ValueError):
+        CliApp.run(CurriculumAppCliArgs, cli_args=run_args)
+    CliApp.run(CurriculumAppCliArgs, cli_args=[*run_args, "--stage-store", str(store)])
+    suggestion = json.loads(capsys.readouterr().out)
+    task = suggestion["trainer_state"]["stage"]["task"]
+    assert is_reference(task)
+    assert StageStore(store).get_json(task["$ref"].removeprefix("sha256:"))
+
+
+def test_cli_slim_output_with_stage_store(tmp_path: Path, capsys):
+    store = tmp_path / "store"
+    trainer_state_path = tmp_path / "trainer_state.json"
+    trainer_state_path.write_text(TRAINER.create_enrollment().model_dump_json(), encoding="utf-8")
+    session = generate_session(tmp_path / "session", SyntheticSessionSettings(n_patches=80, duration=600))
+    run_args = ["run", "--data-directory", str(session), "--input-trainer-state", str(trainer_state_path)]
+    CliApp.run(CurriculumAppCliArgs, cli_args=[*run_args, "--stage-store", str(store), "--output-format", "slim"])
+    slim = json.loads(capsys.readouterr().out)
+    # Only the task logic of the suggested stage is stored, under its hash
+    assert [path.stem for path in store.glob("*.json")] == [slim["task_logic_hash"]]
+    CliApp.run(CurriculumAppCliArgs, cli_args=run_args)
+    full = json.loads(capsys.readouterr().out)
+    assert json.loads(StageStore(store).get_json(slim["task_logic_hash"])) == full["trainer_state"]["stage"]["task"]
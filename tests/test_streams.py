@@ -0,0 +1,56 @@
+import pytest
+from aind_behavior_vr_foraging.data_contract import dataset as vr_foraging_dataset
+
+from aind_behavior_vr_foraging_curricula import streams as streams_module
+from aind_behavior_vr_foraging_curricula.depletion.metrics import REQUIRED_STREAMS, metrics_from_dataset
+from aind_behavior_vr_foraging_curricula.streams import get_required_streams, get_stream, load_streams, loader_workers
+
+
+def test_required_streams_are_declared():
+    assert get_required_streams(metrics_from_dataset) == REQUIRED_STREAMS
+    assert get_required_streams(test_required_streams_are_declared) is None
+
+
+def test_load_streams_only_loads_requested(session_directory):
+    dataset = vr_foraging_dataset(session_directory)
+    streams = load_streams(dataset, ["Behavior/SoftwareEvents/ActivePatch", "Behavior/SoftwareEvents/Block"])
+
+    assert set(streams) == {"ActivePatch", "Block"}
+    assert streams["ActivePatch"].has_data
+    assert streams["Block"].has_error  # missing file errors are deferred to the caller
+    assert not get_stream(dataset, "Behavior/SoftwareEvents/GiveReward").has_data
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_load_streams_concurrently(session_directory, max_workers: int):
+    dataset = vr_foraging_dataset(session_directory)
+    streams = load_streams(dataset, REQUIRED_STREAMS, max_workers=max_workers)
+    assert [stream.name for stream in streams.values()] == [path.split("/")[-1] for path in REQUIRED_STREAMS]
+    assert all(stream.has_data for stream in streams.values())
+    assert streams["ChoiceFeedback"].data.index.tolist() == [2.0, 3.0, 12.0]
+
+
+def test_loader_workers_context(monkeypatch):
+    used: list[int] = []
+
+    class _Executor:
+        def __init__(self, max_workers: int, **kwargs):
+            used.append(max_workers)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            return False
+
+        def map(self, fn, iterable):
+            return map(fn, iterable)
+
+    monkeypatch.setattr(streams_module, "ThreadPoolExecutor", _Executor)
+    dataset = vr_foraging_dataset("missing_session")
+    with loader_workers(2):
+        load_streams(dataset, REQUIRED_STREAMS)
+        with loader_workers(None):
+            load_streams(dataset, REQUIRED_STREAMS)
+    load_streams(dataset, REQUIRED_STREAMS)
+    assert used == [2, 2, min(streams_module.DEFAULT_MAX_WORKERS, len(REQUIRED_STREAMS))]
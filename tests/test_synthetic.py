@@ -0,0 +1,54 @@
+import pytest
+from pydantic import ValidationError
+
+from aind_behavior_vr_foraging_curricula.depletion.metrics import metrics_from_dataset as depletion_metrics
+from aind_behavior_vr_foraging_curricula.single_site_matching.metrics import metrics_from_dataset as single_site_metrics
+from aind_behavior_vr_foraging_curricula.single_site_matching.stages import make_s_learn_to_stop
+from aind_behavior_vr_foraging_curricula.synthetic import SyntheticSessionSettings, UpdaterRange, generate_session
+
+
+def _read_streams(root):
+    return {path.relative_to(root): path.read_bytes() for path in sorted(root.rglob("*.json"))}
+
+
+def test_generate_session_is_reproducible(tmp_path):
+    settings = SyntheticSessionSettings(duration=300, seed=1)
+    first = generate_session(tmp_path / "first", settings)
+    second = generate_session(tmp_path / "second", settings)
+    other = generate_session(tmp_path / "other", settings.model_copy(update={"seed": 2}))
+
+    assert _read_streams(first) == _read_streams(second)
+    assert _read_streams(first) != _read_streams(other)
+
+
+def test_generate_session_metrics(tmp_path):
+    settings = SyntheticSessionSettings(
+        duration=600,
+        n_patches=50,
+        choice_probability=1.0,
+        reward_probability=1.0,
+        reward_amount=4.0,
+        stop_duration_offset=UpdaterRange(start=0.1, stop=0.4),
+    )
+    metrics = depletion_metrics(generate_session(tmp_path, settings))
+
+    assert metrics.n_patches_visited == 49  # The last patch is never closed
+    assert set(metrics.n_patches_visited_per_patch) == {0, 1}
+    assert metrics.n_choices == metrics.n_reward_sites_traveled
+    assert metrics.total_water_consumed == pytest.approx(metrics.n_choices * 4.0 / 1000)
+    assert metrics.last_reward_site_length == settings.reward_site_length
+    assert 0.1 <= metrics.last_stop_duration_offset_updater <= 0.4
+
+
+def test_generate_session_with_task_logic(tmp_path):
+    task_logic = make_s_learn_to_stop().task
+    metrics = single_site_metrics(generate_session(tmp_path, SyntheticSessionSettings(duration=300), task_logic))
+
+    assert metrics.n_patches_seen == 30
+    assert metrics.last_stop_threshold_updater is not None
+
+
+def test_reward_sites_per_patch_is_at_least_one(tmp_path):
+    with pytest.raises(ValidationError):
+        SyntheticSessionSettings(reward_sites_per_patch=0.5)
+    generate_session(tmp_path, SyntheticSessionSettings(duration=60, reward_sites_per_patch=1))
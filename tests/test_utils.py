@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from aind_behavior_vr_foraging_curricula.cli import CurriculumCliArgs
+from aind_behavior_vr_foraging_curricula.depletion import PKG_LOCATION, TRAINER
+from aind_behavior_vr_foraging_curricula.utils import pkg_location_from_json, trainer_state_from_json
+
+
+def test_pkg_location_from_json():
+    document = TRAINER.create_enrollment().model_dump_json()
+    assert pkg_location_from_json(document) == PKG_LOCATION
+    assert pkg_location_from_json(document.encode()) == PKG_LOCATION
+    assert trainer_state_from_json(document, TRAINER) == TRAINER.create_enrollment()
+
+    assert pkg_location_from_json(json.dumps({"curriculum": None})) is None
+    assert pkg_location_from_json("{}") is None
+    with pytest.raises(ValueError):
+        pkg_location_from_json(json.dumps({"curriculum": {"name": "Depletion"}}))
+    with pytest.raises(ValueError):
+        pkg_location_from_json("[]")
+
+
+def test_trainer_state_is_read_once(tmp_path, monkeypatch: pytest.MonkeyPatch):
+    path = tmp_path / "trainer_state.json"
+    path.write_text(TRAINER.create_enrollment().model_dump_json(), encoding="utf-8")
+    args = CurriculumCliArgs(data_directory=tmp_path, input_trainer_state=path)
+
+    assert args.resolve_curriculum_name() == "depletion"
+    path.unlink()
+    assert trainer_state_from_json(args.read_input_trainer_state(), TRAINER) == TRAINER.create_enrollment()